@@ -1,31 +1,20 @@
-from src.medbot.data_loader import (
-    load_patient_details,
-    load_diagnosis,
-    load_medications,
-    load_prescriptions,
-    load_alerts,
-    load_diabetic_indices,
-    load_encounters,
-    load_immunizations,
-    combine_patient_documents
-)
-
-from src.medbot.helper import (
-    create_chroma_vectorstore,
-    create_chat_openai_llm,
-    create_retrieval_qa_chain,
-    interactive_med_query
-)
-
 from src.medbot.hospital_agents import (
-    load_users, authenticate, check_permission, log_event,
-    classify_query_criticality, view_audit_log, create_langgraph_agent
+    load_users, authenticate,
+    view_audit_log, create_langgraph_agent,
+    role_sections
 )
 
-from langchain_core.messages import HumanMessage
+from src.medbot.chat import ChatSession, DENIED_ANSWER
+from src.medbot.streaming import print_token
+from src.medbot.memory import ConversationMemory
+
 import getpass
+import os
 import sys
 
+# Stream answer tokens as they are generated; MEDBOT_STREAM=0 prints whole answers
+STREAM_ANSWERS = os.getenv("MEDBOT_STREAM", "1") != "0"
+
 def main():
     # Step 1: Load users and ask for login
     users = load_users(r"I:\Code Space\LLM Model Project\RAG\medbot\Data\user_credentials.csv")
@@ -47,34 +36,75 @@ def main():
         else:
             print("Invalid username or password. Try again.")
 
-    # Step 2: Load data
-    patients = load_patient_details(r"I:\Code Space\LLM Model Project\RAG\medbot\Data\patient_details.csv")
-    diagnoses = load_diagnosis(r"I:\Code Space\LLM Model Project\RAG\medbot\Data\diagnosis.csv")
-    medications = load_medications(r"I:\Code Space\LLM Model Project\RAG\medbot\Data\medications.csv")
-    prescriptions = load_prescriptions(r"I:\Code Space\LLM Model Project\RAG\medbot\Data\prescriptions.csv")
-    alerts = load_alerts(r"I:\Code Space\LLM Model Project\RAG\medbot\Data\alerts.csv")
-    indices = load_diabetic_indices(r"I:\Code Space\LLM Model Project\RAG\medbot\Data\diabetic_indices.csv")
-    encounters = load_encounters(r"I:\Code Space\LLM Model Project\RAG\medbot\Data\encounter_history.csv")
-    immunizations = load_immunizations(r"I:\Code Space\LLM Model Project\RAG\medbot\Data\immunizations.csv")
-
-    # Step 3: Combine documents
+    # Data, index and LLM modules are imported only after login, so the
+    # login prompt comes up without waiting for pandas, Chroma or OpenAI
+    from src.medbot.data_loader import (
+        load_tables,
+        ingestion_report,
+        combine_patient_documents,
+        patient_fingerprints
+    )
+    from src.medbot.helper import (
+        create_chroma_vectorstore,
+        create_patient_retriever,
+        create_chat_openai_llm,
+        create_retrieval_qa_chain,
+    )
+    from src.medbot.cohort import CohortIndex
+    from src.medbot.answer_cache import AnswerCache
+    from src.medbot.store_index import create_embedder, hash_documents
+
+    # Step 2: Load data (all eight tables concurrently, with their declared schemas)
+    tables = load_tables(r"I:\Code Space\LLM Model Project\RAG\medbot\Data")
+    for line in ingestion_report(tables):
+        print(line)
+    patients, diagnoses, medications, prescriptions, alerts, indices, encounters, immunizations = tables
+
+    # Step 3: Combine documents, one per (patient, section) so each role's
+    # retriever can be restricted to the sections it may see
     documents = combine_patient_documents(
+        patients, diagnoses, medications, prescriptions,
+        alerts, indices, encounters, immunizations,
+        chunking="section"
+    )
+
+    fingerprints = patient_fingerprints(
         patients, diagnoses, medications, prescriptions,
         alerts, indices, encounters, immunizations
     )
 
     # Step 4: Build vectorstore, retriever, LLM, and RAG chain
-    vectorstore = create_chroma_vectorstore(documents)
-    retriever = vectorstore.as_retriever()
+    vectorstore = create_chroma_vectorstore(
+        documents, persist_directory=r"I:\Code Space\LLM Model Project\RAG\medbot\chroma_index_sections",
+        fingerprints=fingerprints
+    )
+    retriever = create_patient_retriever(vectorstore, documents, sections=role_sections(role))
     llm = create_chat_openai_llm()
     qa_chain = create_retrieval_qa_chain(llm, retriever)
 
+    # Structured index for "list/count all patients with X" questions
+    cohort_index = CohortIndex.from_dataframes(
+        patients, diagnoses, medications, prescriptions,
+        alerts, indices, encounters, immunizations
+    )
+
+    # Repeated (or near-duplicate) questions are answered from this cache
+    # until the patient documents change
+    answer_cache = AnswerCache(
+        embedder=create_embedder(), similarity_threshold=0.95,
+        data_version=hash_documents(documents)
+    )
+
     # Step 5: Create RAG LangGraph Agent for the role
-    rag_agent = create_langgraph_agent(qa_chain, role)
+    rag_agent = create_langgraph_agent(qa_chain, role, cohort_index=cohort_index, answer_cache=answer_cache)
 
     print("\n=== HOSPITAL ASSISTANT ===")
-    print("Type 'exit' to quit. Supervisors can type 'auditlog' to view audit.")
-    chat_history = []
+    print("Type 'exit' to quit. Supervisors can type 'auditlog [critical] [user=<name>] [role=<role>] [page=<n>]' to view audit or 'cachestats' for answer cache metrics.")
+    # Last few turns verbatim, older ones folded into a token-bounded summary
+    memory = ConversationMemory(summarizer=llm, max_recent_turns=4, summary_token_budget=400)
+    session = ChatSession(username, role, rag_agent, memory=memory, answer_cache=answer_cache)
+    # Time-to-first-token and total latency of every streamed turn
+    turn_timings = []
     # Step 6: Chat loop
     while True:
         query = input("\nYour question: ").strip()
@@ -82,39 +112,35 @@ def main():
             print("Goodbye.")
             break
 
-        if role == "Supervisor" and query.lower() == "auditlog":
-            view_audit_log()
+        # Supervisor commands, e.g. "auditlog critical user=nurse1 role=Nurse page=2"
+        command = session.command(query)
+        if command is not None:
+            if command["kind"] == "auditlog":
+                view_audit_log(**command["filters"])
+            else:
+                print(command["stats"])
             continue
 
-        # Permissions/Criticality Check
-        allowed = check_permission(role, query)
-        criticality = classify_query_criticality(query)
-
-        if not allowed:
-            print("Access denied: You do not have permission to access this information.")
-            log_event(username, role, f"Denied query: {query}", critical=False)
+        # Permissions/Criticality Check (one pass over the query)
+        policy = session.check(query)
+        if not policy["allowed"]:
+            print(DENIED_ANSWER)
             continue
-
-        if criticality == "Critical":
+        if policy["critical"]:
             print("This query is marked as CRITICAL and will be logged for supervisor review.")
-            log_event(username, role, f"Critical query: {query}", critical=True)
-
-        initial_state = {
-            "messages": [HumanMessage(content=query)],
-
-        }
-
-        chat_history.append(HumanMessage(content=query))
-        initial_state = {"messages": chat_history.copy()}
-        result = rag_agent.invoke(initial_state)
-        # Find the last LLM (AI) message to display
-        # (may need to search backwards if multiple tool calls)
-        for msg in reversed(result["messages"]):
-            if hasattr(msg, "content"):
-                print("\nANSWER:")
-                print(msg.content)
-                chat_history.append(msg)
-                break
+
+        print("\nANSWER:")
+        if STREAM_ANSWERS:
+            turn = session.answer(query, on_token=print_token)
+            turn_timings.append(turn["timings"])
+            print(f"\n(first token after {turn['timings']['ttft_seconds']:.2f}s, "
+                  f"total {turn['timings']['total_seconds']:.2f}s)")
+        else:
+            turn = session.answer(query)
+            print(turn["answer"])
+        stats = turn["memory"]
+        print(f"(history {stats['context_tokens']} tokens, summary {stats['summary_tokens']} tokens, "
+              f"summarization overhead {stats['summarization_tokens']} tokens / {stats['summarization_seconds']:.2f}s)")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,83 @@
+"""
+Agent load test: N concurrent chat sessions driven in-process through the
+compiled agent graphs (hospital_agents.create_langgraph_agent), with the
+offline fake chat model (src/medbot/fake_llm.py) instead of OpenAI.
+
+Sessions are spread round-robin over the roles and ask --turns prompts each
+(from --prompts-file, default test_queries.txt). Reported: throughput, turn
+latency and p50/p95/p99 latency of every graph node ("node:llm",
+"node:retriever_agent"), tool and model call ("model:<node>").
+
+--latency and --tokens-per-second shape the fake model's timing (wait before
+the first token, generation rate), so concurrency effects show up as they
+would against a remote model. Retrieval is BM25 over the section documents.
+
+Usage:
+    python -m benchmarks.bench_agent_load
+    python -m benchmarks.bench_agent_load --sessions 200 --concurrency 50 --latency 0.5 --tokens-per-second 40
+    python -m benchmarks.bench_agent_load --patients 100000 --output results/load.json
+"""
+import argparse
+import json
+import os
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=None, help="sessions at a time (default: all)")
+    parser.add_argument("--turns", type=int, default=3, help="questions per session")
+    parser.add_argument("--latency", type=float, default=0.3, help="fake model seconds before first token")
+    parser.add_argument("--tokens-per-second", type=float, default=50.0, help="fake model generation rate")
+    parser.add_argument("--data-dir", default=os.path.join(ROOT, "Data"))
+    parser.add_argument("--patients", type=int, default=None,
+                        help="use this many synthetic patients instead of --data-dir")
+    parser.add_argument("--roles", nargs="+", default=None)
+    parser.add_argument("--answer-cache", action="store_true", help="serve repeated questions from the answer cache")
+    parser.add_argument("--prompts-file", default=os.path.join(ROOT, "test_queries.txt"))
+    parser.add_argument("--output", default=None, help="also write the results as JSON")
+    args = parser.parse_args()
+
+    from src.medbot.data_loader import load_tables
+    from src.medbot.fake_llm import FakeToolCallingChatModel
+    from src.medbot.load_test import build_offline_agents, run_sessions
+
+    if args.patients:
+        from src.medbot.synthetic_data import generate_tables
+        tables = generate_tables(args.patients)
+    else:
+        tables = load_tables(args.data_dir)
+    prompts = None
+    if args.prompts_file and os.path.exists(args.prompts_file):
+        with open(args.prompts_file, "r", encoding="utf-8") as f:
+            prompts = [line.strip() for line in f if line.strip()]
+
+    llm = FakeToolCallingChatModel(latency=args.latency, tokens_per_second=args.tokens_per_second)
+    start = time.perf_counter()
+    agents = build_offline_agents(tables, llm, roles=args.roles, answer_cache=args.answer_cache)
+    print(f"Built {len(agents)} agents in {time.perf_counter() - start:.2f}s")
+
+    result = run_sessions(agents, args.sessions, turns=args.turns, concurrency=args.concurrency, prompts=prompts)
+
+    print(f"\n{result['sessions']} sessions, {result['turns']} turns in {result['wall_seconds']:.2f}s: "
+          f"{result['turns_per_second']} turns/s, {result['output_tokens_per_second']} output tokens/s")
+    print(f"\n{'span':<28} {'count':>6} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    rows = ([("turn", result["turn"])] if result["turn"] else []) + list(result["nodes"].items())
+    for label, stats in rows:
+        print(f"{label:<28} {stats['count']:>6} {stats['mean_ms']:>9.1f} {stats['p50_ms']:>9.1f} "
+              f"{stats['p95_ms']:>9.1f} {stats['p99_ms']:>9.1f}")
+    for error in result["errors"][:10]:
+        print(f"  error: {error}")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"settings": vars(args), **result}, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Benchmark: grouped document builder vs. the per-patient iterrows combiner.
+
+Usage:
+    python -m benchmarks.bench_combine_documents
+    python -m benchmarks.bench_combine_documents --sizes 1000 100000 1000000
+    python -m benchmarks.bench_combine_documents --legacy-max 100000   # slow!
+
+The iterrows combiner is O(patients x rows), so by default it is only timed
+up to --legacy-max patients; larger sizes report it as skipped.
+"""
+import argparse
+import time
+
+from src.medbot.data_loader import build_patient_documents, combine_patient_documents_iterrows
+from src.medbot.synthetic_data import generate_tables
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--legacy-max", type=int, default=1_000)
+    args = parser.parse_args()
+
+    print(f"{'patients':>10} | {'iterrows (s)':>12} | {'grouped (s)':>11}")
+    for size in args.sizes:
+        tables = generate_tables(size)
+        grouped, grouped_s = timed(build_patient_documents, *tables)
+
+        if size <= args.legacy_max:
+            legacy, legacy_s = timed(combine_patient_documents_iterrows, *tables)
+            assert [d.page_content for d in legacy] == [d.page_content for d in grouped]
+            legacy_col = f"{legacy_s:12.2f}"
+        else:
+            legacy_col = f"{'skipped':>12}"
+        print(f"{size:>10} | {legacy_col} | {grouped_s:11.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark: dense-only vs. hybrid (BM25 + dense, RRF) retrieval on Data/.
+
+Queries are generated from exact clinical terms in the data (drug names,
+alerts, facilities, diagnoses). A document is relevant to a query when it
+contains the term, so recall@k measures how many of the k slots go to
+patients that really have it.
+
+Usage:
+    python -m benchmarks.bench_hybrid_retrieval
+    python -m benchmarks.bench_hybrid_retrieval --k 5 --lexical-weight 1 --dense-weight 1
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+import pandas as pd
+
+from src.medbot.data_loader import (
+    load_patient_details, load_diagnosis, load_medications, load_prescriptions,
+    load_alerts, load_diabetic_indices, load_encounters, load_immunizations,
+    combine_patient_documents,
+)
+from src.medbot.retrievers import HybridRetriever
+from src.medbot.store_index import create_faiss_vectorstore
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Data")
+
+# (CSV, column, query template)
+QUERY_SOURCES = [
+    ("prescriptions.csv", "Prescription", "Which patients are prescribed {}?"),
+    ("medications.csv", "Medication", "Who was given {}?"),
+    ("alerts.csv", "Alert", "Patients with the alert {}"),
+    ("encounter_history.csv", "Facility", "Encounters at {}"),
+    ("diagnosis.csv", "Diagnosis", "Patients diagnosed with {}"),
+]
+
+
+def load_documents():
+    return combine_patient_documents(
+        load_patient_details(os.path.join(DATA_DIR, "patient_details.csv")),
+        load_diagnosis(os.path.join(DATA_DIR, "diagnosis.csv")),
+        load_medications(os.path.join(DATA_DIR, "medications.csv")),
+        load_prescriptions(os.path.join(DATA_DIR, "prescriptions.csv")),
+        load_alerts(os.path.join(DATA_DIR, "alerts.csv")),
+        load_diabetic_indices(os.path.join(DATA_DIR, "diabetic_indices.csv")),
+        load_encounters(os.path.join(DATA_DIR, "encounter_history.csv")),
+        load_immunizations(os.path.join(DATA_DIR, "immunizations.csv")),
+    )
+
+
+def build_queries(documents):
+    queries = []
+    for filename, column, template in QUERY_SOURCES:
+        for term in sorted(pd.read_csv(os.path.join(DATA_DIR, filename))[column].dropna().unique()):
+            relevant = {d.metadata["PatientID"] for d in documents if term in d.page_content}
+            queries.append((template.format(term), relevant))
+    return queries
+
+
+def evaluate(retriever, queries, k):
+    latencies, recalls = [], []
+    for query, relevant in queries:
+        start = time.perf_counter()
+        docs = retriever.invoke(query)[:k]
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits = sum(1 for d in docs if d.metadata["PatientID"] in relevant)
+        recalls.append(hits / min(k, len(relevant)) if relevant else 1.0)
+    latencies.sort()
+    return {
+        "recall@k": statistics.mean(recalls),
+        "p50_ms": latencies[len(latencies) // 2],
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--lexical-weight", type=float, default=1.0)
+    parser.add_argument("--dense-weight", type=float, default=1.0)
+    args = parser.parse_args()
+
+    documents = load_documents()
+    queries = build_queries(documents)
+    vectorstore = create_faiss_vectorstore(documents, persist_directory=os.path.join(tempfile.gettempdir(), "medbot_bench_faiss"))
+
+    dense = vectorstore.as_retriever(search_kwargs={"k": args.k})
+    hybrid = HybridRetriever.from_documents(
+        documents, dense=vectorstore.as_retriever(),
+        lexical_weight=args.lexical_weight, dense_weight=args.dense_weight,
+        search_kwargs={"k": args.k},
+    )
+
+    print(f"{len(queries)} queries over {len(documents)} patient documents, k={args.k}")
+    print(f"{'retriever':>10} | {'recall@k':>8} | {'p50 ms':>7} | {'p95 ms':>7}")
+    for name, retriever in [("dense", dense), ("hybrid", hybrid)]:
+        result = evaluate(retriever, queries, args.k)
+        print(f"{name:>10} | {result['recall@k']:8.3f} | {result['p50_ms']:7.2f} | {result['p95_ms']:7.2f}")
+
+
+if __name__ == "__main__":
+    main()
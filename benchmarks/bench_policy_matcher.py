@@ -0,0 +1,75 @@
+"""
+Microbenchmark: PolicyMatcher vs. the original keyword scans.
+
+The legacy path lowercases the query per term and tests each field and
+critical keyword with `in` (as check_permission and
+classify_query_criticality used to). Vocabularies are synthetic one- to
+three-word terms; queries are ~25 words with a few embedded terms.
+
+Usage:
+    python -m benchmarks.bench_policy_matcher
+    python -m benchmarks.bench_policy_matcher --terms 10000 --queries 2000
+"""
+import argparse
+import random
+import string
+import time
+
+from src.medbot.policy import PolicyMatcher
+
+
+def make_vocabulary(n, rng):
+    words = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 9))) for _ in range(n // 2 + 50)]
+    terms = set()
+    while len(terms) < n:
+        terms.add(" ".join(rng.sample(words, rng.randint(1, 3))))
+    return sorted(terms), words
+
+
+def make_queries(n, fields, keywords, words, rng):
+    queries = []
+    for _ in range(n):
+        parts = rng.choices(words, k=22) + rng.sample(fields, 2) + rng.sample(keywords, 1)
+        rng.shuffle(parts)
+        queries.append(" ".join(parts))
+    return queries
+
+
+def legacy(query, fields, keywords):
+    matched = [f for f in fields if f.lower() in query.lower()]
+    critical = any(k in query.lower() for k in keywords)
+    return matched, critical
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--terms", type=int, default=10_000, help="size of each vocabulary")
+    parser.add_argument("--queries", type=int, default=1_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    fields, words = make_vocabulary(args.terms, rng)
+    keywords, _ = make_vocabulary(args.terms, random.Random(args.seed + 1))
+    queries = make_queries(args.queries, fields, keywords, words, rng)
+
+    start = time.perf_counter()
+    matcher = PolicyMatcher(fields, keywords)
+    compile_ms = (time.perf_counter() - start) * 1000
+
+    print(f"{args.terms} fields + {args.terms} critical keywords, {args.queries} queries "
+          f"(matcher compile: {compile_ms:.1f} ms)")
+    print(f"{'matcher':>10} | {'us/query':>10}")
+    for name, run in [
+        ("legacy", lambda q: legacy(q, fields, keywords)),
+        ("compiled", matcher.match),
+    ]:
+        start = time.perf_counter()
+        for query in queries:
+            run(query)
+        per_query_us = (time.perf_counter() - start) / len(queries) * 1e6
+        print(f"{name:>10} | {per_query_us:10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,339 @@
+"""
+Scale benchmark: time and memory of every pipeline stage on synthetic data.
+
+For each patient count, a dataset with the Data/ schemas is generated (see
+src/medbot/synthetic_data.py) and these stages are run:
+    generate        write the eight CSVs
+    load_csv        load_tables with snapshots off (full parse)
+    snapshot_write  parse once more and write the columnar snapshots
+    load_snapshot   load_tables from the snapshots
+    combine         combine_patient_documents(chunking="section")
+    embed           embed up to --max-embed-docs section documents, in
+                    length-sorted batches of --embed-batch-size over
+                    --embed-workers processes (see src/medbot/batch_embedding.py)
+    index_build     stream those documents into the vector store
+    retriever_build create_patient_retriever (PatientID map + BM25)
+    query           --queries retrievals, patient-ID and free-text mixed
+
+Each stage records wall time and resident memory (before, peak during and
+after, sampled every few milliseconds). Results are written as JSON to
+--output, together with the run's settings and environment.
+
+The default embedder (MiniLM) and backend (Chroma) need langchain_huggingface
+and chromadb. "--embedder fake --backend memory" uses langchain_core's
+deterministic fake embedding and in-memory vector store; it measures
+everything except model inference. A stage that fails (e.g. a missing
+backend) is recorded with its error, and the stages depending on it are skipped.
+
+Usage:
+    python -m benchmarks.bench_scale
+    python -m benchmarks.bench_scale --sizes 1000 10000 100000 1000000 --embedder fake --backend memory
+    python -m benchmarks.bench_scale --sizes 1000 --output results/scale.json
+    python -m benchmarks.bench_scale --sizes 100000 --embed-batch-size 128 --embed-workers 4
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+
+
+class MemorySampler:
+    """
+    Resident set size of this process before, at its peak during and after a
+    block. Reads /proc/self/statm (Linux) from a background thread; elsewhere
+    only the process-lifetime peak from getrusage is available.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.before = self.peak = self.after = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def rss_bytes():
+        try:
+            with open("/proc/self/statm", "r") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError, AttributeError):
+            import resource
+            scale = 1 if sys.platform == "darwin" else 1024
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, self.rss_bytes())
+
+    def __enter__(self):
+        self.before = self.peak = self.rss_bytes()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.after = self.rss_bytes()
+        self.peak = max(self.peak, self.after)
+        return False
+
+    def as_dict(self):
+        mb = 2 ** 20
+        return {
+            "rss_before_mb": round(self.before / mb, 1),
+            "rss_peak_mb": round(self.peak / mb, 1),
+            "rss_after_mb": round(self.after / mb, 1),
+            "rss_peak_delta_mb": round((self.peak - self.before) / mb, 1),
+        }
+
+
+def run_stage(results, patients, stage, fn):
+    """
+    Run fn() under the timer and memory sampler and append its record.
+    fn returns (value, extra metrics dict). Returns the value, or None if fn raised.
+    """
+    record = {"patients": patients, "stage": stage}
+    value = None
+    with MemorySampler() as memory:
+        start = time.perf_counter()
+        try:
+            value, extra = fn()
+            record.update(extra)
+            record["status"] = "ok"
+        except Exception as e:
+            record["status"] = "error"
+            record["error"] = f"{type(e).__name__}: {e}"
+        record["seconds"] = round(time.perf_counter() - start, 4)
+    record.update(memory.as_dict())
+    results.append(record)
+    detail = record.get("error", ", ".join(f"{k}={v}" for k, v in record.items()
+                                           if k not in ("patients", "stage", "status", "seconds")
+                                           and not k.startswith("rss_")))
+    print(f"{patients:>9} {stage:<16} {record['seconds']:>9.3f}s {record['rss_peak_delta_mb']:>9.1f} MB  {detail}")
+    return value
+
+
+def skip_stage(results, patients, stage, reason):
+    results.append({"patients": patients, "stage": stage, "status": "skipped", "reason": reason})
+    print(f"{patients:>9} {stage:<16} {'skipped':>10} ({reason})")
+
+
+def create_benchmark_embedder(name, cache_dir, batch_size, workers):
+    if name == "fake":
+        from functools import partial
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+        from src.medbot.batch_embedding import BatchedEmbeddings
+        return BatchedEmbeddings(partial(DeterministicFakeEmbedding, size=384), batch_size=batch_size, workers=workers)
+    # Cached, so index_build re-reads the vectors embed computed instead of
+    # running the model twice
+    from src.medbot.store_index import create_embedder
+    return create_embedder(name, cache_dir=cache_dir, batch_size=batch_size, workers=workers)
+
+
+def build_vectorstore(backend, documents, embedder, directory, chunk_size):
+    from src.medbot.batch_embedding import stream_documents
+
+    if backend == "memory":
+        from langchain_core.vectorstores import InMemoryVectorStore
+        return stream_documents(documents, vectorstore=InMemoryVectorStore(embedder), chunk_size=chunk_size)
+    if backend == "faiss":
+        from langchain_community.vectorstores import FAISS
+        create = lambda docs, ids: FAISS.from_documents(docs, embedding=embedder)
+    else:
+        from langchain_community.vectorstores import Chroma
+        create = lambda docs, ids: Chroma.from_documents(docs, embedding=embedder, persist_directory=directory)
+    return stream_documents(documents, create=create, chunk_size=chunk_size)
+
+
+def make_queries(documents, n):
+    """
+    Alternate patient-ID questions (answered by the PatientID map) and
+    free-text clinical questions (answered by BM25 + vector search).
+    """
+    from src.medbot.synthetic_data import ALERTS, DIAGNOSES, MEDICATIONS
+
+    patient_ids = sorted({doc.metadata["PatientID"] for doc in documents})
+    terms = [f"Which patients have {d}?" for d in DIAGNOSES] + [f"Who takes {m}?" for m in MEDICATIONS] \
+        + [f"Patients with the alert {a}" for a in ALERTS]
+    queries = []
+    for i in range(n):
+        if i % 2 == 0:
+            queries.append(f"What medications is {patient_ids[(i * 7919) % len(patient_ids)]} on?")
+        else:
+            queries.append(terms[(i // 2) % len(terms)])
+    return queries
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_size(results, patients, args, work_dir):
+    from src.medbot import snapshot
+    from src.medbot.batch_embedding import stream_chunk_size
+    from src.medbot.data_loader import combine_patient_documents, load_tables
+    from src.medbot.synthetic_data import write_dataset
+
+    data_dir = os.path.join(work_dir, f"data_{patients}")
+    snapshot_dir = os.path.join(work_dir, f"snapshot_{patients}")
+    os.environ[snapshot.DIR_ENV] = snapshot_dir
+
+    def generate():
+        rows = write_dataset(data_dir, patients, seed=args.seed)
+        return None, {"rows": sum(rows.values())}
+    run_stage(results, patients, "generate", generate)
+
+    def load(enabled):
+        def stage():
+            os.environ[snapshot.ENABLED_ENV] = "1" if enabled else "0"
+            tables = load_tables(data_dir, workers=args.load_workers)
+            return tables, {"rows": sum(len(df) for df in tables),
+                            "from_snapshot": all(df.attrs.get("from_snapshot") for df in tables)}
+        return stage
+
+    tables = run_stage(results, patients, "load_csv", load(False))
+    shutil.rmtree(snapshot_dir, ignore_errors=True)
+    run_stage(results, patients, "snapshot_write", load(True))
+    snapshot_tables = run_stage(results, patients, "load_snapshot", load(True))
+    tables = snapshot_tables if snapshot_tables is not None else tables
+    if tables is None:
+        for stage in ("combine", "embed", "index_build", "retriever_build", "query"):
+            skip_stage(results, patients, stage, "load failed")
+        return
+
+    def combine():
+        documents = combine_patient_documents(*tables, chunking="section")
+        return documents, {"documents": len(documents)}
+    documents = run_stage(results, patients, "combine", combine)
+    del tables, snapshot_tables
+    if documents is None:
+        for stage in ("embed", "index_build", "retriever_build", "query"):
+            skip_stage(results, patients, stage, "combine failed")
+        return
+
+    subset = documents[:args.max_embed_docs]
+    del documents
+
+    def embed():
+        model = create_benchmark_embedder(args.embedder, os.path.join(work_dir, "embedding_cache"),
+                                          args.embed_batch_size, args.embed_workers)
+        start = time.perf_counter()
+        model.embed_documents([doc.page_content for doc in subset])
+        seconds = time.perf_counter() - start
+        return model, {"documents": len(subset), "docs_per_second": round(len(subset) / max(seconds, 1e-9), 1),
+                       "batch_size": args.embed_batch_size, "workers": args.embed_workers}
+    embedder = run_stage(results, patients, "embed", embed)
+
+    if embedder is None:
+        for stage in ("index_build", "retriever_build", "query"):
+            skip_stage(results, patients, stage, "embed failed")
+        return
+
+    vectorstore = run_stage(
+        results, patients, "index_build",
+        lambda: (build_vectorstore(args.backend, subset, embedder, os.path.join(work_dir, f"index_{patients}"),
+                                   stream_chunk_size(args.embed_batch_size, args.embed_workers)),
+                 {"documents": len(subset), "backend": args.backend})
+    )
+    if vectorstore is None:
+        for stage in ("retriever_build", "query"):
+            skip_stage(results, patients, stage, "index_build failed")
+        return
+
+    def retriever_build():
+        from src.medbot.helper import create_patient_retriever
+        return create_patient_retriever(vectorstore, subset), {"documents": len(subset)}
+    retriever = run_stage(results, patients, "retriever_build", retriever_build)
+    if retriever is None:
+        skip_stage(results, patients, "query", "retriever_build failed")
+        return
+
+    def query():
+        latencies = []
+        for text in make_queries(subset, args.queries):
+            start = time.perf_counter()
+            retriever.invoke(text)
+            latencies.append(time.perf_counter() - start)
+        latencies.sort()
+        return None, {
+            "queries": len(latencies),
+            "mean_ms": round(statistics.fmean(latencies) * 1000, 2),
+            "p50_ms": round(latencies[len(latencies) // 2] * 1000, 2),
+            "p95_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 2),
+        }
+    run_stage(results, patients, "query", query)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="patient counts")
+    parser.add_argument("--embedder", default="all-MiniLM-L6-v2",
+                        help="HuggingFace model name, or 'fake' for langchain_core's DeterministicFakeEmbedding")
+    parser.add_argument("--backend", choices=["chroma", "faiss", "memory"], default="chroma")
+    parser.add_argument("--max-embed-docs", type=int, default=20_000,
+                        help="section documents embedded and indexed per size")
+    parser.add_argument("--embed-batch-size", type=int, default=64, help="documents per embedding batch")
+    parser.add_argument("--embed-workers", type=int, default=0,
+                        help="embedding worker processes (0: embed in the benchmark process)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--load-workers", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--work-dir", help="keep generated data here (default: a temporary directory)")
+    parser.add_argument("--output", default=None,
+                        help="results JSON (default: benchmarks/results/scale-<UTC time>.json)")
+    args = parser.parse_args()
+
+    started = datetime.datetime.now(datetime.timezone.utc)
+    output = args.output or os.path.join(ROOT, "benchmarks", "results",
+                                         f"scale-{started.strftime('%Y%m%dT%H%M%SZ')}.json")
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="medbot_scale_")
+    os.makedirs(work_dir, exist_ok=True)
+
+    import numpy as np
+    import pandas as pd
+
+    run = {
+        "benchmark": "scale",
+        "started": started.isoformat(timespec="seconds"),
+        "git_commit": git_commit(),
+        "settings": {k: v for k, v in vars(args).items() if k not in ("output", "work_dir")},
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+        },
+        "results": [],
+    }
+    print(f"{'patients':>9} {'stage':<16} {'time':>10} {'peak +RSS':>12}")
+    try:
+        for size in args.sizes:
+            run_size(run["results"], size, args, work_dir)
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(run, f, indent=2)
+        print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark: cost of starting a chat session.
+
+"per-session" is the old path - every login builds its own tools, ChatOpenAI
+client and StateGraph and compiles it. "registry" takes the role's graph
+from an AgentRegistry, compiled once and shared with one LLM client.
+
+Only construction is timed, so no OpenAI requests are made (a placeholder
+API key is used if none is set) and the QA chain is never invoked.
+
+Usage:
+    python -m benchmarks.bench_session_creation
+    python -m benchmarks.bench_session_creation --sessions 500
+"""
+import argparse
+import os
+import statistics
+import time
+
+import pandas as pd
+from langchain_core.runnables import RunnableLambda
+
+from src.medbot.cohort import CohortIndex
+from src.medbot.helper import create_chat_openai_llm
+from src.medbot.hospital_agents import AgentRegistry, ROLE_PERMISSIONS, create_langgraph_agent
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Data")
+TABLE_FILES = [
+    "patient_details.csv", "diagnosis.csv", "medications.csv", "prescriptions.csv",
+    "alerts.csv", "diabetic_indices.csv", "encounter_history.csv", "immunizations.csv",
+]
+
+
+def summarize(samples):
+    samples = sorted(samples)
+    return {
+        "mean_ms": statistics.mean(samples),
+        "p50_ms": samples[len(samples) // 2],
+        "p95_ms": samples[max(0, int(len(samples) * 0.95) - 1)],
+    }
+
+
+def time_sessions(create_session, roles, n):
+    samples = []
+    for i in range(n):
+        start = time.perf_counter()
+        create_session(roles[i % len(roles)])
+        samples.append((time.perf_counter() - start) * 1000)
+    return summarize(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=200)
+    args = parser.parse_args()
+
+    os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark-placeholder")
+    cohort_index = CohortIndex.from_dataframes(*[pd.read_csv(os.path.join(DATA_DIR, f)) for f in TABLE_FILES])
+    qa_chain = RunnableLambda(lambda inputs: {"result": ""})
+    roles = list(ROLE_PERMISSIONS)
+
+    def per_session(role):
+        return create_langgraph_agent(
+            qa_chain, role, cohort_index=cohort_index, llm=create_chat_openai_llm(shared=False)
+        )
+
+    registry = AgentRegistry(lambda role: qa_chain, cohort_index=cohort_index)
+    start = time.perf_counter()
+    registry.warm()
+    warm_ms = (time.perf_counter() - start) * 1000
+
+    print(f"{args.sessions} sessions over roles {', '.join(roles)} (registry warm-up: {warm_ms:.1f} ms)")
+    print(f"{'strategy':>12} | {'mean ms':>8} | {'p50 ms':>8} | {'p95 ms':>8}")
+    for name, create_session in [("per-session", per_session), ("registry", registry.get)]:
+        result = time_sessions(create_session, roles, args.sessions)
+        print(f"{name:>12} | {result['mean_ms']:8.3f} | {result['p50_ms']:8.3f} | {result['p95_ms']:8.3f}")
+
+
+if __name__ == "__main__":
+    main()
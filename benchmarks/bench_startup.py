@@ -0,0 +1,93 @@
+"""
+Startup benchmark: how long importing each entry point takes in a fresh
+interpreter, and which packages that time goes to.
+
+Every target is imported in its own `python -X importtime` subprocess
+(run --repeat times; the median is reported). The per-package table sums
+the self time of every module under a top-level package, so heavy backends
+(pandas, langchain_openai, chromadb, ...) stand out.
+
+The graph_test scripts build their graphs on first use (get_graph()), so
+importing them compiles no graph and opens no database; app and server are
+imported without running main().
+
+Usage:
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --targets app src.medbot.helper --top 15
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_TARGETS = [
+    "src.medbot.store_index", "src.medbot.helper", "src.medbot.pipeline",
+    "src.medbot.hospital_agents", "app", "server",
+    "graph_test", "graph_test_sysprompt", "graph_test_sys_rag",
+]
+
+_IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def measure(target):
+    """
+    Import target once in a fresh interpreter.
+
+    Returns:
+        (wall_seconds, {module: (self_us, cumulative_us, depth)}) or None if the import failed.
+    """
+    code = f"import time; t = time.perf_counter(); import {target}; print(time.perf_counter() - t)"
+    env = dict(os.environ, PYTHONWARNINGS="ignore")
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            cwd=ROOT, capture_output=True, text=True, env=env)
+    if result.returncode != 0:
+        error = result.stderr.strip().splitlines()[-1:] or ["unknown error"]
+        print(f"  {target}: import failed ({error[0]})")
+        return None
+    modules = {}
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            modules[name] = (int(self_us), int(cumulative_us), len(indent) // 2)
+    return float(result.stdout.strip().splitlines()[-1]), modules
+
+
+def by_package(modules):
+    totals = defaultdict(int)
+    for name, (self_us, _, _) in modules.items():
+        totals[name.split(".")[0]] += self_us
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--targets", nargs="+", default=DEFAULT_TARGETS, help="modules to import")
+    parser.add_argument("--repeat", type=int, default=3, help="fresh imports per target")
+    parser.add_argument("--top", type=int, default=8, help="packages to list per target")
+    args = parser.parse_args()
+
+    print(f"{'target':<28} {'median s':>9} {'min s':>7} {'modules':>8}")
+    details = {}
+    for target in args.targets:
+        runs = [measure(target) for _ in range(args.repeat)]
+        runs = [run for run in runs if run is not None]
+        if not runs:
+            continue
+        walls = [wall for wall, _ in runs]
+        details[target] = runs[-1][1]
+        print(f"{target:<28} {statistics.median(walls):>9.3f} {min(walls):>7.3f} {len(runs[-1][1]):>8}")
+
+    for target, modules in details.items():
+        print(f"\n{target}: import time by top-level package (self time, ms)")
+        for package, self_us in by_package(modules)[:args.top]:
+            print(f"  {package:<32} {self_us / 1000:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,63 +1,92 @@
-import subprocess
-import time
-
-# Use poetry run for poetry-managed venv
-AGENTS = [
-    # For app.py, provide user & pass (adjust for your test users)
-    ("app.py", ["poetry", "run", "python", "app.py", "nurse1", "1"]),
-    ("graph_test.py", ["poetry", "run", "python", "graph_test.py"]),
-    ("graph_test_sysprompt.py", ["poetry", "run", "python", "graph_test_sysprompt.py"]),
-    ("graph_test_sys_rag.py", ["poetry", "run", "python", "graph_test_sys_rag.py"]),
-]
-
-#ROLES = ["Nurse", "Pharmacist", "Doctor", "Supervisor"]
+"""
+Print every entry point's answer to each query in test_queries.txt, per role.
+
+All four entry points - app.py's chat session and the graph_test*.py graphs -
+run in this process on one offline stack (pipeline.OfflinePipeline over
+Data/: BM25 retrieval and the fake tool-calling LLM), so no API key, model
+download or subprocess is needed and the answers are reproducible.
+
+Usage:
+    python compare_results.py
+    python compare_results.py --roles Nurse Doctor --queries my_queries.txt
+"""
+import argparse
+import importlib
+import os
+import tempfile
+import uuid
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Data")
+AGENTS = ["app.py", "graph_test.py", "graph_test_sysprompt.py", "graph_test_sys_rag.py"]
 ROLES = ["Nurse"]
 TEST_QUERIES_FILE = "test_queries.txt"
 
-def run_agent(agent_cmd, role, queries):
-    print(f"\n\n==== Running {' '.join(agent_cmd)} as {role} ====")
-    proc = subprocess.Popen(
-        agent_cmd,
-        stdin=subprocess.PIPE,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.STDOUT,
-        text=True,
-        bufsize=1
-    )
-    # For graph_test*.py, first thing is role. For app.py, not needed (handled by argv)
-    if "app.py" not in agent_cmd[3]:  # poetry run python app.py ...
-        proc.stdin.write(role + "\n")
-        proc.stdin.flush()
+
+def load_graph_scripts(pipeline):
+    """
+    The graph_test*.py modules with their Chroma/OpenAI stack replaced by
+    the pipeline's (every section is retrieved, as the Doctor's chain does).
+    """
+    modules = {}
+    for script in AGENTS[1:]:
+        module = importlib.import_module(script.removesuffix(".py"))
+        module.get_qa_chain = lambda: pipeline.qa_chain("Doctor")
+        if hasattr(module, "get_llm"):
+            module.get_llm = lambda: pipeline.llm
+        if hasattr(module, "get_answer_cache"):
+            module.get_answer_cache = lambda: pipeline.answer_cache
+        modules[script] = module
+    return modules
+
+
+def run_agent(agent, role, queries, pipeline, graph_scripts):
+    from langchain_core.messages import HumanMessage
+    from src.medbot.chat import ChatSession
+
+    answers = []
+    if agent == "app.py":
+        session = ChatSession(f"compare-{role.lower()}", role, pipeline.agent(role),
+                              answer_cache=pipeline.answer_cache)
+        for query in queries:
+            answers.append(session.ask(query)["answer"])
+        return answers
+    # As the script's chat loop sends it: one session, the new message plus the role
+    graph = graph_scripts[agent].get_graph()
+    config = {"configurable": {"thread_id": uuid.uuid4().hex}}
     for query in queries:
-        proc.stdin.write(query + "\n")
-        proc.stdin.flush()
-        time.sleep(0.2)  # Optional: tiny delay for UI/LLM stability
-    proc.stdin.write("exit\n")
-    proc.stdin.flush()
-    # Gather output
-    output = []
-    try:
-        while True:
-            line = proc.stdout.readline()
-            if not line:
-                break
-            output.append(line.rstrip())
-    except Exception as e:
-        print("Error:", e)
-    proc.wait(timeout=30)
-    return "\n".join(output)
+        state = graph.invoke({"messages": [HumanMessage(content=query)], "role": role,
+                              "permission_granted": False}, config=config)
+        answers.append(state["messages"][-1].content)
+    return answers
+
 
 def main():
-    # Load queries from file
-    with open(TEST_QUERIES_FILE, "r", encoding="utf-8") as f:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--roles", nargs="+", default=ROLES)
+    parser.add_argument("--agents", nargs="+", default=AGENTS, choices=AGENTS)
+    parser.add_argument("--queries", default=TEST_QUERIES_FILE)
+    args = parser.parse_args()
+
+    # Sessions and audit events of this run are thrown away
+    scratch = tempfile.mkdtemp(prefix="medbot_compare_")
+    os.environ.setdefault("MEDBOT_SESSION_DB", os.path.join(scratch, "sessions.sqlite"))
+    os.environ.setdefault("MEDBOT_AUDIT_DB", os.path.join(scratch, "audit.sqlite"))
+
+    from src.medbot.pipeline import OfflinePipeline
+
+    with open(args.queries, "r", encoding="utf-8") as f:
         queries = [line.strip() for line in f if line.strip()]
-    for role in ROLES:
+    pipeline = OfflinePipeline(DATA_DIR).load()
+    graph_scripts = load_graph_scripts(pipeline)
+
+    for role in args.roles:
         print(f"\n========== RESULTS FOR ROLE: {role} ==========\n")
-        for agent_file, agent_cmd in AGENTS:
-            print(f"\n=== {agent_file} ({role}) ===\n")
-            output = run_agent(agent_cmd, role, queries)
-            print(output)
-            print("\n" + "="*70 + "\n")
+        for agent in args.agents:
+            print(f"\n=== {agent} ({role}) ===\n")
+            for query, answer in zip(queries, run_agent(agent, role, queries, pipeline, graph_scripts)):
+                print(f"You: {query}\nAssistant: {answer}\n")
+            print("\n" + "=" * 70 + "\n")
+
 
 if __name__ == "__main__":
     main()
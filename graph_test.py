@@ -1,3 +1,7 @@
+import sys
+import uuid
+from functools import lru_cache
+
 from dotenv import load_dotenv
 from typing import Annotated, List, Dict, Any
 from langgraph.graph import StateGraph, START, END
@@ -9,11 +13,13 @@ from typing_extensions import TypedDict
 from src.medbot.data_loader import (
     load_patient_details, load_diagnosis, load_medications, load_prescriptions,
     load_alerts, load_diabetic_indices, load_encounters, load_immunizations,
-    combine_patient_documents
+    combine_patient_documents, patient_fingerprints
 )
 from src.medbot.helper import (
-    create_chroma_vectorstore, create_chat_openai_llm, create_retrieval_qa_chain,
+    create_chroma_vectorstore, create_patient_retriever, create_chat_openai_llm, create_retrieval_qa_chain,
 )
+from src.medbot.streaming import emit_progress, stream_turn
+from src.medbot.checkpoint import SQLiteCheckpointSaver
 
 load_dotenv()
 
@@ -47,30 +53,42 @@ def permission_checker(state: AgentState) -> Dict[str, Any]:
                 break
 
     return {
-        "messages": state["messages"],
         "role": role,
         "permission_granted": permission
     }
 
-# 5. Initialize RAG Chain at Startup (before the chat loop!)
-print("Loading patient data and initializing RAG...")
-patients = load_patient_details(r"I:\Code Space\LLM Model Project\RAG\medbot\Data\patient_details.csv")
-diagnoses = load_diagnosis(r"I:\Code Space\LLM Model Project\RAG\medbot\Data\diagnosis.csv")
-medications = load_medications(r"I:\Code Space\LLM Model Project\RAG\medbot\Data\medications.csv")
-prescriptions = load_prescriptions(r"I:\Code Space\LLM Model Project\RAG\medbot\Data\prescriptions.csv")
-alerts = load_alerts(r"I:\Code Space\LLM Model Project\RAG\medbot\Data\alerts.csv")
-indices = load_diabetic_indices(r"I:\Code Space\LLM Model Project\RAG\medbot\Data\diabetic_indices.csv")
-encounters = load_encounters(r"I:\Code Space\LLM Model Project\RAG\medbot\Data\encounter_history.csv")
-immunizations = load_immunizations(r"I:\Code Space\LLM Model Project\RAG\medbot\Data\immunizations.csv")
-documents = combine_patient_documents(
-    patients, diagnoses, medications, prescriptions,
-    alerts, indices, encounters, immunizations
-)
-print(f"Loaded {len(documents)} patient documents.")
-vectorstore = create_chroma_vectorstore(documents)
-retriever = vectorstore.as_retriever()
-llm = create_chat_openai_llm()
-qa_chain = create_retrieval_qa_chain(llm, retriever)
+# 5. RAG chain, built on the first question instead of at startup
+@lru_cache(maxsize=None)
+def load_tables():
+    print("Loading patient data...")
+    return (
+        load_patient_details(r"I:\Code Space\LLM Model Project\RAG\medbot\Data\patient_details.csv"),
+        load_diagnosis(r"I:\Code Space\LLM Model Project\RAG\medbot\Data\diagnosis.csv"),
+        load_medications(r"I:\Code Space\LLM Model Project\RAG\medbot\Data\medications.csv"),
+        load_prescriptions(r"I:\Code Space\LLM Model Project\RAG\medbot\Data\prescriptions.csv"),
+        load_alerts(r"I:\Code Space\LLM Model Project\RAG\medbot\Data\alerts.csv"),
+        load_diabetic_indices(r"I:\Code Space\LLM Model Project\RAG\medbot\Data\diabetic_indices.csv"),
+        load_encounters(r"I:\Code Space\LLM Model Project\RAG\medbot\Data\encounter_history.csv"),
+        load_immunizations(r"I:\Code Space\LLM Model Project\RAG\medbot\Data\immunizations.csv"),
+    )
+
+@lru_cache(maxsize=None)
+def load_documents():
+    documents = combine_patient_documents(*load_tables())
+    print(f"Loaded {len(documents)} patient documents.")
+    return documents
+
+@lru_cache(maxsize=None)
+def get_qa_chain():
+    print("Initializing RAG...")
+    documents = load_documents()
+    vectorstore = create_chroma_vectorstore(
+        documents, persist_directory=r"I:\Code Space\LLM Model Project\RAG\medbot\chroma_index",
+        fingerprints=patient_fingerprints(*load_tables())
+    )
+    retriever = create_patient_retriever(vectorstore, documents)
+    llm = create_chat_openai_llm()
+    return create_retrieval_qa_chain(llm, retriever)
 
 # 6. RAG/LLM Node (use RAG, not direct LLM)
 def hospital_agent(state: AgentState) -> Dict[str, Any]:
@@ -81,13 +99,14 @@ def hospital_agent(state: AgentState) -> Dict[str, Any]:
     if not permission:
         response = f"Access denied: As a {role}, you do not have permission to access this information."
     else:
+        emit_progress("retrieving", query=last_message.content)
         # RAG: Only answer from the retrieved hospital records!
         # Add system prompt for LLM to focus on role (optional)
-        result = qa_chain.invoke({"query": last_message.content})
+        result = get_qa_chain().invoke({"query": last_message.content})
         response = result["result"]
 
     return {
-        "messages": state["messages"] + [HumanMessage(content=response)],
+        "messages": [HumanMessage(content=response)],
         "role": role,
         "permission_granted": permission
     }
@@ -99,17 +118,21 @@ graph_builder.add_node("hospital_agent", hospital_agent)
 graph_builder.add_edge(START, "permission_checker")
 graph_builder.add_edge("permission_checker", "hospital_agent")
 graph_builder.add_edge("hospital_agent", END)
-graph = graph_builder.compile()
+
+# Sessions (one thread per session ID) are checkpointed to SQLite and survive
+# restarts; the database is opened when the chat starts, not on import
+@lru_cache(maxsize=None)
+def get_graph():
+    return graph_builder.compile(checkpointer=SQLiteCheckpointSaver())
 
 # 8. Main Chat Loop
 def run_hospital_agent():
     print(" Hospital Assistant Chat (type 'exit' to quit)")
     role = input("Enter your role (Nurse/Pharmacist/Doctor/Supervisor): ").strip().title()
-    state = {
-        "messages": [],
-        "role": role,
-        "permission_granted": False
-    }
+    # Pass a session ID as the first argument to resume that conversation
+    session_id = sys.argv[1] if len(sys.argv) > 1 else uuid.uuid4().hex
+    config = {"configurable": {"thread_id": session_id}}
+    print(f"Session: {session_id}")
 
     while True:
         user_input = input("You: ")
@@ -117,10 +140,11 @@ def run_hospital_agent():
             print("Bye!")
             break
 
-        state["messages"] = state.get("messages", []) + [HumanMessage(content=user_input)]
-        state = graph.invoke(state)
-        answer = state["messages"][-1]
-        print(f"Assistant: {answer.content}")
+        # Only the new message is sent; earlier turns come from the checkpoint
+        turn = {"messages": [HumanMessage(content=user_input)], "role": role, "permission_granted": False}
+        print("Assistant: ", end="", flush=True)
+        state, timings = stream_turn(get_graph(), turn, config=config)
+        print(f"\n(first token after {timings['ttft_seconds']:.2f}s)")
 
 if __name__ == "__main__":
     run_hospital_agent()
@@ -1,3 +1,7 @@
+import sys
+import uuid
+from functools import lru_cache
+
 from dotenv import load_dotenv
 from typing import Annotated, List, Dict, Any
 from langgraph.graph import StateGraph, START, END
@@ -11,11 +15,16 @@ from typing_extensions import TypedDict
 from src.medbot.data_loader import (
     load_patient_details, load_diagnosis, load_medications, load_prescriptions,
     load_alerts, load_diabetic_indices, load_encounters, load_immunizations,
-    combine_patient_documents
+    combine_patient_documents, patient_fingerprints
 )
 from src.medbot.helper import (
-    create_chroma_vectorstore, create_chat_openai_llm, create_retrieval_qa_chain,
+    create_chroma_vectorstore, create_patient_retriever, create_chat_openai_llm, create_retrieval_qa_chain,
 )
+from src.medbot.answer_cache import AnswerCache, cached_answer
+from src.medbot.streaming import emit_progress, stream_turn
+from src.medbot.checkpoint import SQLiteCheckpointSaver
+from src.medbot.tool_calls import execute_tool_calls
+from src.medbot.store_index import hash_documents
 
 load_dotenv()
 
@@ -68,36 +77,55 @@ def permission_checker(state: AgentState) -> Dict[str, Any]:
                 permission = True
                 break
     return {
-        "messages": state["messages"],
         "role": role,
         "permission_granted": permission
     }
 
-# ----- Load RAG -----
-print("Loading hospital data and initializing vector store...")
-patients = load_patient_details(r"I:\Code Space\LLM Model Project\RAG\medbot\Data\patient_details.csv")
-diagnoses = load_diagnosis(r"I:\Code Space\LLM Model Project\RAG\medbot\Data\diagnosis.csv")
-medications = load_medications(r"I:\Code Space\LLM Model Project\RAG\medbot\Data\medications.csv")
-prescriptions = load_prescriptions(r"I:\Code Space\LLM Model Project\RAG\medbot\Data\prescriptions.csv")
-alerts = load_alerts(r"I:\Code Space\LLM Model Project\RAG\medbot\Data\alerts.csv")
-indices = load_diabetic_indices(r"I:\Code Space\LLM Model Project\RAG\medbot\Data\diabetic_indices.csv")
-encounters = load_encounters(r"I:\Code Space\LLM Model Project\RAG\medbot\Data\encounter_history.csv")
-immunizations = load_immunizations(r"I:\Code Space\LLM Model Project\RAG\medbot\Data\immunizations.csv")
-documents = combine_patient_documents(
-    patients, diagnoses, medications, prescriptions,
-    alerts, indices, encounters, immunizations
-)
-vectorstore = create_chroma_vectorstore(documents)
-retriever = vectorstore.as_retriever()
-llm = create_chat_openai_llm()
-qa_chain = create_retrieval_qa_chain(llm, retriever)
+# ----- Load RAG (on first use, so the chat prompt comes up immediately) -----
+@lru_cache(maxsize=None)
+def load_tables():
+    print("Loading hospital data...")
+    return (
+        load_patient_details(r"I:\Code Space\LLM Model Project\RAG\medbot\Data\patient_details.csv"),
+        load_diagnosis(r"I:\Code Space\LLM Model Project\RAG\medbot\Data\diagnosis.csv"),
+        load_medications(r"I:\Code Space\LLM Model Project\RAG\medbot\Data\medications.csv"),
+        load_prescriptions(r"I:\Code Space\LLM Model Project\RAG\medbot\Data\prescriptions.csv"),
+        load_alerts(r"I:\Code Space\LLM Model Project\RAG\medbot\Data\alerts.csv"),
+        load_diabetic_indices(r"I:\Code Space\LLM Model Project\RAG\medbot\Data\diabetic_indices.csv"),
+        load_encounters(r"I:\Code Space\LLM Model Project\RAG\medbot\Data\encounter_history.csv"),
+        load_immunizations(r"I:\Code Space\LLM Model Project\RAG\medbot\Data\immunizations.csv"),
+    )
+
+@lru_cache(maxsize=None)
+def load_documents():
+    return combine_patient_documents(*load_tables())
+
+@lru_cache(maxsize=None)
+def get_llm():
+    return create_chat_openai_llm()
+
+@lru_cache(maxsize=None)
+def get_qa_chain():
+    print("Initializing vector store...")
+    documents = load_documents()
+    vectorstore = create_chroma_vectorstore(
+        documents, persist_directory=r"I:\Code Space\LLM Model Project\RAG\medbot\chroma_index",
+        fingerprints=patient_fingerprints(*load_tables())
+    )
+    retriever = create_patient_retriever(vectorstore, documents)
+    return create_retrieval_qa_chain(get_llm(), retriever)
+
+@lru_cache(maxsize=None)
+def get_answer_cache():
+    return AnswerCache(data_version=hash_documents(load_documents()))
 
 # ----- Define RAG as a Tool -----
 @tool
 def hospital_rag_tool(query: str) -> str:
     """Retrieve hospital information from patient records only for allowed fields."""
-    result = qa_chain.invoke({"query": query})
-    return result["result"]
+    emit_progress("retrieving", query=query)
+    # Every role shares one retriever here, so answers are cached role-independently
+    return cached_answer(get_qa_chain(), query, answer_cache=get_answer_cache())
 
 TOOLS = [hospital_rag_tool]
 
@@ -109,7 +137,7 @@ def llm_agent_node(state: AgentState) -> AgentState:
     # Always start with system message
     messages_with_system = [SystemMessage(content=system_prompt)] + messages
     # Use tools
-    agent_llm = llm.bind_tools(TOOLS)
+    agent_llm = get_llm().bind_tools(TOOLS)
     # Call LLM with messages (let LLM decide to call tool)
     message = agent_llm.invoke(messages_with_system)
     return {"messages": [message], "role": role, "permission_granted": state["permission_granted"]}
@@ -117,25 +145,11 @@ def llm_agent_node(state: AgentState) -> AgentState:
 # ----- Tool node: executes any tool calls in LLM response -----
 def tool_executor_node(state: AgentState) -> AgentState:
     tool_calls = state["messages"][-1].tool_calls
-    results = []
-    for t in tool_calls:
-        if t["name"] == hospital_rag_tool.name:
-            tool_result = hospital_rag_tool.invoke(t["args"]["query"])
-            results.append(
-                ToolMessage(
-                    tool_call_id=t["id"],
-                    name=t["name"],
-                    content=tool_result
-                )
-            )
-        else:
-            results.append(
-                ToolMessage(
-                    tool_call_id=t["id"],
-                    name=t["name"],
-                    content="Invalid tool call."
-                )
-            )
+    # Calls from one LLM message run concurrently, answers come back in order
+    results = execute_tool_calls(
+        tool_calls, {hospital_rag_tool.name: hospital_rag_tool},
+        before_call=lambda t: emit_progress("calling tool", tool=t["name"])
+    )
     return {"messages": results, "role": state["role"], "permission_granted": state["permission_granted"]}
 
 # ----- Graph wiring -----
@@ -153,26 +167,31 @@ graph_builder.add_conditional_edges(
     "llm_agent", has_tool_calls, {True: "tool_executor", False: END}
 )
 graph_builder.add_edge("tool_executor", "llm_agent")
-graph = graph_builder.compile()
+
+# Sessions (one thread per session ID) are checkpointed to SQLite and survive
+# restarts; the database is opened when the chat starts, not on import
+@lru_cache(maxsize=None)
+def get_graph():
+    return graph_builder.compile(checkpointer=SQLiteCheckpointSaver())
 
 # ----- Main Chat Loop -----
 def run_hospital_agent():
     print(" Hospital Assistant Chat (type 'exit' to quit)")
     role = input("Enter your role (Nurse/Pharmacist/Doctor/Supervisor): ").strip().title()
-    state = {
-        "messages": [],
-        "role": role,
-        "permission_granted": False
-    }
+    # Pass a session ID as the first argument to resume that conversation
+    session_id = sys.argv[1] if len(sys.argv) > 1 else uuid.uuid4().hex
+    config = {"configurable": {"thread_id": session_id}}
+    print(f"Session: {session_id}")
     while True:
         user_input = input("You: ")
         if user_input.strip().lower() == "exit":
             print("Bye!")
             break
-        state["messages"] = state.get("messages", []) + [HumanMessage(content=user_input)]
-        state = graph.invoke(state)
-        answer = state["messages"][-1]
-        print(f"Assistant: {getattr(answer, 'content', answer)}")
+        # Only the new message is sent; earlier turns come from the checkpoint
+        turn = {"messages": [HumanMessage(content=user_input)], "role": role, "permission_granted": False}
+        print("Assistant: ", end="", flush=True)
+        state, timings = stream_turn(get_graph(), turn, config=config)
+        print(f"\n(first token after {timings['ttft_seconds']:.2f}s)")
 
 if __name__ == "__main__":
     run_hospital_agent()
@@ -0,0 +1,28 @@
+import argparse
+import asyncio
+
+from src.medbot.checkpoint import DEFAULT_SESSION_DB
+from src.medbot.pipeline import MedbotPipeline
+from src.medbot.server import serve
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-session hospital assistant HTTP server")
+    parser.add_argument("--data-dir", default=r"I:\Code Space\LLM Model Project\RAG\medbot\Data")
+    parser.add_argument("--index-dir", default=r"I:\Code Space\LLM Model Project\RAG\medbot\chroma_index_sections")
+    parser.add_argument("--session-db", default=DEFAULT_SESSION_DB, help="SQLite file for resumable sessions")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=8, help="threads for agent runs")
+    args = parser.parse_args()
+
+    # One data/index/LLM stack for every session
+    print("Loading hospital data and initializing vector store...")
+    pipeline = MedbotPipeline(args.data_dir, args.index_dir, session_db=args.session_db).load()
+    # Compile every role's agent graph before accepting logins
+    pipeline.agents.warm()
+    asyncio.run(serve(pipeline, args.host, args.port, max_workers=args.workers))
+
+
+if __name__ == "__main__":
+    main()
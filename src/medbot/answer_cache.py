@@ -0,0 +1,164 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from src.medbot.retrievers import extract_patient_ids
+
+# -----------------------------------
+# Answer cache for the RetrievalQA chain
+# -----------------------------------
+
+_WHITESPACE = re.compile(r"\s+")
+_TRAILING_PUNCTUATION = re.compile(r"[\s?.!]+$")
+
+
+def normalize_query(query):
+    """
+    Case-, whitespace- and trailing-punctuation-insensitive form of a query.
+    """
+    return _TRAILING_PUNCTUATION.sub("", _WHITESPACE.sub(" ", query.strip().lower()))
+
+
+class AnswerCache:
+    """
+    LRU + TTL cache of RetrievalQA answers keyed by (role, normalized query).
+
+    With an embedder and similarity_threshold, a miss falls back to the most
+    similar cached query of the same role that names the same patients.
+    Every entry is tied to the data version it was computed for; changing
+    the version (e.g. after reloading the CSVs) drops all entries.
+    """
+
+    def __init__(self, max_entries=1024, ttl_seconds=15 * 60, embedder=None,
+                 similarity_threshold=None, data_version=None, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.embedder = embedder
+        self.similarity_threshold = similarity_threshold
+        self.data_version = data_version
+        self.clock = clock
+        self._entries = OrderedDict()  # (role, normalized query) -> entry dict
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.seconds_saved = 0.0
+
+    def set_data_version(self, data_version):
+        """
+        Invalidate every entry when the underlying patient data changes.
+        """
+        with self._lock:
+            if data_version != self.data_version:
+                self._entries.clear()
+                self.data_version = data_version
+
+    def get(self, role, query):
+        key = (role, normalize_query(query))
+        with self._lock:
+            entry = self._live_entry(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return self._hit(entry)
+
+        entry = self._semantic_match(role, query)
+        with self._lock:
+            if entry is not None and self._live_entry(entry["key"]) is entry:
+                self.semantic_hits += 1
+                return self._hit(entry)
+            self.misses += 1
+        return None
+
+    def put(self, role, query, answer, latency_seconds=0.0):
+        key = (role, normalize_query(query))
+        vector = None
+        if self.embedder is not None and self.similarity_threshold is not None:
+            vector = _unit(self.embedder.embed_query(key[1]))
+        with self._lock:
+            self._entries[key] = {
+                "key": key,
+                "answer": answer,
+                "latency_seconds": latency_seconds,
+                "created": self.clock(),
+                "data_version": self.data_version,
+                "patient_ids": extract_patient_ids(query),
+                "vector": vector,
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "seconds_saved": round(self.seconds_saved, 3),
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    # ----- internals (call with the lock held) -----
+
+    def _live_entry(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry["data_version"] != self.data_version or self.clock() - entry["created"] > self.ttl_seconds:
+            del self._entries[key]
+            self.expirations += 1
+            return None
+        return entry
+
+    def _hit(self, entry):
+        self.hits += 1
+        self.seconds_saved += entry["latency_seconds"]
+        return entry["answer"]
+
+    def _semantic_match(self, role, query):
+        if self.embedder is None or self.similarity_threshold is None:
+            return None
+        patient_ids = extract_patient_ids(query)
+        with self._lock:
+            candidates = [
+                entry for entry in self._entries.values()
+                if entry["key"][0] == role and entry["vector"] is not None
+                and entry["patient_ids"] == patient_ids
+            ]
+        if not candidates:
+            return None
+        vector = _unit(self.embedder.embed_query(normalize_query(query)))
+        similarities = np.stack([entry["vector"] for entry in candidates]) @ vector
+        best = int(np.argmax(similarities))
+        return candidates[best] if similarities[best] >= self.similarity_threshold else None
+
+
+def _unit(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def cached_answer(qa_chain, query, role=None, answer_cache=None):
+    """
+    Run qa_chain for query, serving repeated questions from answer_cache.
+    """
+    if answer_cache is None:
+        return qa_chain.invoke({"query": query})["result"]
+    answer = answer_cache.get(role, query)
+    if answer is not None:
+        return answer
+    start = time.perf_counter()
+    answer = qa_chain.invoke({"query": query})["result"]
+    answer_cache.put(role, query, answer, latency_seconds=time.perf_counter() - start)
+    return answer
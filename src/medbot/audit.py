@@ -0,0 +1,224 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+# -----------------------------------
+# Durable audit log
+# -----------------------------------
+
+DEFAULT_AUDIT_DB = os.getenv("MEDBOT_AUDIT_DB", "audit.sqlite")
+
+# A failed batch is retried after 0.1s, 0.2s, 0.4s, ...; if it still fails it
+# is appended to <db>.spill.jsonl and inserted on the next AuditStore open
+WRITE_RETRIES = 5
+RETRY_DELAY = 0.1
+
+INSERT_SQL = "INSERT INTO audit_events (timestamp, username, role, event, critical) VALUES (?, ?, ?, ?, ?)"
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS audit_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    username TEXT,
+    role TEXT,
+    event TEXT NOT NULL,
+    critical INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS audit_by_username ON audit_events (username, id);
+CREATE INDEX IF NOT EXISTS audit_by_role ON audit_events (role, id);
+CREATE INDEX IF NOT EXISTS audit_by_critical ON audit_events (critical, id);
+CREATE INDEX IF NOT EXISTS audit_by_timestamp ON audit_events (timestamp);
+"""
+
+
+class AuditStore:
+    """
+    Append-only audit log in SQLite (WAL mode).
+
+    append() only puts the event on a queue; a background thread writes
+    queued events in batches (one transaction each), so callers never wait
+    on disk. flush() blocks until everything appended so far is stored.
+    A batch that cannot be written is retried with backoff and, failing
+    that, spilled to a file that the next open inserts.
+    """
+
+    def __init__(self, path=DEFAULT_AUDIT_DB, batch_size=500, flush_interval=0.5):
+        self.path = path
+        self.spill_path = path + ".spill.jsonl"
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.SimpleQueue()
+        self._closed = False
+        self._lock = threading.Lock()
+
+        # The writer thread owns self._write_conn; queries use self.conn, which
+        # WAL lets read while a batch is being written
+        self._write_conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._write_conn.execute("PRAGMA journal_mode=WAL")
+        self._write_conn.execute("PRAGMA synchronous=NORMAL")
+        self._write_conn.executescript(SCHEMA)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self._replay_spill()
+
+        self._writer = threading.Thread(target=self._write_loop, name="audit-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    # ----- Writing -----
+
+    def append(self, timestamp, username, role, event, critical=False):
+        self._queue.put((timestamp, username, role, event, int(bool(critical))))
+
+    def flush(self, timeout=None):
+        # After close() the writer has already stored (or spilled) everything
+        if self._closed:
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._writer.join()
+        self._write_conn.close()
+        self.conn.close()
+
+    def _write_loop(self):
+        while True:
+            item = self._queue.get()
+            # Gather what arrives within flush_interval so one commit covers it;
+            # a flush() request or a full batch ends the wait early
+            deadline = time.monotonic() + self.flush_interval
+            batch, waiters, stop = [], [], False
+            while True:
+                if item is None:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    batch.append(item)
+                remaining = deadline - time.monotonic()
+                if stop or waiters or len(batch) >= self.batch_size or remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            # Everything queued before a flush() request belongs to this batch
+            while waiters and not stop:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    batch.append(item)
+            if batch:
+                self._write_batch(batch)
+            for waiter in waiters:
+                waiter.set()
+            if stop:
+                return
+
+    def _write_batch(self, batch):
+        for attempt in range(WRITE_RETRIES + 1):
+            try:
+                self._insert(batch)
+                return
+            except sqlite3.Error as e:
+                error = e
+            if attempt < WRITE_RETRIES:
+                time.sleep(RETRY_DELAY * 2 ** attempt)
+        logger.error("Audit write of %d events failed after %d retries (%s); spilling to %s",
+                     len(batch), WRITE_RETRIES, error, self.spill_path)
+        with open(self.spill_path, "a", encoding="utf-8") as f:
+            for row in batch:
+                f.write(json.dumps(row) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _insert(self, batch):
+        try:
+            self._write_conn.execute("BEGIN")
+            self._write_conn.executemany(INSERT_SQL, batch)
+            self._write_conn.execute("COMMIT")
+        except sqlite3.Error:
+            if self._write_conn.in_transaction:
+                self._write_conn.execute("ROLLBACK")
+            raise
+
+    def _replay_spill(self):
+        if not os.path.exists(self.spill_path):
+            return
+        with open(self.spill_path, "r", encoding="utf-8") as f:
+            batch = [tuple(json.loads(line)) for line in f if line.strip()]
+        try:
+            self._insert(batch)
+        except sqlite3.Error as e:
+            logger.error("Replaying %d spilled audit events failed (%s); keeping %s",
+                         len(batch), e, self.spill_path)
+            return
+        os.remove(self.spill_path)
+        logger.warning("Stored %d audit events spilled by an earlier write failure", len(batch))
+
+    # ----- Reading -----
+
+    def _where(self, username, role, critical, since, until):
+        clauses, params = [], []
+        for column, value in (("username", username), ("role", role)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if critical is not None:
+            clauses.append("critical = ?")
+            params.append(int(bool(critical)))
+        if since is not None:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("timestamp < ?")
+            params.append(until)
+        return clauses, params
+
+    def query(self, username=None, role=None, critical=None, since=None, until=None,
+              limit=50, offset=0, before_id=None):
+        """
+        Newest-first page of events matching every given filter.
+        since/until are ISO timestamps. For deep pages pass before_id (the
+        smallest id of the previous page) instead of a large offset.
+        """
+        clauses, params = self._where(username, role, critical, since, until)
+        if before_id is not None:
+            clauses.append("id < ?")
+            params.append(before_id)
+        sql = "SELECT id, timestamp, username, role, event, critical FROM audit_events"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY id DESC LIMIT ? OFFSET ?"
+        with self._lock:
+            rows = self.conn.execute(sql, params + [limit, offset]).fetchall()
+        return [
+            {"id": id_, "timestamp": ts, "username": user, "role": role_, "event": event, "critical": bool(crit)}
+            for id_, ts, user, role_, event, crit in rows
+        ]
+
+    def count(self, username=None, role=None, critical=None, since=None, until=None):
+        clauses, params = self._where(username, role, critical, since, until)
+        sql = "SELECT COUNT(*) FROM audit_events"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        with self._lock:
+            return self.conn.execute(sql, params).fetchone()[0]
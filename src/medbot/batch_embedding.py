@@ -0,0 +1,217 @@
+import atexit
+import os
+from collections import deque
+
+from langchain_core.embeddings import Embeddings
+
+# -----------------------------------
+# Batched, multi-process embedding
+# -----------------------------------
+#
+# Texts are sorted by length and cut into batches of similar length, so a
+# batch is padded to roughly its own length instead of the longest text in
+# the call. With workers > 0 the batches are sharded over CPU worker
+# processes, each loading its own copy of the model; vectors are put back in
+# input order whatever order the workers finish in.
+
+# Set MEDBOT_EMBED_BATCH_SIZE / MEDBOT_EMBED_WORKERS to change the defaults
+DEFAULT_BATCH_SIZE = int(os.getenv("MEDBOT_EMBED_BATCH_SIZE", "64"))
+DEFAULT_WORKERS = int(os.getenv("MEDBOT_EMBED_WORKERS", "0"))
+
+# Batches queued per worker; bounds the vectors held waiting to be merged
+PENDING_BATCHES_PER_WORKER = 2
+
+
+def length_sorted_batches(texts, batch_size):
+    """
+    Split the indices of texts into batches of similar length.
+
+    Returns:
+        list: Lists of indices into texts, shortest texts first. The sort is
+            stable, so equal-length texts keep their input order.
+    """
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1")
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    return [order[start:start + batch_size] for start in range(0, len(order), batch_size)]
+
+
+# Set in each worker process by _init_worker
+_WORKER_EMBEDDER = None
+
+
+def _init_worker(factory, threads):
+    global _WORKER_EMBEDDER
+    # Before the model (and torch) is imported, so workers do not each
+    # start one thread per core
+    os.environ.setdefault("OMP_NUM_THREADS", str(threads))
+    os.environ.setdefault("MKL_NUM_THREADS", str(threads))
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+    _WORKER_EMBEDDER = factory()
+
+
+def _embed_batch(texts):
+    return _WORKER_EMBEDDER.embed_documents(texts)
+
+
+class BatchedEmbeddings(Embeddings):
+    """
+    Embeddings that embed documents in length-sorted batches of batch_size,
+    in this process (workers=0) or sharded over worker processes.
+
+    factory is a picklable zero-argument callable returning the underlying
+    Embeddings (e.g. functools.partial(HuggingFaceEmbeddings, model_name=...));
+    it is called once in this process and once in every worker.
+
+    The worker pool is started on first use and stopped by close(), on
+    leaving a with block, or at interpreter exit.
+    """
+
+    def __init__(self, factory, batch_size=DEFAULT_BATCH_SIZE, workers=DEFAULT_WORKERS):
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        self.factory = factory
+        self.batch_size = batch_size
+        self.workers = workers
+        self.batches = 0
+        self._embedder = None
+        self._pool = None
+
+    @property
+    def embedder(self):
+        if self._embedder is None:
+            self._embedder = self.factory()
+        return self._embedder
+
+    # ----- Embeddings interface -----
+
+    def embed_documents(self, texts):
+        texts = list(texts)
+        vectors = [None] * len(texts)
+        for batch, batch_vectors in self.iter_batches(texts):
+            for i, vector in zip(batch, batch_vectors):
+                vectors[i] = vector
+        return vectors
+
+    def embed_query(self, text):
+        return self.embedder.embed_query(text)
+
+    def iter_batches(self, texts):
+        """
+        Embed texts batch by batch.
+
+        Yields:
+            tuple: (indices into texts, their vectors), in length-sorted batch
+                order regardless of which worker finished first.
+        """
+        batches = length_sorted_batches(texts, self.batch_size)
+        if self.workers > 0 and len(batches) > 1:
+            yield from self._iter_pool(texts, batches)
+            return
+        for batch in batches:
+            self.batches += 1
+            yield batch, self.embedder.embed_documents([texts[i] for i in batch])
+
+    def _iter_pool(self, texts, batches):
+        pool = self._get_pool()
+        pending = deque()
+        remaining = iter(batches)
+        max_pending = self.workers * PENDING_BATCHES_PER_WORKER
+
+        def submit():
+            batch = next(remaining, None)
+            if batch is not None:
+                pending.append((batch, pool.submit(_embed_batch, [texts[i] for i in batch])))
+
+        for _ in range(max_pending):
+            submit()
+        while pending:
+            batch, future = pending.popleft()
+            batch_vectors = future.result()
+            submit()
+            self.batches += 1
+            yield batch, batch_vectors
+
+    # ----- Worker pool -----
+
+    def _get_pool(self):
+        if self._pool is None:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+
+            threads = max(1, (os.cpu_count() or 1) // self.workers)
+            # spawn: forking a process that already loaded torch can deadlock
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker, initargs=(self.factory, threads),
+            )
+            # Embedders are cached for the life of the process (see
+            # store_index.create_embedder), so nothing else would stop the workers
+            atexit.register(self.close)
+        return self._pool
+
+    def close(self):
+        """
+        Stop the worker processes, if any were started.
+        """
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+            atexit.unregister(self.close)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def stats(self):
+        return {"batch_size": self.batch_size, "workers": self.workers, "batches": self.batches}
+
+
+# -----------------------------------
+# Streaming documents into a vector store
+# -----------------------------------
+
+def stream_chunk_size(batch_size=None, workers=None):
+    """
+    Documents handed to the vector store per add: enough batches to keep
+    every worker busy, few enough that only one chunk of vectors is held.
+    None means the MEDBOT_EMBED_BATCH_SIZE / MEDBOT_EMBED_WORKERS default.
+    """
+    batch_size = batch_size or DEFAULT_BATCH_SIZE
+    workers = DEFAULT_WORKERS if workers is None else workers
+    return batch_size * max(1, workers) * PENDING_BATCHES_PER_WORKER
+
+
+def stream_documents(lc_documents, ids=None, create=None, vectorstore=None, chunk_size=DEFAULT_BATCH_SIZE):
+    """
+    Add documents to a vector store in length-sorted chunks, so each chunk is
+    embedded, written and released before the next one is embedded.
+
+    Args:
+        lc_documents (list): Documents to add.
+        ids (list, optional): Vector-store IDs, parallel to lc_documents.
+        create (callable, optional): create(documents, ids) -> new vectorstore
+            holding the first chunk; used when vectorstore is None.
+        vectorstore (optional): Existing store to add every chunk to.
+        chunk_size (int): Documents per add.
+
+    Returns:
+        The vectorstore.
+    """
+    if vectorstore is None and create is None:
+        raise ValueError("stream_documents needs a vectorstore or a create callable")
+    if not lc_documents:
+        return vectorstore if vectorstore is not None else create(lc_documents, ids)
+
+    order = sorted(range(len(lc_documents)), key=lambda i: len(lc_documents[i].page_content))
+    for start in range(0, len(order), chunk_size):
+        chunk = order[start:start + chunk_size]
+        docs = [lc_documents[i] for i in chunk]
+        chunk_ids = [ids[i] for i in chunk] if ids is not None else None
+        if vectorstore is None:
+            vectorstore = create(docs, chunk_ids)
+        else:
+            vectorstore.add_documents(docs, ids=chunk_ids)
+    return vectorstore
@@ -0,0 +1,129 @@
+import uuid
+
+from langchain_core.messages import HumanMessage
+
+from src.medbot.hospital_agents import evaluate_query, log_event
+from src.medbot.streaming import print_progress, stream_turn
+
+# -----------------------------------
+# One logged-in user's chat session
+# -----------------------------------
+#
+# The turn logic of app.py's chat loop, callable without a terminal:
+# Supervisor commands, the permission/criticality check with audit logging,
+# the agent run and conversation memory. app.py prints what these return;
+# tests call ask() directly.
+
+DENIED_ANSWER = "Access denied: You do not have permission to access this information."
+
+
+def parse_auditlog_command(query):
+    """
+    view_audit_log filters from e.g. "auditlog critical user=nurse1 role=Nurse page=2".
+    """
+    filters = {}
+    for option in query.split()[1:]:
+        key, _, value = option.partition("=")
+        if key.lower() == "critical":
+            filters["critical"] = True
+        elif key.lower() == "user" and value:
+            filters["username"] = value
+        elif key.lower() == "role" and value:
+            filters["role"] = value
+        elif key.lower() == "page" and value.isdigit() and int(value) > 0:
+            filters["page"] = int(value)
+    return filters
+
+
+class ChatSession:
+    """
+    A user's conversation with their role's agent.
+
+    History is either kept in memory (a memory.ConversationMemory whose
+    context is sent with every question, as app.py does) or, without one,
+    restored by the agent's checkpointer under session_id.
+    """
+
+    def __init__(self, username, role, agent, memory=None, answer_cache=None, session_id=None):
+        self.username = username
+        self.role = role
+        self.agent = agent
+        self.memory = memory
+        self.answer_cache = answer_cache
+        self.config = {"configurable": {"thread_id": session_id or uuid.uuid4().hex, "username": username}}
+
+    def command(self, query):
+        """
+        Run a Supervisor command ("auditlog ...", "cachestats").
+
+        Returns:
+            dict or None: {"kind": "auditlog", "filters"} or {"kind": "cache_stats",
+                "stats"}; None if query is not a command for this role.
+        """
+        if self.role != "Supervisor":
+            return None
+        if query.lower().split()[:1] == ["auditlog"]:
+            return {"kind": "auditlog", "filters": parse_auditlog_command(query)}
+        if query.lower() == "cachestats" and self.answer_cache is not None:
+            return {"kind": "cache_stats", "stats": self.answer_cache.stats()}
+        return None
+
+    def check(self, query):
+        """
+        Permission and criticality check (one pass over the query); denied
+        and critical queries are written to the audit log.
+
+        Returns:
+            dict: {"allowed": bool, "critical": bool}
+        """
+        policy = evaluate_query(self.role, query)
+        if not policy["allowed"]:
+            log_event(self.username, self.role, f"Denied query: {query}", critical=False)
+            return {"allowed": False, "critical": False}
+        critical = policy["criticality"] == "Critical"
+        if critical:
+            log_event(self.username, self.role, f"Critical query: {query}", critical=True)
+        return {"allowed": True, "critical": critical}
+
+    def answer(self, query, on_token=None, on_progress=None):
+        """
+        Run the agent for an allowed query. With on_token the answer is
+        streamed (see streaming.stream_turn).
+
+        Returns:
+            dict: {"answer", "messages", "timings" (streamed turns only),
+                "memory" (memory.add_turn stats, when memory is kept)}
+        """
+        question = HumanMessage(content=query)
+        state = {"messages": (self.memory.context() if self.memory else []) + [question]}
+        config = None if self.memory else self.config
+        timings = None
+        if on_token is not None:
+            result, timings = stream_turn(self.agent, state, on_token=on_token,
+                                          on_progress=on_progress or print_progress, config=config)
+        else:
+            result = self.agent.invoke(state, config=config)
+        answer = result["messages"][-1]
+        turn = {"answer": answer.content, "messages": result["messages"], "timings": timings}
+        if self.memory is not None:
+            # Only the question and final answer are kept; tool payloads are dropped
+            turn["memory"] = self.memory.add_turn(query, result["messages"])
+        return turn
+
+    def ask(self, query, on_token=None, on_progress=None):
+        """
+        command(), check() and answer() in one call.
+
+        Returns:
+            dict: the command result, {"kind": "denied", "answer": DENIED_ANSWER},
+                or answer()'s result with "kind": "answer" and "critical".
+        """
+        query = query.strip()
+        result = self.command(query)
+        if result is not None:
+            return result
+        policy = self.check(query)
+        if not policy["allowed"]:
+            return {"kind": "denied", "answer": DENIED_ANSWER, "critical": False}
+        turn = self.answer(query, on_token=on_token, on_progress=on_progress)
+        return {"kind": "answer", "critical": policy["critical"], **turn}
@@ -0,0 +1,378 @@
+import os
+import random
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Iterator, Optional, Sequence
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+
+# -----------------------------------
+# SQLite session checkpointer
+# -----------------------------------
+#
+# Standard LangGraph checkpoints serialize the full value of every channel
+# that changed, so the "messages" channel is re-written in full after every
+# step. Here message channels are stored as an append-only log per thread;
+# a checkpoint only records how many log entries belong to it, so a step
+# writes just the messages it added.
+
+DEFAULT_SESSION_DB = os.getenv("MEDBOT_SESSION_DB", "sessions.sqlite")
+
+# Message logs kept in memory, least recently used first out; one per active
+# session is enough, evicted ones are re-read from SQLite when needed.
+# Set MEDBOT_SESSION_LOG_CACHE to change it.
+DEFAULT_MAX_CACHED_LOGS = int(os.getenv("MEDBOT_SESSION_LOG_CACHE", "1024"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    type TEXT,
+    checkpoint BLOB,
+    metadata_type TEXT,
+    metadata BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS blobs (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    channel TEXT NOT NULL,
+    version TEXT NOT NULL,
+    type TEXT NOT NULL,
+    blob BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT,
+    blob BLOB,
+    task_path TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+CREATE TABLE IF NOT EXISTS messages (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    channel TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    message_id TEXT NOT NULL,
+    type TEXT NOT NULL,
+    blob BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, channel, seq)
+);
+"""
+
+# blobs.type marker for "the first <blob> entries of the message log"
+LOG_PREFIX_TYPE = "log_prefix"
+
+
+class SQLiteCheckpointSaver(BaseCheckpointSaver[str]):
+    """
+    LangGraph checkpointer on the standard library sqlite3 module (WAL mode),
+    keyed by thread_id, i.e. the chat session ID.
+
+    Channels named in log_channels hold message lists maintained by the
+    add_messages reducer. While a thread only appends to them, each step
+    stores just the new messages; anything else (edits, removals, forks from
+    an older checkpoint) falls back to storing the full value.
+
+    The logs of the max_cached_logs most recently used threads are kept in
+    memory; older ones are dropped and re-read from SQLite on their next use.
+    """
+
+    def __init__(self, path=DEFAULT_SESSION_DB, log_channels=("messages",), serde=None,
+                 max_cached_logs=DEFAULT_MAX_CACHED_LOGS):
+        super().__init__(serde=serde)
+        self.path = path
+        self.log_channels = set(log_channels)
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.lock = threading.Lock()
+        self.max_cached_logs = max_cached_logs
+        # (thread_id, checkpoint_ns, channel) -> messages in the log, loaded
+        # lazily, least recently used first
+        self._logs = OrderedDict()
+        self._logs_lock = threading.Lock()
+
+    def close(self):
+        self.conn.close()
+
+    # ----- Message log -----
+
+    def _cached_log(self, key):
+        with self._logs_lock:
+            logged = self._logs.get(key)
+            if logged is not None:
+                self._logs.move_to_end(key)
+            return logged
+
+    def _cache_log(self, key, logged):
+        with self._logs_lock:
+            self._logs[key] = logged
+            self._logs.move_to_end(key)
+            while len(self._logs) > self.max_cached_logs:
+                self._logs.popitem(last=False)
+
+    def _drop_logs(self, thread_id, checkpoint_ns=None):
+        with self._logs_lock:
+            for key in [key for key in self._logs
+                        if key[0] == thread_id and checkpoint_ns in (None, key[1])]:
+                del self._logs[key]
+
+    def _logged(self, thread_id, checkpoint_ns, channel):
+        logged = self._cached_log((thread_id, checkpoint_ns, channel))
+        if logged is None:
+            logged = self._load_log((thread_id, checkpoint_ns, channel))
+        return logged
+
+    def _append_to_log(self, thread_id, checkpoint_ns, channel, value):
+        """
+        Append the unlogged tail of value to the channel's log. Returns the
+        number of log entries value consists of, or None if value is not an
+        extension of the log.
+        """
+        if not isinstance(value, list) or any(getattr(m, "id", None) is None for m in value):
+            return None
+        logged = self._logged(thread_id, checkpoint_ns, channel)
+        n = len(value)
+        # Same length or longer: the log must be a prefix of value.
+        # Shorter: value must be a prefix of the log (e.g. a fork).
+        # add_messages keeps unchanged messages as the same objects, so the
+        # identity check almost always settles it; == catches in-place edits.
+        prefix = min(n, len(logged))
+        if any(value[i] is not logged[i] and value[i] != logged[i] for i in range(prefix)):
+            return None
+        if n < len(logged):
+            return n
+        rows = []
+        for seq in range(len(logged), n):
+            type_, blob = self.serde.dumps_typed(value[seq])
+            rows.append((thread_id, checkpoint_ns, channel, seq, value[seq].id, type_, blob))
+        self.conn.executemany("INSERT INTO messages VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        logged.extend(value[len(logged):])
+        return n
+
+    def _read_log(self, thread_id, checkpoint_ns, channel, count=None):
+        """
+        The first count messages of the log (all of them if count is None).
+        """
+        key = (thread_id, checkpoint_ns, channel)
+        logged = self._cached_log(key)
+        if logged is not None and count is not None and count <= len(logged):
+            return logged[:count]
+        return self._load_log(key)[:count]
+
+    def _load_log(self, key):
+        rows = self.conn.execute(
+            "SELECT type, blob FROM messages WHERE thread_id=? AND checkpoint_ns=? AND channel=? ORDER BY seq",
+            key,
+        ).fetchall()
+        logged = [self.serde.loads_typed((type_, blob)) for type_, blob in rows]
+        self._cache_log(key, logged)
+        return logged
+
+    # ----- Reading -----
+
+    def _load_channel_values(self, thread_id, checkpoint_ns, versions):
+        values = {}
+        for channel, version in versions.items():
+            row = self.conn.execute(
+                "SELECT type, blob FROM blobs WHERE thread_id=? AND checkpoint_ns=? AND channel=? AND version=?",
+                (thread_id, checkpoint_ns, channel, str(version)),
+            ).fetchone()
+            if row is None or row[0] == "empty":
+                continue
+            if row[0] == LOG_PREFIX_TYPE:
+                values[channel] = self._read_log(thread_id, checkpoint_ns, channel, int(row[1]))
+            else:
+                values[channel] = self.serde.loads_typed((row[0], row[1]))
+        return values
+
+    def _make_tuple(self, thread_id, checkpoint_ns, row):
+        checkpoint_id, parent_id, type_, checkpoint_blob, metadata_type, metadata_blob = row
+        checkpoint = self.serde.loads_typed((type_, checkpoint_blob))
+        writes = self.conn.execute(
+            "SELECT task_id, channel, type, blob FROM writes "
+            "WHERE thread_id=? AND checkpoint_ns=? AND checkpoint_id=? ORDER BY task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        return CheckpointTuple(
+            config={"configurable": {
+                "thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint_id,
+            }},
+            checkpoint={
+                **checkpoint,
+                "channel_values": self._load_channel_values(thread_id, checkpoint_ns, checkpoint["channel_versions"]),
+            },
+            metadata=self.serde.loads_typed((metadata_type, metadata_blob)),
+            parent_config=(
+                {"configurable": {
+                    "thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": parent_id,
+                }}
+                if parent_id else None
+            ),
+            pending_writes=[(task_id, channel, self.serde.loads_typed((t, b))) for task_id, channel, t, b in writes],
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        columns = "checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata"
+        with self.lock:
+            if checkpoint_id := get_checkpoint_id(config):
+                row = self.conn.execute(
+                    f"SELECT {columns} FROM checkpoints WHERE thread_id=? AND checkpoint_ns=? AND checkpoint_id=?",
+                    (thread_id, checkpoint_ns, checkpoint_id),
+                ).fetchone()
+            else:
+                row = self.conn.execute(
+                    f"SELECT {columns} FROM checkpoints WHERE thread_id=? AND checkpoint_ns=? "
+                    "ORDER BY checkpoint_id DESC LIMIT 1",
+                    (thread_id, checkpoint_ns),
+                ).fetchone()
+            return self._make_tuple(thread_id, checkpoint_ns, row) if row else None
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        query = ("SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, "
+                 "metadata_type, metadata FROM checkpoints")
+        clauses, params = [], []
+        if config:
+            clauses.append("thread_id=?")
+            params.append(config["configurable"]["thread_id"])
+            if (checkpoint_ns := config["configurable"].get("checkpoint_ns")) is not None:
+                clauses.append("checkpoint_ns=?")
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                clauses.append("checkpoint_id=?")
+                params.append(checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            clauses.append("checkpoint_id<?")
+            params.append(before_id)
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY checkpoint_id DESC"
+
+        with self.lock:
+            rows = self.conn.execute(query, params).fetchall()
+        for row in rows:
+            if limit is not None and limit <= 0:
+                break
+            thread_id, checkpoint_ns = row[0], row[1]
+            with self.lock:
+                result = self._make_tuple(thread_id, checkpoint_ns, row[2:])
+            if filter and not all(result.metadata.get(k) == v for k, v in filter.items()):
+                continue
+            if limit is not None:
+                limit -= 1
+            yield result
+
+    # ----- Writing -----
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        c = checkpoint.copy()
+        values = c.pop("channel_values")
+        type_, checkpoint_blob = self.serde.dumps_typed(c)
+        metadata_type, metadata_blob = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+
+        with self.lock:
+            self.conn.execute("BEGIN")
+            try:
+                for channel, version in new_versions.items():
+                    if channel not in values:
+                        blob_type, blob = "empty", None
+                    elif channel in self.log_channels and (
+                        count := self._append_to_log(thread_id, checkpoint_ns, channel, values[channel])
+                    ) is not None:
+                        blob_type, blob = LOG_PREFIX_TYPE, str(count).encode()
+                    else:
+                        blob_type, blob = self.serde.dumps_typed(values[channel])
+                    self.conn.execute(
+                        "INSERT OR REPLACE INTO blobs VALUES (?, ?, ?, ?, ?, ?)",
+                        (thread_id, checkpoint_ns, channel, str(version), blob_type, blob),
+                    )
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (thread_id, checkpoint_ns, checkpoint["id"], config["configurable"].get("checkpoint_id"),
+                     type_, checkpoint_blob, metadata_type, metadata_blob),
+                )
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                # The cached logs may include rows that were rolled back
+                self._drop_logs(thread_id, checkpoint_ns)
+                raise
+        return {"configurable": {
+            "thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint["id"],
+        }}
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            type_, blob = self.serde.dumps_typed(value)
+            rows.append((thread_id, checkpoint_ns, checkpoint_id, task_id,
+                         WRITES_IDX_MAP.get(channel, idx), channel, type_, blob, task_path))
+        # Special writes (errors, interrupts) overwrite; regular writes are kept once
+        special = all(channel in WRITES_IDX_MAP for channel, _ in writes)
+        verb = "INSERT OR REPLACE" if special else "INSERT OR IGNORE"
+        with self.lock:
+            self.conn.execute("BEGIN")
+            self.conn.executemany(f"{verb} INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self.conn.execute("COMMIT")
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self.lock:
+            for table in ("checkpoints", "blobs", "writes", "messages"):
+                self.conn.execute(f"DELETE FROM {table} WHERE thread_id=?", (thread_id,))
+            self._drop_logs(thread_id)
+
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
@@ -0,0 +1,133 @@
+import re
+
+# -----------------------------------
+# Structured cohort queries over the loaded tables
+# -----------------------------------
+
+# category -> (combine_patient_documents argument, column, ROLE_PERMISSIONS field)
+#
+# "Immunizations" is in no restricted role's field list, so only Doctor and
+# Supervisor ("ALL") may run immunization cohorts - the same roles whose
+# ROLE_SECTIONS include the immunizations section that RAG retrieves from.
+COHORT_CATEGORIES = {
+    "diagnosis": ("diagnosis_df", "Diagnosis", "Diagnosis"),
+    "medication": ("medications_df", "Medication", "Medication Details"),
+    "prescription": ("prescriptions_df", "Prescription", "Prescriptions"),
+    "alert": ("alerts_df", "Alert", "Alerts"),
+    "immunization": ("immunizations_df", "Immunization", "Immunizations"),
+    "specialty": ("encounters_df", "Specialty", "Encounter History"),
+    "encounter_reason": ("encounters_df", "Reason", "Encounter History"),
+}
+
+# Values such as "No known drug allergies" must not match a search for "allergy"
+NEGATION_PREFIXES = ("no ", "not ", "denies ")
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def normalize_token(token):
+    """
+    Crude plural folding so "allergies"/"allergy" and "alerts"/"alert" meet.
+    """
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text):
+    return [normalize_token(token) for token in TOKEN_PATTERN.findall(str(text).lower())]
+
+
+class CohortIndex:
+    """
+    Inverted indexes from clinical terms to patients, built once from the
+    DataFrames returned by the data_loader load_* functions, so that
+    "list/count all patients with X" questions are answered exactly.
+    """
+
+    def __init__(self, patient_names, value_patients):
+        # PatientID -> Name
+        self.patient_names = patient_names
+        # category -> {value: frozenset(PatientID)}
+        self.value_patients = value_patients
+        # category -> {token: set(value)}
+        self.token_values = {}
+        for category, values in value_patients.items():
+            index = self.token_values[category] = {}
+            for value in values:
+                for token in tokenize(value):
+                    index.setdefault(token, set()).add(value)
+
+    @classmethod
+    def from_dataframes(
+        cls,
+        patient_df,
+        diagnosis_df,
+        medications_df,
+        prescriptions_df,
+        alerts_df,
+        indices_df,
+        encounters_df,
+        immunizations_df,
+    ):
+        tables = {
+            "diagnosis_df": diagnosis_df,
+            "medications_df": medications_df,
+            "prescriptions_df": prescriptions_df,
+            "alerts_df": alerts_df,
+            "encounters_df": encounters_df,
+            "immunizations_df": immunizations_df,
+        }
+        value_patients = {}
+        for category, (table, column, _) in COHORT_CATEGORIES.items():
+            df = tables[table].dropna(subset=["PatientID", column])
+            grouped = df.groupby(df[column].astype(str), observed=True)["PatientID"].unique()
+            value_patients[category] = {value: frozenset(pids) for value, pids in grouped.items()}
+        names = dict(zip(patient_df["PatientID"], patient_df["Name"]))
+        return cls(names, value_patients)
+
+    def match_values(self, category, term):
+        """
+        Values of a category matching term: an exact (case-insensitive) value
+        match, otherwise every value containing all of the term's tokens.
+        """
+        if category not in self.value_patients:
+            raise ValueError(f"Unknown category '{category}'. Use one of: {', '.join(COHORT_CATEGORIES)}")
+        values = self.value_patients[category]
+        exact = [value for value in values if value.lower() == term.strip().lower()]
+        if exact:
+            return exact
+
+        tokens = tokenize(term)
+        if not tokens:
+            return []
+        index = self.token_values[category]
+        matched = set.intersection(*(index.get(token, set()) for token in tokens))
+        return sorted(value for value in matched if not value.lower().startswith(NEGATION_PREFIXES))
+
+    def patients_with(self, category, term):
+        """
+        Sorted PatientIDs with at least one matching value.
+        """
+        pids = set()
+        for value in self.match_values(category, term):
+            pids |= self.value_patients[category][value]
+        return sorted(pids)
+
+    def query(self, category, term, count_only=False, limit=50):
+        """
+        Answer a cohort question as text for the agent.
+        """
+        values = self.match_values(category, term)
+        if not values:
+            return f"No {category} values match '{term}'."
+        pids = self.patients_with(category, term)
+        breakdown = ", ".join(f"{value}: {len(self.value_patients[category][value])}" for value in values)
+        lines = [f"{len(pids)} patients with {category} matching '{term}' ({breakdown})."]
+        if not count_only:
+            lines += [f"{pid} {self.patient_names.get(pid, '')}".rstrip() for pid in pids[:limit]]
+            if len(pids) > limit:
+                lines.append(f"... and {len(pids) - limit} more.")
+        return "\n".join(lines)
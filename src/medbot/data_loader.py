@@ -1,42 +1,476 @@
+import hashlib
+import os
+import string
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 import pandas as pd
-from langchain.schema import Document
+from langchain_core.documents import Document
+
+from src.medbot import snapshot
 
 # -----------------------------------
 # Loaders for each CSV file
 # -----------------------------------
 
-def load_csv_as_df(csv_path):
-    return pd.read_csv(csv_path)
+MONTH_YEAR = "%m/%Y"
+YEAR_MONTH_DAY = "%Y/%m/%d"
+
+# Declared dtypes per table, so pandas does not infer them on every load.
+# Low-cardinality labels are categorical; free text, IDs and mixed values
+# ("141/81", "5.51") stay as strings exactly as written in the CSV.
+# Every date column keeps its text and gets a parsed "<column>_dt" copy.
+TABLE_SCHEMAS = {
+    "patient_details": {
+        "dtype": {"PatientID": str, "Name": str, "Sex": "category", "Phone": str, "DOB": str,
+                  "Address": str, "NextOfKin": str, "NextOfKinPhone": str, "NextOfKinAddress": str},
+        "dates": {"DOB": YEAR_MONTH_DAY},
+    },
+    "diagnosis": {
+        "dtype": {"PatientID": str, "Diagnosis": "category", "State": str, "Status": "category"},
+        "dates": {"State": MONTH_YEAR},
+    },
+    "medications": {
+        "dtype": {"PatientID": str, "Date": str, "Medication": "category"},
+        "dates": {"Date": MONTH_YEAR},
+    },
+    "prescriptions": {
+        "dtype": {"PatientID": str, "Prescription": "category", "Instructions": "category", "Date": str},
+        "dates": {"Date": MONTH_YEAR},
+    },
+    "alerts": {
+        "dtype": {"PatientID": str, "Alert": "category"},
+        "dates": {},
+    },
+    "diabetic_indices": {
+        "dtype": {"PatientID": str, "Index": "category", "Value": str, "MostRecent": str},
+        "dates": {"MostRecent": MONTH_YEAR},
+    },
+    "encounter_history": {
+        "dtype": {"PatientID": str, "Date": str, "Facility": "category", "Specialty": "category",
+                  "Clinician": "category", "Reason": "category", "Type": "category"},
+        "dates": {"Date": MONTH_YEAR},
+    },
+    "immunizations": {
+        "dtype": {"PatientID": str, "Immunization": "category", "MostRecent": str, "NumberReceived": "int64"},
+        "dates": {"MostRecent": MONTH_YEAR},
+    },
+}
+
+# (combine_patient_documents argument, CSV file, schema name) in argument order
+TABLE_FILES = [
+    ("patient_df", "patient_details.csv", "patient_details"),
+    ("diagnosis_df", "diagnosis.csv", "diagnosis"),
+    ("medications_df", "medications.csv", "medications"),
+    ("prescriptions_df", "prescriptions.csv", "prescriptions"),
+    ("alerts_df", "alerts.csv", "alerts"),
+    ("indices_df", "diabetic_indices.csv", "diabetic_indices"),
+    ("encounters_df", "encounter_history.csv", "encounter_history"),
+    ("immunizations_df", "immunizations.csv", "immunizations"),
+]
+
+# Suffix of the parsed copies of date columns; they are derived from the
+# text columns, so fingerprints leave them out
+DATE_SUFFIX = "_dt"
+
+
+def csv_engine():
+    """
+    Fastest available read_csv engine: pyarrow (multithreaded) when installed, otherwise C.
+    """
+    import importlib.util
+    return "pyarrow" if importlib.util.find_spec("pyarrow") is not None else "c"
+
+
+def parse_dates(values, date_format):
+    """
+    Parse a text date column (NaT where missing or unparseable). Each
+    distinct value is parsed once; the columns hold few distinct dates.
+    """
+    codes, uniques = pd.factorize(values)
+    parsed = pd.to_datetime(uniques, format=date_format, errors="coerce")
+    return pd.Series(parsed.take(codes, allow_fill=True, fill_value=pd.NaT), index=values.index)
+
 
-def load_patient_details(csv_path):
-    return load_csv_as_df(csv_path)
+def load_csv_as_df(csv_path, schema=None, engine=None):
+    """
+    Read a CSV with its declared schema.
 
-def load_diagnosis(csv_path):
-    return load_csv_as_df(csv_path)
+    Date columns get a parsed "<column>_dt" copy (NaT where unparseable) and
+    the rows are indexed by PatientID, sorted, with the column kept. Load
+    time, row count and whether a snapshot was used are recorded in df.attrs.
 
-def load_medications(csv_path):
-    return load_csv_as_df(csv_path)
+    With a schema, a current columnar snapshot of the CSV (see snapshot.py)
+    is memory-mapped instead of parsing; after parsing, one is written.
+    """
+    start = time.perf_counter()
+    use_snapshot = schema is not None and snapshot.snapshots_enabled()
+    df = snapshot.read_snapshot(csv_path, schema) if use_snapshot else None
+    from_snapshot = df is not None
+    if df is None:
+        df = _parse_csv(csv_path, schema, engine)
+        if use_snapshot:
+            try:
+                snapshot.write_snapshot(csv_path, schema, df)
+            except (OSError, ValueError) as e:
+                print(f"Could not snapshot {csv_path}: {e}")
+    df.attrs.update({
+        "source": os.path.basename(csv_path),
+        "rows": len(df),
+        "load_seconds": round(time.perf_counter() - start, 4),
+        "from_snapshot": from_snapshot,
+    })
+    return df
 
-def load_prescriptions(csv_path):
-    return load_csv_as_df(csv_path)
+def _parse_csv(csv_path, schema, engine):
+    if schema is None:
+        df = pd.read_csv(csv_path, engine=engine or csv_engine())
+    else:
+        df = pd.read_csv(csv_path, dtype=schema["dtype"], engine=engine or csv_engine())
+        for column, date_format in schema["dates"].items():
+            df[column + DATE_SUFFIX] = parse_dates(df[column], date_format)
+    if "PatientID" in df.columns:
+        df = df.set_index("PatientID", drop=False)
+        if not df.index.is_monotonic_increasing:
+            # Stable, so each patient's rows keep their file order
+            df = df.sort_index(kind="stable")
+    return df
 
-def load_alerts(csv_path):
-    return load_csv_as_df(csv_path)
+def load_patient_details(csv_path, engine=None):
+    return load_csv_as_df(csv_path, TABLE_SCHEMAS["patient_details"], engine)
 
-def load_diabetic_indices(csv_path):
-    return load_csv_as_df(csv_path)
+def load_diagnosis(csv_path, engine=None):
+    return load_csv_as_df(csv_path, TABLE_SCHEMAS["diagnosis"], engine)
 
-def load_encounters(csv_path):
-    return load_csv_as_df(csv_path)
+def load_medications(csv_path, engine=None):
+    return load_csv_as_df(csv_path, TABLE_SCHEMAS["medications"], engine)
 
-def load_immunizations(csv_path):
-    return load_csv_as_df(csv_path)
+def load_prescriptions(csv_path, engine=None):
+    return load_csv_as_df(csv_path, TABLE_SCHEMAS["prescriptions"], engine)
+
+def load_alerts(csv_path, engine=None):
+    return load_csv_as_df(csv_path, TABLE_SCHEMAS["alerts"], engine)
+
+def load_diabetic_indices(csv_path, engine=None):
+    return load_csv_as_df(csv_path, TABLE_SCHEMAS["diabetic_indices"], engine)
+
+def load_encounters(csv_path, engine=None):
+    return load_csv_as_df(csv_path, TABLE_SCHEMAS["encounter_history"], engine)
+
+def load_immunizations(csv_path, engine=None):
+    return load_csv_as_df(csv_path, TABLE_SCHEMAS["immunizations"], engine)
+
+def load_tables(data_dir, workers=len(TABLE_FILES), engine=None):
+    """
+    Load all eight tables concurrently (one thread per table; the CSV parsers
+    release the GIL while parsing).
+
+    Returns:
+        list: DataFrames in combine_patient_documents argument order.
+    """
+    paths = [(os.path.join(data_dir, filename), TABLE_SCHEMAS[schema]) for _, filename, schema in TABLE_FILES]
+    if workers <= 1:
+        return [load_csv_as_df(path, schema, engine) for path, schema in paths]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(lambda args: load_csv_as_df(*args, engine), paths))
+
+def ingestion_report(tables):
+    """
+    One line per table with its row count, load time and memory footprint.
+    Measuring the memory of string columns walks every value, so it is done
+    here rather than at load time.
+    """
+    lines = []
+    for df in tables:
+        attrs = df.attrs
+        memory_bytes = int(df.memory_usage(deep=True).sum())
+        lines.append(f"{attrs.get('source', '?'):<24} {len(df):>8} rows "
+                     f"{attrs.get('load_seconds', 0.0):>8.3f}s {memory_bytes / 2**20:>8.2f} MiB"
+                     f"{' (snapshot)' if attrs.get('from_snapshot') else ''}")
+    return lines
 
 # -----------------------------------
 # Combiner: build per-patient documents
 # -----------------------------------
 
+# Line templates used by the grouped builder. They must render exactly the
+# same text as combine_patient_documents_iterrows below.
+IDENTITY_TEMPLATE = (
+    "PatientID: {PatientID}\n"
+    "Name: {Name}"
+)
+DEMOGRAPHICS_TEMPLATE = (
+    "Sex: {Sex}\n"
+    "DOB: {DOB}"
+)
+CONTACT_TEMPLATE = (
+    "Phone: {Phone}\n"
+    "Address: {Address}\n"
+    "NextOfKin: {NextOfKin} ({NextOfKinPhone}), Address: {NextOfKinAddress}"
+)
+
+# (section name, argument name, section header, line template) in document order
+SECTION_TEMPLATES = [
+    ("diagnoses", "diagnosis_df", "Diagnoses:", " - {Diagnosis} (State: {State}, Status: {Status})"),
+    ("medications", "medications_df", "Medications:", " - {Medication} on {Date}"),
+    ("prescriptions", "prescriptions_df", "Prescriptions:", " - {Prescription}: {Instructions} ({Date})"),
+    ("alerts", "alerts_df", "Alerts:", " - {Alert}"),
+    ("diabetic_indices", "indices_df", "Diabetic Indices:", " - {Index}: {Value} (Most Recent: {MostRecent})"),
+    ("encounters", "encounters_df", "Encounter History:",
+     " - {Date}, {Facility}, {Specialty}, {Clinician}, {Reason} ({Type})"),
+    ("immunizations", "immunizations_df", "Immunizations:",
+     " - {Immunization}: {NumberReceived} doses (Most Recent: {MostRecent})"),
+]
+
+# Section names in document order, for chunking="section"
+SECTIONS = ["identity", "demographics", "contact"] + [section for section, _, _, _ in SECTION_TEMPLATES]
+CHUNKING_MODES = ("patient", "section")
+
+
+def document_layout_hash():
+    """
+    Hash of the templates and sections documents are rendered with. Indexed
+    patients are fingerprinted with it (see store_index.patient_index_state),
+    so a layout change re-embeds them even though their rows did not change.
+    """
+    layout = [IDENTITY_TEMPLATE, DEMOGRAPHICS_TEMPLATE, CONTACT_TEMPLATE, SECTION_TEMPLATES, SECTIONS]
+    return hashlib.sha1(repr(layout).encode("utf-8")).hexdigest()
+
+
+def render_template(df, template):
+    """
+    Render a "{Column}" style template for every row of df as a string Series,
+    using column-wise string concatenation instead of a per-row loop.
+    """
+    rendered = pd.Series("", index=df.index, dtype=object)
+    for literal, field, _, _ in string.Formatter().parse(template):
+        if literal:
+            rendered = rendered + literal
+        if field is not None:
+            rendered = rendered + df[field].astype(str).astype(object)
+    return rendered
+
+
+def render_section_blocks(df, header, template):
+    """
+    Render one section for every patient in df.
+
+    Returns:
+        pd.Series: Section text (header plus one line per row) indexed by PatientID.
+    """
+    if df.empty:
+        return pd.Series(dtype=object)
+    lines = render_template(df, template).to_numpy()
+    codes, patient_ids = pd.factorize(df["PatientID"])
+    # Stable sort keeps the original row order inside each patient;
+    # rows without a PatientID (code -1) sort first and are dropped.
+    order = np.argsort(codes, kind="stable")
+    sorted_codes = codes[order]
+    lines = lines[order].tolist()
+    starts = np.flatnonzero(np.diff(sorted_codes, prepend=-2)).tolist()
+    ends = starts[1:] + [len(lines)]
+    blocks = pd.Series(
+        [header + "\n" + "\n".join(lines[s:e]) for s, e in zip(starts, ends)],
+        index=np.asarray(patient_ids.take(sorted_codes[starts]), dtype=object),
+        dtype=object,
+    )
+    return blocks[sorted_codes[starts] >= 0]
+
+
+def _render_section_columns(patient_df, child_dfs, sections):
+    """
+    Render the given sections for every row of patient_df. The identity
+    section (PatientID and Name) is always rendered first.
+
+    Returns:
+        list: (section name, Series aligned with patient_df, NaN where the
+            patient has no rows for that section) in document order.
+    """
+    patient_ids = patient_df["PatientID"].to_numpy()
+    columns = [("identity", render_template(patient_df, IDENTITY_TEMPLATE))]
+    if "demographics" in sections:
+        columns.append(("demographics", render_template(patient_df, DEMOGRAPHICS_TEMPLATE)))
+    if "contact" in sections:
+        columns.append(("contact", render_template(patient_df, CONTACT_TEMPLATE)))
+    for section, arg_name, header, template in SECTION_TEMPLATES:
+        if section not in sections:
+            continue
+        blocks = render_section_blocks(child_dfs[arg_name], header, template)
+        columns.append((section, pd.Series(blocks.reindex(patient_ids).to_numpy(), index=patient_df.index)))
+    return columns
+
+
+def _render_patient_texts(patient_df, child_dfs, chunking="patient", sections=SECTIONS):
+    """
+    Render document texts for every row of patient_df.
+
+    Args:
+        patient_df (pd.DataFrame): Patient details rows.
+        child_dfs (dict): Child tables keyed by combine_patient_documents argument name.
+        chunking (str): "patient" for one text per patient, "section" for one
+            text per (patient, non-empty section).
+        sections (list): Sections to include; identity is always included.
+
+    Returns:
+        list: (PatientID, section or None, text) tuples in patient_df order.
+    """
+    patient_ids = patient_df["PatientID"].tolist()
+    columns = _render_section_columns(patient_df, child_dfs, sections)
+
+    if chunking == "section":
+        section_values = [(section, column.tolist()) for section, column in columns]
+        rendered = []
+        for i, pid in enumerate(patient_ids):
+            for section, values in section_values:
+                text = values[i]
+                if not isinstance(text, str):
+                    continue
+                # Every chunk names its patient so it can be retrieved on its own
+                if section != "identity":
+                    text = f"PatientID: {pid}\n{text}"
+                rendered.append((pid, section, text))
+        return rendered
+
+    texts = columns[0][1]
+    for _, column in columns[1:]:
+        texts = texts + ("\n" + column).fillna("")
+    return [(pid, None, text) for pid, text in zip(patient_ids, texts.tolist())]
+
+
+def build_patient_documents(
+    patient_df,
+    diagnosis_df,
+    medications_df,
+    prescriptions_df,
+    alerts_df,
+    indices_df,
+    encounters_df,
+    immunizations_df,
+    chunking="patient",
+    sections=None,
+):
+    """
+    Build one Document per patient by grouping each child table by PatientID
+    once, instead of filtering every table for every patient.
+
+    Args:
+        patient_df ... immunizations_df (pd.DataFrame): Tables from the load_* functions.
+        chunking (str): "patient" (default) builds one Document per patient,
+            identical to combine_patient_documents_iterrows output. "section"
+            builds one Document per (patient, section) with "PatientID" and
+            "section" metadata, so retrieval can return only relevant sections.
+        sections (list, optional): Project the documents onto these SECTIONS
+            (e.g. one role's view). The identity section is always kept.
+            Defaults to all sections.
+
+    Returns:
+        list: LangChain Documents.
+    """
+    if chunking not in CHUNKING_MODES:
+        raise ValueError(f"Unknown chunking mode '{chunking}'. Use one of: {', '.join(CHUNKING_MODES)}")
+    if sections is None:
+        sections = SECTIONS
+    unknown = set(sections) - set(SECTIONS)
+    if unknown:
+        raise ValueError(f"Unknown sections {sorted(unknown)}. Use any of: {', '.join(SECTIONS)}")
+    child_dfs = {
+        "diagnosis_df": diagnosis_df,
+        "medications_df": medications_df,
+        "prescriptions_df": prescriptions_df,
+        "alerts_df": alerts_df,
+        "indices_df": indices_df,
+        "encounters_df": encounters_df,
+        "immunizations_df": immunizations_df,
+    }
+    if patient_df.empty:
+        return []
+
+    rendered = _render_patient_texts(patient_df, child_dfs, chunking, sections)
+
+    return [
+        Document(page_content=text, metadata={"PatientID": pid} if section is None
+                 else {"PatientID": pid, "section": section})
+        for pid, section, text in rendered
+    ]
+
+
 def combine_patient_documents(
+    patient_df,
+    diagnosis_df,
+    medications_df,
+    prescriptions_df,
+    alerts_df,
+    indices_df,
+    encounters_df,
+    immunizations_df,
+    chunking="patient",
+    sections=None,
+):
+    # Kept as the public entry point used by app.py and the graph scripts
+    return build_patient_documents(
+        patient_df, diagnosis_df, medications_df, prescriptions_df,
+        alerts_df, indices_df, encounters_df, immunizations_df,
+        chunking=chunking, sections=sections,
+    )
+
+
+def patient_fingerprints(
+    patient_df,
+    diagnosis_df,
+    medications_df,
+    prescriptions_df,
+    alerts_df,
+    indices_df,
+    encounters_df,
+    immunizations_df,
+):
+    """
+    Fingerprint the rows that feed each patient's document.
+
+    A patient's fingerprint changes exactly when one of their rows in any of
+    the eight tables is added, removed, edited or reordered, so it can be used
+    to decide which patients need to be re-embedded.
+
+    Returns:
+        dict: PatientID -> hex digest.
+    """
+    tables = [patient_df, diagnosis_df, medications_df, prescriptions_df,
+              alerts_df, indices_df, encounters_df, immunizations_df]
+    per_table = [_group_row_hashes(df) for df in tables]
+
+    fingerprints = {}
+    for pid in patient_df["PatientID"].dropna().unique().tolist():
+        digest = hashlib.sha1()
+        for table_hashes in per_table:
+            digest.update(table_hashes.get(pid, b""))
+            digest.update(b"|")
+        fingerprints[pid] = digest.hexdigest()
+    return fingerprints
+
+
+def _group_row_hashes(df):
+    """
+    Concatenate the 64-bit row hashes of df per PatientID, in row order.
+    """
+    if df.empty:
+        return {}
+    source_columns = [c for c in df.columns if not str(c).endswith(DATE_SUFFIX)]
+    row_hashes = pd.util.hash_pandas_object(df[source_columns], index=False).to_numpy()
+    codes, patient_ids = pd.factorize(df["PatientID"])
+    order = np.argsort(codes, kind="stable")
+    sorted_codes = codes[order]
+    row_hashes = row_hashes[order]
+    starts = np.flatnonzero(np.diff(sorted_codes, prepend=-2)).tolist()
+    ends = starts[1:] + [len(row_hashes)]
+    return {
+        patient_ids[sorted_codes[s]]: row_hashes[s:e].tobytes()
+        for s, e in zip(starts, ends)
+        if sorted_codes[s] >= 0
+    }
+
+
+def combine_patient_documents_iterrows(
     patient_df,
     diagnosis_df,
     medications_df,
@@ -46,6 +480,8 @@ def combine_patient_documents(
     encounters_df,
     immunizations_df
 ):
+    # Reference implementation: scans every child table once per patient.
+    # Kept for equivalence tests and benchmarks/bench_combine_documents.py.
     patient_docs = []
 
     for _, patient in patient_df.iterrows():
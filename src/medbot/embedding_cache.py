@@ -0,0 +1,251 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+try:
+    import fcntl
+except ImportError:  # Windows: instances in one process are still safe
+    fcntl = None
+
+# -----------------------------------
+# On-disk embedding cache
+# -----------------------------------
+#
+# Layout of a cache directory (one per model):
+#   meta.json    model name, vector dimension and capacity
+#   vectors.f32  float32 [capacity, dim] memory-mapped vectors
+#   keys.bin     32-byte sha256 key per slot
+#   ticks.u64    last-use counter per slot (0 = empty), used to rebuild the LRU order
+#   lock         flock'ed while slots are claimed, so processes never share a slot
+
+CACHE_FORMAT_VERSION = 1
+DEFAULT_MAX_ENTRIES = 200_000
+
+
+def cache_key(model_name, text):
+    """
+    sha256 over (model name, text); the same text embedded by two models
+    never shares an entry.
+    """
+    digest = hashlib.sha256()
+    digest.update(model_name.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(text.encode("utf-8"))
+    return digest.digest()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that serves repeated texts from a bounded,
+    memory-mapped LRU cache and only sends misses to the wrapped embedder.
+    """
+
+    def __init__(self, embedder, model_name, cache_dir, max_entries=DEFAULT_MAX_ENTRIES):
+        self.embedder = embedder
+        self.model_name = model_name
+        self.cache_dir = os.path.join(cache_dir, _safe_dirname(model_name))
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._dim = None
+        self._vectors = None
+        self._keys = None
+        self._ticks = None
+        self._slots = OrderedDict()  # key -> slot, least recently used first
+        self._tick = 0
+        self._open_existing()
+
+    # ----- Embeddings interface -----
+
+    def embed_documents(self, texts):
+        keys = [cache_key(self.model_name, text) for text in texts]
+        results = [None] * len(texts)
+        missing = {}
+
+        with self._lock:
+            for i, key in enumerate(keys):
+                vector = self._get(key)
+                if vector is not None:
+                    results[i] = vector
+                    self.hits += 1
+                else:
+                    missing.setdefault(key, []).append(i)
+
+        if missing:
+            order = list(missing)
+            first_index = [missing[key][0] for key in order]
+            vectors = self.embedder.embed_documents([texts[i] for i in first_index])
+            # A call with more distinct misses than the cache holds only
+            # caches its last max_entries vectors; the rest are returned uncached
+            skip = max(0, len(order) - self.max_entries)
+            with self._lock, self._file_lock():
+                self.misses += len(order)
+                # Hand out float32 values so hits and misses agree
+                stored = [_as_float32(vector) for vector in vectors[:skip]]
+                stored += self._put_many(order[skip:], vectors[skip:])
+                for key, vector in zip(order, stored):
+                    for i in missing[key]:
+                        results[i] = vector
+                self._flush()
+        return results
+
+    def embed_query(self, text):
+        key = cache_key(self.model_name, "query\0" + text)
+        with self._lock:
+            vector = self._get(key)
+            if vector is not None:
+                self.hits += 1
+                return vector
+        vector = self.embedder.embed_query(text)
+        with self._lock, self._file_lock():
+            self.misses += 1
+            [vector] = self._put_many([key], [vector])
+            self._flush()
+        return vector
+
+    # ----- Metrics -----
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "model_name": self.model_name,
+            "entries": int(np.count_nonzero(self._ticks)) if self._ticks is not None else 0,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+    # ----- Storage -----
+    #
+    # Several instances (and processes) may share one cache directory. Slots
+    # are only claimed under an exclusive lock on the directory, from the
+    # on-disk ticks; self._slots is this instance's view and may go stale
+    # when another instance reuses a slot, so every hit re-checks the key
+    # stored in the slot.
+
+    @contextmanager
+    def _file_lock(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(os.path.join(self.cache_dir, "lock"), "a+b") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _open_existing(self):
+        meta_path = os.path.join(self.cache_dir, "meta.json")
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if (meta.get("version") != CACHE_FORMAT_VERSION or meta.get("model_name") != self.model_name
+                or meta.get("max_entries") != self.max_entries):
+            return False
+        self._map_files(meta["dim"], mode="r+")
+
+        used = np.flatnonzero(self._ticks)
+        for slot in used[np.argsort(self._ticks[used], kind="stable")].tolist():
+            self._slots[self._keys[slot].tobytes()] = slot
+        self._tick = int(self._ticks.max()) if len(used) else 0
+        return True
+
+    def _create(self, dim):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._map_files(dim, mode="w+")
+        with open(os.path.join(self.cache_dir, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({
+                "version": CACHE_FORMAT_VERSION,
+                "model_name": self.model_name,
+                "dim": dim,
+                "max_entries": self.max_entries,
+            }, f)
+
+    def _map_files(self, dim, mode):
+        self._dim = dim
+        self._vectors = np.memmap(os.path.join(self.cache_dir, "vectors.f32"), dtype=np.float32,
+                                  mode=mode, shape=(self.max_entries, dim))
+        self._keys = np.memmap(os.path.join(self.cache_dir, "keys.bin"), dtype=np.uint8,
+                               mode=mode, shape=(self.max_entries, 32))
+        self._ticks = np.memmap(os.path.join(self.cache_dir, "ticks.u64"), dtype=np.uint64,
+                                mode=mode, shape=(self.max_entries,))
+
+    def _get(self, key):
+        slot = self._slots.get(key)
+        if slot is None:
+            return None
+        vector = self._vectors[slot].tolist()
+        # Read the vector first: a writer clears the key before it overwrites
+        # the vector, so a matching key afterwards means the vector is this key's
+        if self._keys[slot].tobytes() != key:
+            del self._slots[key]
+            return None
+        self._slots.move_to_end(key)
+        self._touch(slot)
+        return vector
+
+    def _put_many(self, keys, vectors):
+        """
+        Store vectors under keys; the caller holds self._lock and the file lock.
+
+        Returns:
+            list: The stored (float32) vectors, in order.
+        """
+        if self._vectors is None:
+            # Another instance may have created the files since __init__
+            if not self._open_existing():
+                self._create(len(vectors[0]))
+        self._tick = max(self._tick, int(self._ticks.max()))
+        free = iter(np.flatnonzero(self._ticks == 0).tolist())
+        oldest = None
+        claimed = set()
+        stored = []
+        for key, vector in zip(keys, vectors):
+            slot = self._slots.get(key)
+            if slot is None or self._keys[slot].tobytes() != key:
+                slot = next(free, None)
+                if slot is None:
+                    if oldest is None:
+                        oldest = iter(np.argsort(self._ticks, kind="stable").tolist())
+                    slot = next(s for s in oldest if s not in claimed)
+                    self._slots.pop(self._keys[slot].tobytes(), None)
+                    self.evictions += 1
+                self._slots[key] = slot
+            claimed.add(slot)
+            self._slots.move_to_end(key)
+            self._keys[slot] = 0
+            self._vectors[slot] = np.asarray(vector, dtype=np.float32)
+            self._keys[slot] = np.frombuffer(key, dtype=np.uint8)
+            self._touch(slot)
+            stored.append(self._vectors[slot].tolist())
+        return stored
+
+    def _touch(self, slot):
+        self._tick += 1
+        self._ticks[slot] = self._tick
+
+    def _flush(self):
+        for mapped in (self._vectors, self._keys, self._ticks):
+            if mapped is not None:
+                mapped.flush()
+
+
+def _as_float32(vector):
+    return np.asarray(vector, dtype=np.float32).tolist()
+
+
+def _safe_dirname(model_name):
+    return "".join(c if c.isalnum() or c in "-_." else "_" for c in model_name)
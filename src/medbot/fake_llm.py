@@ -0,0 +1,245 @@
+import hashlib
+import json
+import os
+import re
+import time
+from typing import Any, Iterator, List, Optional
+
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+# -----------------------------------
+# Offline stand-in for the OpenAI chat model
+# -----------------------------------
+#
+# A deterministic chat model for running the agents without an API key:
+# tests, demos and load tests. It follows a fixed script:
+#   - a user question, with tools bound: call the cohort tool for "all
+#     patients"/"how many" questions, otherwise the retrieval tool
+#     (medical_rag_tool) once per patient ID mentioned, or once for the
+#     whole question;
+#   - after tool results: answer with the tool outputs;
+#   - without tools (the RetrievalQA call): answer with the context lines
+#     that best match the question.
+# Latency is simulated as a fixed wait before the first token plus a token
+# rate, so timings under load look like a remote model's.
+
+# MEDBOT_LLM=fake makes helper.create_chat_openai_llm return this model
+LLM_ENV = "MEDBOT_LLM"
+LATENCY_ENV = "MEDBOT_FAKE_LLM_LATENCY"
+TOKENS_PER_SECOND_ENV = "MEDBOT_FAKE_LLM_TOKENS_PER_SECOND"
+
+PATIENT_ID = re.compile(r"\bGME\d{4,}\b", re.IGNORECASE)
+COHORT_QUESTION = re.compile(r"\b(all patients|how many|which patients|list (all )?patients|patients (with|who|on|taking))\b",
+                             re.IGNORECASE)
+# Cohort category -> words that point to it; diagnosis when none match
+COHORT_KEYWORDS = {
+    "medication": ("medication", "taking", "drug"),
+    "prescription": ("prescription", "prescribed"),
+    "alert": ("alert", "allerg"),
+    "immunization": ("immuniz", "vaccin"),
+    "specialty": ("specialty", "seen by"),
+}
+COHORT_STOP_WORDS = {"all", "patients", "patient", "with", "who", "have", "has", "are", "on", "taking", "list",
+                     "which", "how", "many", "the", "a", "an", "of", "any", "show", "me", "alerts", "alert",
+                     "medications", "medication", "prescriptions", "prescription", "immunizations", "immunization"}
+_TOKEN = re.compile(r"\S+\s*|\s+")
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def split_tokens(text):
+    """
+    Whitespace-delimited pseudo tokens; joined back they give text exactly.
+    """
+    return _TOKEN.findall(text)
+
+
+def _text(message):
+    return message.content if isinstance(message.content, str) else str(message.content)
+
+
+def _call_id(*parts):
+    return "call_" + hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()[:12]
+
+
+def _retrieval_tool(tools):
+    # The first bound tool taking a free-text query (medical_rag_tool, hospital_rag_tool, ...)
+    for tool in tools:
+        function = tool["function"]
+        if function["name"] != "cohort_query_tool" and "query" in function.get("parameters", {}).get("properties", {}):
+            return function["name"]
+    return None
+
+
+def plan_tool_calls(question, tools):
+    """
+    The tool calls the fake model makes for a user question, given the bound
+    tools in OpenAI format.
+
+    Returns:
+        list: LangChain tool call dicts (empty when no bound tool fits).
+    """
+    names = {tool["function"]["name"] for tool in tools}
+    if "cohort_query_tool" in names and COHORT_QUESTION.search(question):
+        lowered = question.lower()
+        category = next((c for c, words in COHORT_KEYWORDS.items() if any(w in lowered for w in words)),
+                        "diagnosis")
+        term = " ".join(w for w in _WORD.findall(lowered) if w not in COHORT_STOP_WORDS) or lowered
+        args = {"category": category, "term": term, "count_only": "how many" in lowered}
+        return [{"name": "cohort_query_tool", "args": args, "id": _call_id(question, category), "type": "tool_call"}]
+    name = _retrieval_tool(tools)
+    if name is None:
+        return []
+    patients = list(dict.fromkeys(p.upper() for p in PATIENT_ID.findall(question)))
+    if len(patients) <= 1:
+        return [{"name": name, "args": {"query": question}, "id": _call_id(question), "type": "tool_call"}]
+    # One lookup per patient, as a real model does for "compare A and B"
+    rest = " ".join(PATIENT_ID.sub("", question).split())
+    return [{"name": name, "args": {"query": f"{rest} {pid}".strip()}, "id": _call_id(question, pid),
+             "type": "tool_call"} for pid in patients]
+
+
+def _stems(text):
+    # First five letters, so "diagnosis" matches "Diagnoses:"
+    # (patient IDs are compared whole, separately)
+    return {word[:5] for word in _WORD.findall(text.lower()) if word.isalpha() and word not in COHORT_STOP_WORDS}
+
+
+def answer_from_context(context, question, max_passages=3):
+    """
+    The retrieved passages (blank-line separated, as the "stuff" chain joins
+    documents) that best match the question: its patient IDs count double,
+    then shared words. Passages keep their original order.
+    """
+    # The QA prompt's instructions end with a dashed rule before the documents
+    context = re.split(r"^-{8,}$", context, flags=re.MULTILINE)[-1]
+    passages = [p.strip() for p in re.split(r"\n\s*\n", context) if p.strip()]
+    patients = {p.upper() for p in PATIENT_ID.findall(question)}
+    words = _stems(question)
+    scored = []
+    for position, passage in enumerate(passages):
+        mentioned = {p.upper() for p in PATIENT_ID.findall(passage)}
+        score = 2 * len(patients & mentioned) + len(words & _stems(passage))
+        if score:
+            scored.append((score, position))
+    if not scored:
+        return "I don't know."
+    best = sorted(scored, key=lambda s: (-s[0], s[1]))[:max_passages]
+    return "\n\n".join(passages[position] for position in sorted(position for _, position in best))
+
+
+class FakeToolCallingChatModel(BaseChatModel):
+    """
+    Deterministic chat model with tool calling and simulated latency.
+
+    Args:
+        latency: Seconds before the first token (network + prompt processing).
+        tokens_per_second: Generation rate; 0 produces the answer instantly.
+        max_answer_tokens: Answers are cut to this many tokens.
+    """
+
+    latency: float = 0.0
+    tokens_per_second: float = 0.0
+    max_answer_tokens: int = 200
+    model_name: str = "fake-tool-calling"
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-tool-calling"
+
+    @property
+    def _identifying_params(self):
+        return {"model_name": self.model_name, "latency": self.latency, "tokens_per_second": self.tokens_per_second}
+
+    def bind_tools(self, tools, *, tool_choice=None, **kwargs):
+        return self.bind(tools=[convert_to_openai_tool(t) for t in tools], **kwargs)
+
+    def respond(self, messages: List[BaseMessage], tools=None) -> AIMessage:
+        """
+        The scripted reply to messages, without any simulated delay.
+        """
+        last = messages[-1]
+        if isinstance(last, HumanMessage) and tools:
+            calls = plan_tool_calls(_text(last), tools)
+            if calls:
+                return AIMessage(content="", tool_calls=calls)
+        if isinstance(last, ToolMessage):
+            results = []
+            for message in reversed(messages):
+                if not isinstance(message, ToolMessage):
+                    break
+                results.append(_text(message))
+            content = "\n\n".join(reversed(results))
+        else:
+            context = "\n".join(_text(m) for m in messages[:-1] if not isinstance(m, AIMessage))
+            content = answer_from_context(context, _text(last))
+        content = "".join(split_tokens(content)[:self.max_answer_tokens])
+        return AIMessage(content=content)
+
+    def _usage(self, messages, reply):
+        input_tokens = sum(len(split_tokens(_text(m))) for m in messages)
+        output_tokens = len(split_tokens(_text(reply))) + len(reply.tool_calls)
+        return {"input_tokens": input_tokens, "output_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens}
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        reply = self.respond(messages, kwargs.get("tools"))
+        reply.usage_metadata = self._usage(messages, reply)
+        delay = self.latency
+        if self.tokens_per_second > 0:
+            delay += reply.usage_metadata["output_tokens"] / self.tokens_per_second
+        if delay > 0:
+            time.sleep(delay)
+        return ChatResult(generations=[ChatGeneration(message=reply)])
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        reply = self.respond(messages, kwargs.get("tools"))
+        usage = self._usage(messages, reply)
+        if self.latency > 0:
+            time.sleep(self.latency)
+        gap = 1.0 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+        if reply.tool_calls:
+            if gap:
+                time.sleep(gap * usage["output_tokens"])
+            chunk = AIMessageChunk(content="", usage_metadata=usage, tool_call_chunks=[
+                {"name": c["name"], "args": json.dumps(c["args"]), "id": c["id"], "index": i, "type": "tool_call_chunk"}
+                for i, c in enumerate(reply.tool_calls)
+            ])
+            yield ChatGenerationChunk(message=chunk)
+            return
+        tokens = split_tokens(reply.content) or [""]
+        for i, token in enumerate(tokens):
+            if gap:
+                time.sleep(gap)
+            # Usage is reported once, on the last chunk
+            chunk = AIMessageChunk(content=token, usage_metadata=usage if i == len(tokens) - 1 else None)
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=ChatGenerationChunk(message=chunk))
+            yield ChatGenerationChunk(message=chunk)
+
+
+def create_fake_chat_llm(latency=None, tokens_per_second=None):
+    """
+    FakeToolCallingChatModel configured from MEDBOT_FAKE_LLM_LATENCY (seconds)
+    and MEDBOT_FAKE_LLM_TOKENS_PER_SECOND unless given explicitly.
+    """
+    if latency is None:
+        latency = float(os.getenv(LATENCY_ENV, "0"))
+    if tokens_per_second is None:
+        tokens_per_second = float(os.getenv(TOKENS_PER_SECOND_ENV, "0"))
+    return FakeToolCallingChatModel(latency=latency, tokens_per_second=tokens_per_second)
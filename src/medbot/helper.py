@@ -1,11 +1,7 @@
 
 import os
 import pandas as pd
-from langchain.schema import Document
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_community.vectorstores import Chroma
-from langchain_openai import ChatOpenAI
-from langchain.chains import RetrievalQA
+from langchain_core.documents import Document
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -73,38 +69,130 @@ def create_langchain_documents(documents):
     return [Document(page_content=text) for text in documents]
 
 
-def create_chroma_vectorstore(lc_documents, model_name="all-MiniLM-L6-v2"):
+def create_chroma_vectorstore(lc_documents, model_name="all-MiniLM-L6-v2", persist_directory=None,
+                              fingerprints=None, batch_size=None, workers=None):
     """
     Create a Chroma vectorstore from LangChain documents using HuggingFace embeddings.
 
     Args:
         lc_documents (list): List of LangChain Document objects.
         model_name (str): The HuggingFace model to use for embeddings.
+        persist_directory (str, optional): Directory to save the index and its
+            manifest in. A saved index is reloaded instead of rebuilt while the
+            manifest (model, document hash, schema version) still matches.
+        fingerprints (dict, optional): PatientID -> fingerprint of the source
+            rows (see data_loader.patient_fingerprints). When the documents
+            changed, only patients whose fingerprint changed are re-embedded.
+        batch_size (int, optional): Documents per embedding batch; batches are
+            cut from length-sorted documents (default MEDBOT_EMBED_BATCH_SIZE).
+        workers (int, optional): Embedding worker processes, 0 to embed in this
+            process (default MEDBOT_EMBED_WORKERS).
 
     Returns:
         Chroma: A Chroma vectorstore instance.
     """
-    embedder = HuggingFaceEmbeddings(model_name=model_name)
-    vectorstore = Chroma.from_documents(lc_documents, embedding=embedder)
-    return vectorstore
+    from src.medbot.store_index import create_chroma_vectorstore as create_indexed_chroma
+    return create_indexed_chroma(
+        lc_documents, model_name=model_name, persist_directory=persist_directory, fingerprints=fingerprints,
+        batch_size=batch_size, workers=workers,
+    )
+
+
+def create_hybrid_retriever(vectorstore, lc_documents, lexical_weight=1.0, dense_weight=1.0,
+                            search_kwargs=None):
+    """
+    Create a BM25 + vector search retriever merged with reciprocal rank fusion.
+
+    Args:
+        vectorstore: The vectorstore used for dense search.
+        lc_documents (list): The documents the vectorstore was built from.
+        lexical_weight (float): RRF weight of the BM25 ranking (0 disables it).
+        dense_weight (float): RRF weight of the vector ranking (0 disables it).
+        search_kwargs (dict, optional): Extra vector search arguments, e.g. a metadata filter.
+
+    Returns:
+        HybridRetriever: A drop-in retriever for create_retrieval_qa_chain.
+    """
+    from src.medbot.retrievers import HybridRetriever
+    return HybridRetriever.from_documents(
+        lc_documents, dense=vectorstore.as_retriever(search_kwargs=search_kwargs or {}),
+        lexical_weight=lexical_weight, dense_weight=dense_weight,
+    )
+
+
+def create_patient_retriever(vectorstore, lc_documents, lexical_weight=1.0, dense_weight=1.0,
+                             sections=None):
+    """
+    Create a retriever that looks up patients named in the query (e.g. GME0807)
+    directly by PatientID and falls back to hybrid BM25 + vector search otherwise.
+
+    Args:
+        vectorstore: The vectorstore used for queries without a patient ID.
+        lc_documents (list): The documents the vectorstore was built from.
+        lexical_weight (float): BM25 weight of the fallback (0 = vector search only).
+        dense_weight (float): Vector search weight of the fallback.
+        sections (list, optional): Restrict every retrieval path to these
+            document sections (e.g. hospital_agents.role_sections(role)).
+            Requires documents built with chunking="section".
+
+    Returns:
+        PatientIDRetriever: A retriever usable with create_retrieval_qa_chain.
+    """
+    from src.medbot.retrievers import PatientIDRetriever
+    search_kwargs = {}
+    if sections is not None:
+        if not all("section" in doc.metadata for doc in lc_documents):
+            raise ValueError("Section projection needs documents built with chunking='section'.")
+        lc_documents = [doc for doc in lc_documents if doc.metadata["section"] in sections]
+        search_kwargs = {"filter": {"section": {"$in": list(sections)}}}
 
+    if lexical_weight > 0:
+        fallback = create_hybrid_retriever(vectorstore, lc_documents, lexical_weight, dense_weight, search_kwargs)
+    else:
+        fallback = vectorstore.as_retriever(search_kwargs=search_kwargs)
+    return PatientIDRetriever.from_documents(lc_documents, fallback=fallback)
 
 
-def create_chat_openai_llm(model_name="gpt-3.5-turbo"):
+# One ChatOpenAI client (and HTTP connection pool) per model and API key
+_CHAT_LLMS = {}
+
+def create_chat_openai_llm(model_name="gpt-3.5-turbo", shared=True):
     """
     Create a ChatOpenAI LLM instance using API key from .env.
 
     Args:
         model_name (str): OpenAI model name.
+        shared (bool): Reuse the process-wide client for this model instead of
+            opening a new connection pool.
+
+    With MEDBOT_LLM=fake, returns the offline FakeToolCallingChatModel
+    (fake_llm.py) instead; no API key is needed.
 
     Returns:
         ChatOpenAI: An LLM instance.
     """
+    from src.medbot import fake_llm
+
+    if os.getenv(fake_llm.LLM_ENV, "openai").lower() == "fake":
+        if not shared:
+            return fake_llm.create_fake_chat_llm()
+        key = ("fake", os.getenv(fake_llm.LATENCY_ENV), os.getenv(fake_llm.TOKENS_PER_SECOND_ENV))
+        if key not in _CHAT_LLMS:
+            _CHAT_LLMS[key] = fake_llm.create_fake_chat_llm()
+        return _CHAT_LLMS[key]
+
+    from langchain_openai import ChatOpenAI
+
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
         raise ValueError("OPENAI_API_KEY not found in environment variables. Please check your .env file.")
 
-    return ChatOpenAI(model_name=model_name, openai_api_key=api_key)
+    if not shared:
+        return ChatOpenAI(model_name=model_name, openai_api_key=api_key)
+    key = (model_name, api_key)
+    if key not in _CHAT_LLMS:
+        _CHAT_LLMS[key] = ChatOpenAI(model_name=model_name, openai_api_key=api_key)
+    return _CHAT_LLMS[key]
 
 def create_retrieval_qa_chain(llm, retriever, chain_type="stuff", k=5):
     """
@@ -119,6 +207,8 @@ def create_retrieval_qa_chain(llm, retriever, chain_type="stuff", k=5):
     Returns:
         RetrievalQA: A QA chain ready to invoke.
     """
+    from langchain.chains import RetrievalQA
+
     retriever.search_kwargs = {"k": k}
 
 
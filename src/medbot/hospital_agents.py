@@ -1,10 +1,12 @@
 import csv
+import threading
 from datetime import datetime
 from typing import Sequence, Annotated, Dict, TypedDict, List
 from langchain_core.messages import BaseMessage, SystemMessage, HumanMessage, ToolMessage
-from langchain.schema import Document
+from langchain_core.documents import Document
 from langgraph.graph import StateGraph, END
-from operator import add as add_messages
+from langgraph.graph.message import add_messages
+from src.medbot.policy import CRITICAL_KEYWORDS, FIELD_ALIASES, PolicyMatcher
 
 # -----------------------------------
 # 1. USER, ROLE, AND PERMISSION SETUP
@@ -29,7 +31,44 @@ ROLE_PERMISSIONS = {
     }
 }
 
-AUDIT_LOG = []
+# Document sections (data_loader.SECTIONS) each role's retriever may return.
+# Retrieval is filtered to these sections inside the vector-store query, so
+# denied fields (addresses, next-of-kin, prescriptions...) never reach the LLM.
+ROLE_SECTIONS = {
+    "Nurse": ["identity", "demographics", "diagnoses", "alerts", "encounters"],
+    "Pharmacist": ["identity", "medications", "prescriptions"],
+    "Doctor": "ALL",
+    "Supervisor": "ALL"
+}
+
+_AUDIT_STORE = None
+_AUDIT_STORE_LOCK = threading.Lock()
+
+def audit_store():
+    """
+    The process-wide AuditStore (created on first use at MEDBOT_AUDIT_DB).
+    """
+    global _AUDIT_STORE
+    with _AUDIT_STORE_LOCK:
+        if _AUDIT_STORE is None:
+            from src.medbot.audit import AuditStore
+            _AUDIT_STORE = AuditStore()
+        return _AUDIT_STORE
+
+def set_audit_store(store):
+    """
+    Route log_event/view_audit_log to store (e.g. another database file).
+    Returns the previous store, or None if none was created yet.
+    """
+    global _AUDIT_STORE
+    with _AUDIT_STORE_LOCK:
+        previous, _AUDIT_STORE = _AUDIT_STORE, store
+        return previous
+
+def role_sections(role):
+    from src.medbot.data_loader import SECTIONS
+    sections = ROLE_SECTIONS[role]
+    return list(SECTIONS) if sections == "ALL" else list(sections)
 
 def load_users(filepath=r"I:\Code Space\LLM Model Project\RAG\medbot\Data\user_credentials.csv"):
     users = {}
@@ -45,44 +84,69 @@ def authenticate(users, username, password):
         return user["role"]
     return None
 
-def check_permission(role, query):
+_QUERY_POLICY = None
+
+def query_policy():
+    """
+    PolicyMatcher over every ROLE_PERMISSIONS field and CRITICAL_KEYWORDS, built once.
+    """
+    global _QUERY_POLICY
+    if _QUERY_POLICY is None:
+        fields = []
+        for permissions in ROLE_PERMISSIONS.values():
+            for key in ("fields", "deny"):
+                if permissions[key] != "ALL":
+                    fields.extend(f for f in permissions[key] if f not in fields)
+        _QUERY_POLICY = PolicyMatcher(fields, CRITICAL_KEYWORDS, FIELD_ALIASES)
+    return _QUERY_POLICY
+
+def evaluate_query(role, query):
+    """
+    Permission and criticality of a query, from a single pass over it.
+
+    Returns:
+        dict: allowed, criticality ("Critical"/"Normal"), fields, denied and critical_terms.
+    """
+    match = query_policy().match(query)
     allowed = ROLE_PERMISSIONS[role]["fields"]
-    denied = ROLE_PERMISSIONS[role]["deny"]
+    denied = [d for d in ROLE_PERMISSIONS[role]["deny"] if d in match["fields"]]
     if allowed == "ALL":
-        return True
-    for d in denied:
-        if d.lower() in query.lower():
-            return False
-    for f in allowed:
-        if f.lower() in query.lower():
-            return True
-    return False
+        permitted = True
+    else:
+        permitted = not denied and any(f in match["fields"] for f in allowed)
+    return {
+        "allowed": permitted,
+        "criticality": "Critical" if match["critical"] else "Normal",
+        "fields": match["fields"],
+        "denied": denied,
+        "critical_terms": match["critical"],
+    }
+
+def check_permission(role, query):
+    return evaluate_query(role, query)["allowed"]
 
 def log_event(username, role, event, critical=False):
-    AUDIT_LOG.append({
-        "timestamp": datetime.now().isoformat(timespec='seconds'),
-        "username": username,
-        "role": role,
-        "event": event,
-        "critical": critical
-    })
+    # Queued for the audit store's background writer; does not wait on disk
+    audit_store().append(datetime.now().isoformat(timespec='seconds'), username, role, event, critical)
 
 def classify_query_criticality(query):
-    critical_keywords = [
-        "chest pain", "heart attack", "code blue", "seizure", "unconscious", "emergency",
-        "suicide", "allergic reaction", "anaphylaxis", "stroke", "bleeding", "collapse"
-    ]
-    for word in critical_keywords:
-        if word in query.lower():
-            return "Critical"
-    return "Normal"
-
-def view_audit_log():
-    if not AUDIT_LOG:
+    return "Critical" if query_policy().match(query)["critical"] else "Normal"
+
+def view_audit_log(username=None, role=None, critical=None, page=1, page_size=50):
+    """
+    Print one newest-first page of audit events matching the given filters.
+    """
+    store = audit_store()
+    store.flush(timeout=5)
+    total = store.count(username=username, role=role, critical=critical)
+    if not total:
         print("No critical or denied events logged yet.")
         return
-    print("\n=== AUDIT LOG ===")
-    for entry in AUDIT_LOG:
+    entries = store.query(username=username, role=role, critical=critical,
+                          limit=page_size, offset=(page - 1) * page_size)
+    pages = (total + page_size - 1) // page_size
+    print(f"\n=== AUDIT LOG (page {page}/{pages}, {total} events) ===")
+    for entry in entries:
         print(
             f"{entry['timestamp']} | {entry['username']} ({entry['role']}): {entry['event']} "
             f"{'[CRITICAL]' if entry['critical'] else ''}"
@@ -94,7 +158,8 @@ def view_audit_log():
 # -----------------------------------
 
 class AgentState(TypedDict):
-    messages: List[BaseMessage]
+    # Nodes return only the messages they add; add_messages appends them
+    messages: Annotated[List[BaseMessage], add_messages]
     
 
 def should_continue(state: AgentState):
@@ -111,47 +176,91 @@ def build_system_prompt(role):
     }
     return prompts.get(role, "You are a hospital AI assistant.")
 
-def make_rag_tool(qa_chain, allowed_fields):
+def make_rag_tool(qa_chain, allowed_fields, answer_cache=None, role=None):
     
     from langchain_core.tools import tool
+    from src.medbot.answer_cache import cached_answer
+    from src.medbot.streaming import emit_progress
     @tool
     def medical_rag_tool(query: str) -> str:
         """
         Retrieve allowed patient information for the hospital assistant.
         Only answers questions about permitted fields for the current role.
         """
-        for f in allowed_fields if isinstance(allowed_fields, list) else []:
-            if f.lower() in query.lower():
-                res = qa_chain.invoke({"query": query})
-                return res["result"]
+        # Doctors and Supervisors may ask about any field; the data each role
+        # can see is limited by its section-filtered retriever.
+        if allowed_fields == "ALL":
+            emit_progress("retrieving", query=query)
+            return cached_answer(qa_chain, query, role, answer_cache)
+        mentioned = query_policy().match(query)["fields"]
+        if any(f in mentioned for f in allowed_fields):
+            emit_progress("retrieving", query=query)
+            return cached_answer(qa_chain, query, role, answer_cache)
         return "Access denied: You are not allowed to view this information."
     return medical_rag_tool
 
-def create_langgraph_agent(qa_chain, role):
+def make_cohort_tool(cohort_index, allowed_fields):
+    from langchain_core.tools import tool
+    from src.medbot.cohort import COHORT_CATEGORIES
+
+    @tool
+    def cohort_query_tool(category: str, term: str, count_only: bool = False) -> str:
+        """
+        List or count ALL patients whose records match a term, e.g. "list all
+        patients with diabetes" or "how many patients have allergy alerts".
+        Use this instead of medical_rag_tool for cohort and count questions.
+
+        Args:
+            category: One of diagnosis, medication, prescription, alert,
+                immunization, specialty, encounter_reason.
+            term: The clinical term to match, e.g. "diabetes", "Atorvastatin", "allergy".
+            count_only: Return only the number of matching patients.
+        """
+        if category not in COHORT_CATEGORIES:
+            return f"Unknown category '{category}'. Use one of: {', '.join(COHORT_CATEGORIES)}."
+        field = COHORT_CATEGORIES[category][2]
+        if allowed_fields != "ALL" and field not in allowed_fields:
+            return "Access denied: You are not allowed to view this information."
+        return cohort_index.query(category, term, count_only=count_only)
+    return cohort_query_tool
+
+def create_langgraph_agent(qa_chain, role, cohort_index=None, answer_cache=None, max_tool_concurrency=4,
+                           checkpointer=None, llm=None, history_token_budget=None):
     from langchain_core.tools import tool
+    from src.medbot.memory import bounded_history
+    from src.medbot.streaming import emit_progress
+    from src.medbot.tool_calls import execute_tool_calls
 
     allowed_fields = ROLE_PERMISSIONS[role]["fields"]
-    rag_tool = make_rag_tool(qa_chain, allowed_fields)
+    rag_tool = make_rag_tool(qa_chain, allowed_fields, answer_cache=answer_cache, role=role)
     tools = [rag_tool]
-    system_prompt = build_system_prompt(role)
+    if cohort_index is not None:
+        tools.append(make_cohort_tool(cohort_index, allowed_fields))
+    tools_by_name = {t.name: t for t in tools}
+    system_message = SystemMessage(content=build_system_prompt(role))
     from src.medbot.helper import create_chat_openai_llm
-    llm = create_chat_openai_llm().bind_tools(tools)
+    llm = (llm or create_chat_openai_llm()).bind_tools(tools)
 
     def call_llm(state: AgentState) -> AgentState:
-        # Always prepend system prompt, then all history
-        messages = [SystemMessage(content=system_prompt)] + list(state['messages'])
+        # Always prepend system prompt, then the (memory-bounded) history.
+        # A checkpointed history grows every turn, so with history_token_budget
+        # only the current turn and the most recent earlier answers are sent.
+        history = list(state['messages'])
+        if history_token_budget is not None:
+            history = bounded_history(history, history_token_budget)
+        messages = [system_message] + history
         message = llm.invoke(messages)
-        # Append to conversation history
-        return {'messages': state['messages'] + [message]}
+        return {'messages': [message]}
 
     def take_action(state: AgentState) -> AgentState:
         tool_calls = state['messages'][-1].tool_calls
-        results = []
-        for t in tool_calls:
-            result = tools[0].invoke(t['args'].get('query', ''))
-            results.append(ToolMessage(tool_call_id=t['id'], name=t['name'], content=str(result)))
-        # Append ToolMessages to the message history
-        return {'messages': state['messages'] + results}
+        # Independent calls (e.g. three patients in one turn) run concurrently;
+        # results keep the order of tool_calls
+        results = execute_tool_calls(
+            tool_calls, tools_by_name, max_concurrency=max_tool_concurrency,
+            before_call=lambda t: emit_progress("calling tool", tool=t['name'])
+        )
+        return {'messages': results}
 
     graph = StateGraph(AgentState)
     graph.add_node("llm", call_llm)
@@ -160,4 +269,46 @@ def create_langgraph_agent(qa_chain, role):
     graph.add_edge("retriever_agent", "llm")
     graph.set_entry_point("llm")
 
-    return graph.compile()
+    # With a checkpointer, invoke with config={"configurable": {"thread_id": session_id}}
+    # and pass only the new HumanMessage; the history is restored from the checkpoint.
+    return graph.compile(checkpointer=checkpointer)
+
+
+class AgentRegistry:
+    """
+    One compiled agent graph per role, built on first use (or up front with
+    warm()) and shared by every session of that role. Compiled graphs hold no
+    conversation state - sessions are kept apart by their thread_id - and all
+    roles share one LLM client.
+
+    history_token_budget bounds the checkpointed history sent to the LLM
+    (see memory.bounded_history); None sends all of it.
+    """
+
+    def __init__(self, qa_chain_for_role, llm=None, checkpointer=None, cohort_index=None, answer_cache=None,
+                 history_token_budget=None):
+        from src.medbot.helper import create_chat_openai_llm
+
+        self.qa_chain_for_role = qa_chain_for_role
+        self.llm = llm or create_chat_openai_llm()
+        self.checkpointer = checkpointer
+        self.cohort_index = cohort_index
+        self.answer_cache = answer_cache
+        self.history_token_budget = history_token_budget
+        self._agents = {}
+        self._lock = threading.Lock()
+
+    def get(self, role):
+        with self._lock:
+            if role not in self._agents:
+                self._agents[role] = create_langgraph_agent(
+                    self.qa_chain_for_role(role), role, cohort_index=self.cohort_index,
+                    answer_cache=self.answer_cache, checkpointer=self.checkpointer, llm=self.llm,
+                    history_token_budget=self.history_token_budget
+                )
+            return self._agents[role]
+
+    def warm(self, roles=None):
+        for role in roles or ROLE_PERMISSIONS:
+            self.get(role)
+        return self
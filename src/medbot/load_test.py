@@ -0,0 +1,179 @@
+import itertools
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+# -----------------------------------
+# In-process load testing of the agent graphs
+# -----------------------------------
+#
+# run_sessions drives N concurrent chat sessions through compiled agent
+# graphs (one per role, shared by all its sessions, as in server.py) and
+# NodeTimer records how long every graph node, tool call and model call
+# took. With the fake model (fake_llm.py) nothing leaves the process.
+
+DEFAULT_PROMPTS = [
+    "Show me the diagnosis for patient GME0000",
+    "List all patients with diabetes",
+    "What medications were given to GME0807?",
+    "Show encounter history of GME0002",
+    "Which patients have allergy alerts?",
+    "Give me prescriptions for GME0001",
+]
+
+
+def percentile(sorted_values, q):
+    """
+    Nearest-rank percentile (q in 0-100) of an already sorted list.
+    """
+    if not sorted_values:
+        return None
+    rank = max(1, int(-(-q * len(sorted_values) // 100)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(samples):
+    """
+    count, mean and p50/p95/p99/max (milliseconds) of a list of seconds.
+    """
+    values = sorted(samples)
+    return {
+        "count": len(values),
+        "mean_ms": round(sum(values) / len(values) * 1000, 2),
+        "p50_ms": round(percentile(values, 50) * 1000, 2),
+        "p95_ms": round(percentile(values, 95) * 1000, 2),
+        "p99_ms": round(percentile(values, 99) * 1000, 2),
+        "max_ms": round(values[-1] * 1000, 2),
+    }
+
+
+class NodeTimer(BaseCallbackHandler):
+    """
+    Callback handler timing each graph node ("node:llm", "node:retriever_agent"),
+    tool ("tool:medical_rag_tool") and chat model call ("model:<node>", the
+    node it ran in). Pass it in the run config; safe to share across threads.
+    """
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.output_tokens = 0
+        self._started = {}
+        self._lock = threading.Lock()
+
+    def _start(self, run_id, label):
+        self._started[run_id] = (label, time.perf_counter())
+
+    def _end(self, run_id):
+        started = self._started.pop(run_id, None)
+        if started is not None:
+            label, start = started
+            with self._lock:
+                self.samples[label].append(time.perf_counter() - start)
+
+    def on_chain_start(self, serialized, inputs, *, run_id, metadata=None, **kwargs):
+        node = (metadata or {}).get("langgraph_node")
+        # Only the node's own run; chains nested inside it carry the same metadata
+        if node is not None and kwargs.get("name") == node:
+            self._start(run_id, f"node:{node}")
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        self._start(run_id, f"tool:{(serialized or {}).get('name') or kwargs.get('name')}")
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        self._start(run_id, f"model:{(metadata or {}).get('langgraph_node', '-')}")
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                with self._lock:
+                    self.output_tokens += usage.get("output_tokens", 0)
+        self._end(run_id)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def report(self):
+        with self._lock:
+            return {label: summarize(values) for label, values in sorted(self.samples.items())}
+
+
+def build_offline_agents(tables, llm, roles=None, answer_cache=False):
+    """
+    One compiled agent per role over tables, from a pipeline.OfflinePipeline
+    (BM25 retrieval, in-memory checkpoints) with llm as the model. Without
+    answer_cache every question goes through retrieval.
+
+    Returns:
+        dict: role -> compiled agent graph.
+    """
+    from src.medbot.hospital_agents import ROLE_PERMISSIONS
+    from src.medbot.pipeline import OfflinePipeline
+
+    pipeline = OfflinePipeline(tables=tables, llm=llm, answer_cache=answer_cache)
+    return {role: pipeline.agent(role) for role in roles or ROLE_PERMISSIONS}
+
+
+def run_sessions(agents, sessions, turns=3, concurrency=None, prompts=None):
+    """
+    Run sessions chat sessions, concurrency at a time, each asking turns
+    prompts of one role (roles and prompts are assigned round-robin).
+
+    Returns:
+        dict: wall time, turns per second, turn latency and per-node/tool/model
+            latency summaries, and any errors.
+    """
+    from langchain_core.messages import HumanMessage
+
+    prompts = prompts or DEFAULT_PROMPTS
+    roles = sorted(agents)
+    timer = NodeTimer()
+    turn_seconds, errors = [], []
+    lock = threading.Lock()
+
+    def session(number):
+        role = roles[number % len(roles)]
+        config = {"configurable": {"thread_id": f"load-{uuid.uuid4().hex}"}, "callbacks": [timer]}
+        questions = itertools.islice(itertools.cycle(prompts), number, number + turns)
+        for question in questions:
+            start = time.perf_counter()
+            try:
+                agents[role].invoke({"messages": [HumanMessage(content=question)]}, config=config)
+            except Exception as e:
+                with lock:
+                    errors.append(f"{role}: {question!r}: {type(e).__name__}: {e}")
+                continue
+            with lock:
+                turn_seconds.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency or sessions) as pool:
+        list(pool.map(session, range(sessions)))
+    wall = time.perf_counter() - start
+
+    return {
+        "sessions": sessions,
+        "turns": len(turn_seconds),
+        "wall_seconds": round(wall, 3),
+        "turns_per_second": round(len(turn_seconds) / wall, 2) if wall else None,
+        "output_tokens_per_second": round(timer.output_tokens / wall, 1) if wall else None,
+        "turn": summarize(turn_seconds) if turn_seconds else None,
+        "nodes": timer.report(),
+        "errors": errors,
+    }
@@ -0,0 +1,168 @@
+import os
+import re
+import time
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+# -----------------------------------
+# Token-budgeted conversation memory
+# -----------------------------------
+
+SUMMARY_PROMPT = (
+    "You maintain a running summary of a conversation between hospital staff and "
+    "the hospital assistant. Merge the new turns into the summary. Keep patient IDs, "
+    "names and clinical facts that were asked about; drop pleasantries. "
+    "Answer with the updated summary only, at most {budget} tokens."
+)
+
+# Tokens of earlier turns a checkpointed session sends with each question
+# (see bounded_history). Set MEDBOT_HISTORY_TOKENS to change it.
+DEFAULT_HISTORY_TOKEN_BUDGET = int(os.getenv("MEDBOT_HISTORY_TOKENS", "2000"))
+
+_APPROX_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+_ENCODERS = {}
+
+
+def count_tokens(text, encoding="cl100k_base"):
+    """
+    Token count with tiktoken when its encoding is available, otherwise a
+    word/punctuation approximation (tiktoken downloads encodings on first use).
+    """
+    if encoding not in _ENCODERS:
+        try:
+            import tiktoken
+            _ENCODERS[encoding] = tiktoken.get_encoding(encoding).encode
+        except Exception:
+            _ENCODERS[encoding] = None
+    encode = _ENCODERS[encoding]
+    return len(encode(text)) if encode else len(_APPROX_TOKEN_PATTERN.findall(text))
+
+
+def message_tokens(messages):
+    return sum(count_tokens(str(m.content)) for m in messages)
+
+
+def truncate_to_tokens(text, budget):
+    """
+    Keep the end of text (the most recent facts) within budget tokens.
+    """
+    if count_tokens(text) <= budget:
+        return text
+    words = text.split()
+    while words and count_tokens(" ".join(words)) > budget:
+        words = words[max(1, len(words) // 10):]
+    return " ".join(words)
+
+
+def final_answer(messages):
+    """
+    The message that answered a turn: the last AI message without tool calls.
+    Tool-calling AI messages and ToolMessage payloads are left out.
+    """
+    for message in reversed(messages):
+        if isinstance(message, AIMessage) and not message.tool_calls and message.content:
+            return message
+    return None
+
+
+def bounded_history(messages, token_budget=DEFAULT_HISTORY_TOKEN_BUDGET):
+    """
+    A checkpointed history cut down for the next LLM call: leading system
+    messages and the current turn (from the last HumanMessage on) in full,
+    then as many earlier (question, final answer) pairs as fit in
+    token_budget, newest kept. Earlier tool calls and payloads are dropped.
+    """
+    starts = [i for i, m in enumerate(messages) if isinstance(m, HumanMessage)]
+    if not starts:
+        return list(messages)
+    kept, used = [], 0
+    for start, end in reversed(list(zip(starts, starts[1:]))):
+        answer = final_answer(messages[start:end])
+        pair = [messages[start]] + ([answer] if answer else [])
+        used += message_tokens(pair)
+        if used > token_budget:
+            break
+        kept[:0] = pair
+    return list(messages[:starts[0]]) + kept + list(messages[starts[-1]:])
+
+
+class ConversationMemory:
+    """
+    Keeps the last max_recent_turns (question, answer) pairs verbatim and folds
+    older turns into a running summary of at most summary_token_budget tokens.
+
+    Turns are folded in batches: only when more than 2 * max_recent_turns
+    are held, or their tokens exceed recent_token_budget, are all but the
+    last max_recent_turns folded, so the summarizer runs about once every
+    max_recent_turns turns rather than on every turn.
+
+    The summary is written by summarizer (a chat model) when given, otherwise
+    older turns are kept as a truncated transcript.
+    """
+
+    def __init__(self, summarizer=None, max_recent_turns=4, summary_token_budget=400, recent_token_budget=None):
+        self.summarizer = summarizer
+        self.max_recent_turns = max_recent_turns
+        self.summary_token_budget = summary_token_budget
+        self.recent_token_budget = recent_token_budget
+        self.summary = ""
+        self.turns = []  # [(HumanMessage, AIMessage)]
+        self.turn_stats = []
+
+    def context(self):
+        """
+        History to send with the next question: the summary (if any), then the recent turns.
+        """
+        messages = []
+        if self.summary:
+            messages.append(SystemMessage(content=f"Summary of the earlier conversation: {self.summary}"))
+        for human, answer in self.turns:
+            messages.extend([human, answer])
+        return messages
+
+    def add_turn(self, question, turn_messages):
+        """
+        Record a finished turn. turn_messages are the messages the graph
+        produced; only the final answer is kept.
+        """
+        answer = final_answer(turn_messages) or AIMessage(content="")
+        self.turns.append((HumanMessage(content=question), AIMessage(content=answer.content)))
+
+        overhead_tokens, overhead_seconds = 0, 0.0
+        if self._should_fold():
+            old = self.turns[:-self.max_recent_turns]
+            self.turns = self.turns[-self.max_recent_turns:]
+            overhead_tokens, overhead_seconds = self._fold(old)
+
+        stats = {
+            "context_tokens": message_tokens(self.context()),
+            "summary_tokens": count_tokens(self.summary),
+            "summarization_tokens": overhead_tokens,
+            "summarization_seconds": round(overhead_seconds, 4),
+        }
+        self.turn_stats.append(stats)
+        return stats
+
+    def _should_fold(self):
+        if len(self.turns) <= self.max_recent_turns:
+            return False
+        if len(self.turns) > 2 * self.max_recent_turns:
+            return True
+        return (self.recent_token_budget is not None
+                and message_tokens([m for turn in self.turns for m in turn]) > self.recent_token_budget)
+
+    def _fold(self, turns):
+        transcript = "\n".join(f"User: {h.content}\nAssistant: {a.content}" for h, a in turns)
+        if self.summarizer is None:
+            self.summary = truncate_to_tokens(f"{self.summary}\n{transcript}".strip(), self.summary_token_budget)
+            return 0, 0.0
+
+        prompt = [
+            SystemMessage(content=SUMMARY_PROMPT.format(budget=self.summary_token_budget)),
+            HumanMessage(content=f"Current summary:\n{self.summary or '(none)'}\n\nNew turns:\n{transcript}"),
+        ]
+        start = time.perf_counter()
+        summary = str(self.summarizer.invoke(prompt).content)
+        elapsed = time.perf_counter() - start
+        self.summary = truncate_to_tokens(summary, self.summary_token_budget)
+        return message_tokens(prompt) + count_tokens(summary), elapsed
@@ -0,0 +1,286 @@
+import copy
+import os
+import threading
+import time
+
+# -----------------------------------
+# Shared data / index / LLM stack
+# -----------------------------------
+
+class MedbotPipeline:
+    """
+    Everything app.py builds after login, built once and shared by every
+    session: the tables, section documents, Chroma index, LLM client,
+    cohort index and answer cache. Per-role retrievers and QA chains are
+    created on first use and reused.
+
+    Each stage (tables -> documents -> vectorstore, llm, ...) is built the
+    first time it is read, together with the stages it needs; load() builds
+    them all up front.
+
+    Agents checkpoint their conversations to session_db (SQLite), so a
+    session can be resumed after a restart; without it they are kept in memory.
+
+    reload() re-reads the data while the process keeps running.
+    """
+
+    STAGES = ("checkpointer", "users", "tables", "documents", "vectorstore", "llm",
+              "cohort_index", "answer_cache", "agents")
+    # Rebuilt by reload(); the answer cache is kept and moved to the new data version
+    DATA_STAGES = ("tables", "documents", "vectorstore", "cohort_index", "agents")
+    # Read by the data stages and shared by the old and new ones
+    SHARED_STAGES = ("checkpointer", "llm", "answer_cache")
+
+    def __init__(self, data_dir, persist_directory, users_file=None, session_db=None):
+        self.data_dir = data_dir
+        self.persist_directory = persist_directory
+        if users_file is None and data_dir is not None:
+            users_file = os.path.join(data_dir, "user_credentials.csv")
+        self.users_file = users_file
+        self.session_db = session_db
+        self.stage_seconds = {}
+        self._stages = {}
+        self._qa_chains = {}
+        # Reentrant: building a stage reads the stages it depends on
+        self._lock = threading.RLock()
+        # One reload at a time; see reload()
+        self._reload_lock = threading.Lock()
+        # Tables passed in by a subclass instead of read from data_dir
+        self._injected_tables = None
+
+    def load(self):
+        for name in self.STAGES:
+            getattr(self, name)
+        return self
+
+    def _stage(self, name, build):
+        with self._lock:
+            if name not in self._stages:
+                start = time.perf_counter()
+                self._stages[name] = build()
+                self.stage_seconds[name] = round(time.perf_counter() - start, 3)
+            return self._stages[name]
+
+    def is_built(self, name):
+        return name in self._stages
+
+    def reload(self, tables=None):
+        """
+        Re-read the patient data and rebuild what is derived from it: the
+        documents, the index (re-embedding only changed patients), the cohort
+        index, retrievers, QA chains and agents. The answer cache drops its
+        entries if the documents changed. Conversations are kept.
+
+        The new stages are built on a copy of the pipeline and swapped in at
+        the end, so sessions keep being served from the current data while
+        the rebuild runs.
+
+        Args:
+            tables (list, optional): Already loaded tables to use instead of
+                reading data_dir. Without them, a pipeline created with
+                injected tables reuses those.
+
+        Returns:
+            dict: data_version, changed (bool), documents and seconds.
+        """
+        from src.medbot.store_index import hash_documents
+
+        start = time.perf_counter()
+        with self._reload_lock:
+            if tables is None:
+                tables = self._injected_tables
+            elif self._injected_tables is not None:
+                self._injected_tables = list(tables)
+            # Shared stages must exist before the copy, or it would build its own
+            for name in self.SHARED_STAGES:
+                getattr(self, name)
+            with self._lock:
+                previous = self._stages.get("documents")
+                staged = copy.copy(self)
+                staged._stages = {name: stage for name, stage in self._stages.items()
+                                  if name not in self.DATA_STAGES}
+            previous = hash_documents(previous) if previous is not None else None
+            staged._lock = threading.RLock()
+            staged._qa_chains = {}
+            staged.stage_seconds = {}
+            if tables is not None:
+                staged._stages["tables"] = list(tables)
+            for name in self.DATA_STAGES:
+                getattr(staged, name)
+            data_version = hash_documents(staged.documents)
+
+            with self._lock:
+                for name in self.DATA_STAGES:
+                    self._stages[name] = staged._stages[name]
+                    self.stage_seconds[name] = staged.stage_seconds.get(name, 0.0)
+                # The new agents build their QA chains through the copy
+                self._qa_chains = staged._qa_chains
+                if self.answer_cache is not None:
+                    self.answer_cache.set_data_version(data_version)
+        return {
+            "data_version": data_version,
+            "changed": data_version != previous,
+            "documents": len(staged.documents),
+            "seconds": round(time.perf_counter() - start, 3),
+        }
+
+    # ----- Stages -----
+
+    @property
+    def checkpointer(self):
+        def build():
+            if self.session_db:
+                from src.medbot.checkpoint import SQLiteCheckpointSaver
+                return SQLiteCheckpointSaver(self.session_db)
+            from langgraph.checkpoint.memory import InMemorySaver
+            return InMemorySaver()
+        return self._stage("checkpointer", build)
+
+    @property
+    def users(self):
+        def build():
+            from src.medbot.hospital_agents import load_users
+            return load_users(self.users_file)
+        return self._stage("users", build)
+
+    @property
+    def tables(self):
+        def build():
+            from src.medbot.data_loader import load_tables
+            return load_tables(self.data_dir)
+        return self._stage("tables", build)
+
+    @property
+    def documents(self):
+        def build():
+            from src.medbot.data_loader import combine_patient_documents
+            return combine_patient_documents(*self.tables, chunking="section")
+        return self._stage("documents", build)
+
+    @property
+    def vectorstore(self):
+        def build():
+            from src.medbot.data_loader import patient_fingerprints
+            from src.medbot.helper import create_chroma_vectorstore
+            return create_chroma_vectorstore(
+                self.documents, persist_directory=self.persist_directory,
+                fingerprints=patient_fingerprints(*self.tables)
+            )
+        return self._stage("vectorstore", build)
+
+    @property
+    def llm(self):
+        def build():
+            from src.medbot.helper import create_chat_openai_llm
+            return create_chat_openai_llm()
+        return self._stage("llm", build)
+
+    @property
+    def cohort_index(self):
+        def build():
+            from src.medbot.cohort import CohortIndex
+            return CohortIndex.from_dataframes(*self.tables)
+        return self._stage("cohort_index", build)
+
+    @property
+    def answer_cache(self):
+        def build():
+            from src.medbot.answer_cache import AnswerCache
+            from src.medbot.store_index import create_embedder, hash_documents
+            return AnswerCache(
+                embedder=create_embedder(), similarity_threshold=0.95,
+                data_version=hash_documents(self.documents)
+            )
+        return self._stage("answer_cache", build)
+
+    @property
+    def agents(self):
+        def build():
+            from src.medbot.hospital_agents import AgentRegistry
+            from src.medbot.memory import DEFAULT_HISTORY_TOKEN_BUDGET
+            # Sessions resend their checkpointed history every turn; bound it
+            return AgentRegistry(
+                self.qa_chain, llm=self.llm, checkpointer=self.checkpointer,
+                cohort_index=self.cohort_index, answer_cache=self.answer_cache,
+                history_token_budget=DEFAULT_HISTORY_TOKEN_BUDGET
+            )
+        return self._stage("agents", build)
+
+    def qa_chain(self, role):
+        """
+        RetrievalQA chain over the sections role may see (built once per role).
+        """
+        with self._lock:
+            if role not in self._qa_chains:
+                from src.medbot.helper import create_retrieval_qa_chain
+                self._qa_chains[role] = create_retrieval_qa_chain(self.llm, self.retriever(role))
+            return self._qa_chains[role]
+
+    def retriever(self, role):
+        """
+        PatientID + hybrid retriever over the sections role may see.
+        """
+        from src.medbot.helper import create_patient_retriever
+        from src.medbot.hospital_agents import role_sections
+        return create_patient_retriever(self.vectorstore, self.documents, sections=role_sections(role))
+
+    def agent(self, role):
+        """
+        The role's compiled agent graph, shared by all of its sessions.
+        """
+        return self.agents.get(role)
+
+
+class OfflinePipeline(MedbotPipeline):
+    """
+    A MedbotPipeline that needs no API key, network or model download, for
+    tests and load tests: retrieval is BM25 only (the in-memory vector store
+    has a fake embedding and is never queried), the LLM is
+    fake_llm.FakeToolCallingChatModel and the answer cache matches repeated
+    questions exactly. Sessions are checkpointed in memory unless session_db
+    is given.
+
+    tables and llm, when given, replace the tables read from data_dir and the
+    LLM configured by the MEDBOT_FAKE_LLM_* variables; answer_cache=False
+    sends every question through retrieval.
+    """
+
+    def __init__(self, data_dir=None, tables=None, llm=None, users_file=None, session_db=None, answer_cache=True):
+        super().__init__(data_dir, persist_directory=None, users_file=users_file, session_db=session_db)
+        if tables is not None:
+            self._injected_tables = list(tables)
+            self._stages["tables"] = self._injected_tables
+        if llm is not None:
+            self._stages["llm"] = llm
+        if not answer_cache:
+            self._stages["answer_cache"] = None
+
+    @property
+    def vectorstore(self):
+        def build():
+            from langchain_core.embeddings import DeterministicFakeEmbedding
+            from langchain_core.vectorstores import InMemoryVectorStore
+            return InMemoryVectorStore(DeterministicFakeEmbedding(size=8))
+        return self._stage("vectorstore", build)
+
+    @property
+    def llm(self):
+        def build():
+            from src.medbot.fake_llm import create_fake_chat_llm
+            return create_fake_chat_llm()
+        return self._stage("llm", build)
+
+    @property
+    def answer_cache(self):
+        def build():
+            from src.medbot.answer_cache import AnswerCache
+            from src.medbot.store_index import hash_documents
+            return AnswerCache(data_version=hash_documents(self.documents))
+        return self._stage("answer_cache", build)
+
+    def retriever(self, role):
+        from src.medbot.helper import create_patient_retriever
+        from src.medbot.hospital_agents import role_sections
+        # The section filter dict is Chroma/FAISS syntax, so no dense search
+        return create_patient_retriever(self.vectorstore, self.documents, dense_weight=0,
+                                        sections=role_sections(role))
@@ -0,0 +1,100 @@
+from src.medbot.cohort import TOKEN_PATTERN, tokenize
+
+# -----------------------------------
+# Single-pass query policy matching
+# -----------------------------------
+
+# Queries mentioning any of these are logged as critical for supervisor review.
+# They match inside words too, so inflections ("collapsed", "unconsciousness",
+# "heatstroke") count, as with the original substring check.
+CRITICAL_KEYWORDS = [
+    "chest pain", "heart attack", "code blue", "seizure", "unconscious", "emergency",
+    "suicide", "allergic reaction", "anaphylaxis", "stroke", "bleeding", "collapse"
+]
+
+# Other ways of naming a ROLE_PERMISSIONS field; a match counts as the field itself
+FIELD_ALIASES = {
+    "DOB": ["date of birth"],
+    "Personal Address": ["address"],
+    "NextOfKin": ["next of kin"],
+}
+
+
+class PolicyMatcher:
+    """
+    Finds every field name (with aliases) and critical keyword in a query in
+    one pass, whatever the vocabulary size.
+
+    Fields are compiled into a table of word tuples (see cohort.tokenize, so
+    matching is case-insensitive, on whole words, and folds simple plurals).
+    Matching tokenizes the query once and looks up the phrases starting at
+    each word.
+
+    Critical keywords match wherever the original substring check did: a
+    one-word keyword anywhere inside a word, and a phrase whose first word
+    ends a word, middle words match whole and last word starts a word
+    ("chest pains"). Lookups go by the pieces of each query word, one per
+    distinct keyword-word length and offset.
+    """
+
+    def __init__(self, fields, critical_keywords=(), aliases=None):
+        self._phrases = {}  # word tuple -> [field]
+        self._lengths = {}  # first word -> phrase lengths starting with it
+        self._critical = {}  # first keyword word -> [(remaining words, keyword)]
+        aliases = aliases or {}
+        for field in fields:
+            for term in [field] + list(aliases.get(field, [])):
+                self._add(term, field)
+        for keyword in critical_keywords:
+            words = tuple(TOKEN_PATTERN.findall(keyword.lower()))
+            if words:
+                entries = self._critical.setdefault(words[0], [])
+                if (words[1:], keyword) not in entries:
+                    entries.append((words[1:], keyword))
+        self._lengths = {word: sorted(lengths) for word, lengths in self._lengths.items()}
+        self._critical_lengths = sorted({len(word) for word in self._critical})
+
+    def _add(self, term, field):
+        words = tuple(tokenize(term))
+        if not words:
+            return
+        labels = self._phrases.setdefault(words, [])
+        if field not in labels:
+            labels.append(field)
+        self._lengths.setdefault(words[0], set()).add(len(words))
+
+    def match(self, query):
+        """
+        Returns:
+            dict: "fields" (set of field names) and "critical" (keywords, in order of appearance).
+        """
+        words = tokenize(query)
+        fields = set()
+        for i, word in enumerate(words):
+            for length in self._lengths.get(word, ()):
+                fields.update(self._phrases.get(tuple(words[i:i + length]), ()))
+        return {"fields": fields, "critical": self._match_critical(TOKEN_PATTERN.findall(str(query).lower()))}
+
+    def _match_critical(self, words):
+        critical = []
+        for i, word in enumerate(words):
+            for length in self._critical_lengths:
+                if length > len(word):
+                    break
+                for start in range(len(word) - length + 1):
+                    for rest, keyword in self._critical.get(word[start:start + length], ()):
+                        if keyword in critical:
+                            continue
+                        if not rest or (start + length == len(word) and _starts_phrase(words, i + 1, rest)):
+                            critical.append(keyword)
+        return critical
+
+
+def _starts_phrase(words, i, rest):
+    """
+    words[i:] begins with rest, the last word of rest only as a prefix.
+    """
+    if i + len(rest) > len(words):
+        return False
+    *middle, last = rest
+    return list(words[i:i + len(middle)]) == middle and words[i + len(middle)].startswith(last)
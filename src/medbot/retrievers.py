@@ -0,0 +1,248 @@
+import math
+import re
+from typing import Any, Dict, List
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from pydantic import ConfigDict, Field
+
+# Hospital patient identifiers, e.g. GME0000 or GME0807
+PATIENT_ID_PATTERN = re.compile(r"\bGME\d{4,}\b", re.IGNORECASE)
+
+
+def extract_patient_ids(query):
+    """
+    Return the patient IDs named in a query, upper-cased, in order of first mention.
+    """
+    return list(dict.fromkeys(match.upper() for match in PATIENT_ID_PATTERN.findall(query)))
+
+
+# Query words that point at one section of a section-chunked patient record
+# (see data_loader.build_patient_documents(chunking="section")).
+SECTION_KEYWORDS = {
+    "demographics": ["sex", "gender", "dob", "date of birth", "birth", "age"],
+    "contact": ["phone", "address", "next of kin", "nextofkin", "contact"],
+    "diagnoses": ["diagnos", "condition", "disease"],
+    "medications": ["medication", "medicine", "drug", "given"],
+    "prescriptions": ["prescri"],
+    "alerts": ["alert", "allerg"],
+    "diabetic_indices": ["diabetic ind", "hba1c", "bmi", "bp", "blood pressure", "glucose", "ldl", "microalb", "eye exam"],
+    "encounters": ["encounter", "visit", "clinician", "facility", "specialty"],
+    "immunizations": ["immuni", "vaccin", "dose"],
+}
+SECTION_PATTERNS = {
+    section: re.compile(r"\b(?:" + "|".join(re.escape(k) for k in keywords) + ")", re.IGNORECASE)
+    for section, keywords in SECTION_KEYWORDS.items()
+}
+
+
+def sections_for_query(query):
+    """
+    Sections a query asks about, in record order; empty if it names none.
+    """
+    return [section for section, pattern in SECTION_PATTERNS.items() if pattern.search(query)]
+
+
+def index_documents_by_patient(documents):
+    """
+    Index documents by their PatientID metadata (one pass, O(1) lookups after).
+
+    Returns:
+        dict: PatientID -> list of Documents, in document order.
+    """
+    by_patient = {}
+    for doc in documents:
+        by_patient.setdefault(str(doc.metadata.get("PatientID")).upper(), []).append(doc)
+    return by_patient
+
+
+def top_k_per_patient(docs, query, k):
+    """
+    The k of docs that best match query (BM25), taken round-robin across
+    patients - every patient's best document before any patient's second -
+    so each named patient stays represented. Document order is kept.
+    """
+    if len(docs) <= k:
+        return docs
+    scores = BM25Index(docs).scores(query)
+    ranked = {}
+    for position in sorted(range(len(docs)), key=lambda i: -scores[i]):
+        ranked.setdefault(str(docs[position].metadata.get("PatientID")), []).append(position)
+    by_rank = sorted(
+        (rank, order, position)
+        for order, positions in enumerate(ranked.values())
+        for rank, position in enumerate(positions)
+    )
+    return [docs[position] for position in sorted(position for _, _, position in by_rank[:k])]
+
+
+class PatientIDRetriever(BaseRetriever):
+    """
+    Answer queries that name patients (e.g. "Show the diagnosis for patient
+    GME0000") straight from an in-memory PatientID index, and use the
+    fallback (semantic) retriever only for queries without an ID.
+
+    With a "k" in search_kwargs, the named patients' documents are ranked
+    against the query and cut to k (see top_k_per_patient), so a question
+    naming several patients fills the prompt no more than the fallback would.
+    """
+
+    documents_by_patient: Dict[str, List[Document]]
+    fallback: BaseRetriever
+    # For section-chunked documents, return only the sections the query asks
+    # about (plus identity) instead of the whole record
+    filter_sections: bool = True
+    # Forwarded to the fallback retriever, so create_retrieval_qa_chain's k still applies
+    search_kwargs: Dict[str, Any] = Field(default_factory=dict)
+
+    @classmethod
+    def from_documents(cls, documents, fallback, **kwargs):
+        return cls(documents_by_patient=index_documents_by_patient(documents), fallback=fallback, **kwargs)
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        patient_ids = extract_patient_ids(query)
+        if patient_ids:
+            # Unknown IDs return nothing rather than some other patient's record
+            docs = [doc for pid in patient_ids for doc in self.documents_by_patient.get(pid, [])]
+            sections = sections_for_query(query) if self.filter_sections else []
+            if sections:
+                wanted = set(sections) | {"identity"}
+                docs = [doc for doc in docs if doc.metadata.get("section", "identity") in wanted]
+            k = self.search_kwargs.get("k")
+            return top_k_per_patient(docs, query, k) if k else docs
+        return self.fallback.invoke(query, config={"callbacks": run_manager.get_child()}, **self.search_kwargs)
+
+
+# -----------------------------------
+# Lexical (BM25) + dense hybrid retrieval
+# -----------------------------------
+
+BM25_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def bm25_tokenize(text):
+    return BM25_TOKEN_PATTERN.findall(text.lower())
+
+
+class BM25Index:
+    """
+    Okapi BM25 over a fixed document list, stored as a compact inverted index:
+    one (doc ids, term frequencies) pair of numpy arrays per term.
+    """
+
+    def __init__(self, documents, k1=1.5, b=0.75):
+        self.documents = list(documents)
+        self.k1 = k1
+        self.b = b
+
+        postings = {}
+        doc_lengths = np.zeros(len(self.documents), dtype=np.float32)
+        for doc_id, doc in enumerate(self.documents):
+            tokens = bm25_tokenize(doc.page_content)
+            doc_lengths[doc_id] = len(tokens)
+            counts = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, count in counts.items():
+                postings.setdefault(token, ([], []))
+                postings[token][0].append(doc_id)
+                postings[token][1].append(count)
+
+        n_docs = max(len(self.documents), 1)
+        avg_length = float(doc_lengths.mean()) if len(self.documents) else 0.0
+        # Per-document length normalisation, precomputed once
+        self._norm = (k1 * (1 - b + b * doc_lengths / avg_length)) if avg_length else doc_lengths + k1
+        self._postings = {}
+        for token, (doc_ids, counts) in postings.items():
+            idf = math.log(1 + (n_docs - len(doc_ids) + 0.5) / (len(doc_ids) + 0.5))
+            self._postings[token] = (
+                np.asarray(doc_ids, dtype=np.int32),
+                np.asarray(counts, dtype=np.float32),
+                idf,
+            )
+
+    def scores(self, query):
+        scores = np.zeros(len(self.documents), dtype=np.float32)
+        for token in set(bm25_tokenize(query)):
+            posting = self._postings.get(token)
+            if posting is None:
+                continue
+            doc_ids, tf, idf = posting
+            scores[doc_ids] += idf * tf * (self.k1 + 1) / (tf + self._norm[doc_ids])
+        return scores
+
+    def search(self, query, k=5):
+        """
+        Top-k documents by BM25 score (documents with score 0 are skipped).
+        """
+        scores = self.scores(query)
+        k = min(k, len(self.documents))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [self.documents[i] for i in top.tolist() if scores[i] > 0]
+
+
+def document_key(doc):
+    return (doc.metadata.get("PatientID"), doc.metadata.get("section"), doc.page_content)
+
+
+def reciprocal_rank_fusion(ranked_lists, weights, rrf_k=60):
+    """
+    Merge ranked document lists: score(d) = sum(weight / (rrf_k + rank)).
+    """
+    scores = {}
+    first_seen = {}
+    for docs, weight in zip(ranked_lists, weights):
+        for rank, doc in enumerate(docs, start=1):
+            key = document_key(doc)
+            first_seen.setdefault(key, doc)
+            scores[key] = scores.get(key, 0.0) + weight / (rrf_k + rank)
+    ordered = sorted(scores, key=lambda key: scores[key], reverse=True)
+    return [first_seen[key] for key in ordered]
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Combine BM25 over the patient documents with dense vector search using
+    reciprocal rank fusion. Exact terms (drug names, facilities) come from
+    BM25, paraphrases from the dense retriever.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    dense: BaseRetriever
+    bm25: BM25Index
+    lexical_weight: float = 1.0
+    dense_weight: float = 1.0
+    rrf_k: int = 60
+    # How many candidates each side contributes per returned document
+    candidate_multiplier: int = 4
+    search_kwargs: Dict[str, Any] = Field(default_factory=lambda: {"k": 5})
+
+    @classmethod
+    def from_documents(cls, documents, dense, **kwargs):
+        return cls(dense=dense, bm25=BM25Index(documents), **kwargs)
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun, **kwargs: Any
+    ) -> List[Document]:
+        search_kwargs = {**self.search_kwargs, **kwargs}
+        k = search_kwargs.get("k", 5)
+        n_candidates = k * self.candidate_multiplier
+        ranked_lists, weights = [], []
+        if self.lexical_weight > 0:
+            ranked_lists.append(self.bm25.search(query, k=n_candidates))
+            weights.append(self.lexical_weight)
+        if self.dense_weight > 0:
+            dense_kwargs = {**search_kwargs, "k": n_candidates}
+            ranked_lists.append(
+                self.dense.invoke(query, config={"callbacks": run_manager.get_child()}, **dense_kwargs)
+            )
+            weights.append(self.dense_weight)
+        return reciprocal_rank_fusion(ranked_lists, weights, self.rrf_k)[:k]
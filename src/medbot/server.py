@@ -0,0 +1,189 @@
+import asyncio
+import json
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from langchain_core.messages import HumanMessage
+
+from src.medbot.hospital_agents import authenticate, evaluate_query, log_event
+
+# -----------------------------------
+# Async multi-session HTTP server
+# -----------------------------------
+#
+# JSON endpoints (the session ID returned at login is the bearer token):
+#   POST   /sessions                {"username", "password"[, "session_id"]} -> {"session_id", "role"}
+#                                   (an earlier session_id of the same user resumes that conversation)
+#   GET    /sessions/<id>           conversation state of the session
+#   POST   /sessions/<id>/messages  {"query"} -> {"answer", "critical"}
+#   POST   /sessions/<id>/reload    Supervisor only: re-read the patient data
+#                                   (see MedbotPipeline.reload) -> {"data_version", "changed", ...}
+#   DELETE /sessions/<id>           log out
+#   GET    /health
+
+REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 401: "Unauthorized", 403: "Forbidden",
+           404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}
+
+
+class Session:
+    def __init__(self, session_id, username, role, agent):
+        self.session_id = session_id
+        self.username = username
+        self.role = role
+        self.agent = agent
+        # The agent's checkpointer keeps the conversation under this thread;
+        # "username" is copied into the checkpoint metadata to check resumes
+        self.config = {"configurable": {"thread_id": session_id, "username": username}}
+        self.created = datetime.now().isoformat(timespec="seconds")
+        # One turn at a time per session; other sessions are not blocked
+        self.lock = asyncio.Lock()
+
+    def messages(self):
+        return self.agent.get_state(self.config).values.get("messages", [])
+
+    def to_dict(self):
+        return {
+            "session_id": self.session_id,
+            "username": self.username,
+            "role": self.role,
+            "created": self.created,
+            "messages": [{"type": m.type, "content": m.content} for m in self.messages()],
+        }
+
+
+class MedbotServer:
+    """
+    Serves many authenticated chat sessions from one shared pipeline
+    (see pipeline.MedbotPipeline). Agent runs - retrieval, embedding and
+    LLM calls - happen on a bounded thread pool, never on the event loop.
+    """
+
+    def __init__(self, pipeline, max_workers=8):
+        self.pipeline = pipeline
+        self.sessions = {}
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="medbot")
+
+    async def run_blocking(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    # ----- Endpoints -----
+
+    async def login(self, body):
+        role = authenticate(self.pipeline.users, body.get("username"), body.get("password"))
+        if not role:
+            return 401, {"error": "Invalid username or password."}
+        session_id = body.get("session_id")
+        if session_id:
+            saved = await self.run_blocking(self.pipeline.checkpointer.get_tuple, {"configurable": {"thread_id": session_id}})
+            if saved is None or saved.metadata.get("username") != body["username"]:
+                return 404, {"error": "Unknown session."}
+        agent = await self.run_blocking(self.pipeline.agent, role)
+        session = Session(session_id or secrets.token_urlsafe(24), body["username"], role, agent)
+        self.sessions[session.session_id] = session
+        return 201, {"session_id": session.session_id, "role": role}
+
+    async def chat(self, session, body):
+        query = str(body.get("query", "")).strip()
+        if not query:
+            return 400, {"error": "'query' is required."}
+        policy = evaluate_query(session.role, query)
+        if not policy["allowed"]:
+            log_event(session.username, session.role, f"Denied query: {query}", critical=False)
+            return 403, {"error": "Access denied: You do not have permission to access this information."}
+        critical = policy["criticality"] == "Critical"
+        if critical:
+            log_event(session.username, session.role, f"Critical query: {query}", critical=True)
+
+        async with session.lock:
+            # The role's current agent: a reload may have replaced it. The
+            # conversation lives in the shared checkpointer, not in the agent.
+            session.agent = await self.run_blocking(self.pipeline.agent, session.role)
+            # Only the new message is sent; the history is restored from the checkpoint
+            result = await self.run_blocking(
+                session.agent.invoke, {"messages": [HumanMessage(content=query)]}, session.config
+            )
+            answer = result["messages"][-1]
+        return 200, {"answer": answer.content, "critical": critical}
+
+    async def reload(self, session):
+        if session.role != "Supervisor":
+            log_event(session.username, session.role, "Denied data reload", critical=False)
+            return 403, {"error": "Access denied: only a Supervisor may reload the data."}
+        result = await self.run_blocking(self.pipeline.reload)
+        log_event(session.username, session.role, f"Reloaded data (version {result['data_version'][:12]})")
+        return 200, result
+
+    async def dispatch(self, method, path, body):
+        parts = [p for p in path.split("/") if p]
+        if parts == ["health"] and method == "GET":
+            return 200, {"status": "ok", "sessions": len(self.sessions)}
+        if parts == ["sessions"] and method == "POST":
+            return await self.login(body)
+        if not parts or parts[0] != "sessions" or len(parts) > 3:
+            return 404, {"error": "Not found."}
+
+        session = self.sessions.get(parts[1]) if len(parts) > 1 else None
+        if session is None:
+            return 404, {"error": "Unknown session."}
+        if len(parts) == 2 and method == "GET":
+            return 200, await self.run_blocking(session.to_dict)
+        if len(parts) == 2 and method == "DELETE":
+            del self.sessions[session.session_id]
+            return 200, {"status": "logged out"}
+        if len(parts) == 3 and parts[2] == "messages" and method == "POST":
+            return await self.chat(session, body)
+        if len(parts) == 3 and parts[2] == "reload" and method == "POST":
+            return await self.reload(session)
+        return 405, {"error": f"{method} not allowed on {path}."}
+
+    # ----- HTTP/1.1 plumbing -----
+
+    async def handle_connection(self, reader, writer):
+        try:
+            request_line = await reader.readline()
+            if not request_line:
+                writer.close()
+                return
+            method, target, _ = request_line.decode("latin-1").split(" ", 2)
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            raw = await reader.readexactly(int(headers.get("content-length") or 0))
+            body = json.loads(raw) if raw else {}
+            if not isinstance(body, dict):
+                raise ValueError("body must be a JSON object")
+        except (ValueError, asyncio.IncompleteReadError):
+            status, payload = 400, {"error": "Malformed request."}
+        else:
+            try:
+                status, payload = await self.dispatch(method.upper(), target.split("?", 1)[0], body)
+            except Exception as e:
+                print(f"Error handling {method} {target}: {e}")
+                status, payload = 500, {"error": "Internal server error."}
+
+        data = json.dumps(payload).encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\nConnection: close\r\n\r\n"
+            .encode("latin-1") + data
+        )
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def start(self, host="127.0.0.1", port=8000):
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+
+async def serve(pipeline, host="127.0.0.1", port=8000, max_workers=8):
+    server = MedbotServer(pipeline, max_workers=max_workers)
+    listener = await server.start(host, port)
+    print(f"Hospital assistant listening on http://{host}:{port}")
+    async with listener:
+        await listener.serve_forever()
@@ -0,0 +1,215 @@
+import hashlib
+import importlib.util
+import json
+import os
+import shutil
+import threading
+
+import numpy as np
+import pandas as pd
+
+# -----------------------------------
+# Columnar snapshots of the source CSVs
+# -----------------------------------
+#
+# After a CSV is parsed, the typed DataFrame is written next to it, under
+# <data dir>/.snapshot/<csv name>/:
+#   meta.json       source size, mtime and sha256, schema and column layout
+#   table.feather   the whole table (when pyarrow is installed), or
+#   <n>.npy         one file per column: values for numeric/datetime columns,
+#   <n>.codes.npy   int32 codes plus fixed-width unicode uniques for string
+#   <n>.uniques.npy and categorical columns
+# Later loads memory-map these files instead of parsing text. A snapshot is
+# used only while the CSV's size and mtime (or, if only the mtime moved, its
+# sha256) and the table schema still match.
+
+SNAPSHOT_FORMAT_VERSION = 1
+SNAPSHOT_DIRNAME = ".snapshot"
+META_FILENAME = "meta.json"
+
+# MEDBOT_SNAPSHOTS=0 always parses the CSVs; MEDBOT_SNAPSHOT_DIR moves the snapshots
+ENABLED_ENV = "MEDBOT_SNAPSHOTS"
+DIR_ENV = "MEDBOT_SNAPSHOT_DIR"
+
+
+def snapshots_enabled():
+    return os.getenv(ENABLED_ENV, "1") != "0"
+
+
+def snapshot_format():
+    return "feather" if importlib.util.find_spec("pyarrow") is not None else "npy"
+
+
+def snapshot_directory(csv_path):
+    root = os.getenv(DIR_ENV) or os.path.join(os.path.dirname(os.path.abspath(csv_path)), SNAPSHOT_DIRNAME)
+    return os.path.join(root, os.path.basename(csv_path))
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def schema_signature(schema):
+    """
+    Stable text form of a TABLE_SCHEMAS entry (dtypes such as str are named).
+    """
+    dtypes = {column: getattr(dtype, "__name__", str(dtype)) for column, dtype in schema["dtype"].items()}
+    return json.dumps({"dtype": dtypes, "dates": schema["dates"]}, sort_keys=True)
+
+
+def _source_stat(csv_path):
+    stat = os.stat(csv_path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _read_meta(directory):
+    try:
+        with open(os.path.join(directory, META_FILENAME), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_meta(directory, meta):
+    path = os.path.join(directory, META_FILENAME)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def is_current(meta, csv_path, schema):
+    """
+    Whether a snapshot's meta still describes csv_path and schema. An mtime
+    change alone (e.g. a fresh checkout) is settled by comparing hashes, and
+    the new mtime is then recorded.
+    """
+    if meta is None or meta.get("version") != SNAPSHOT_FORMAT_VERSION:
+        return False
+    if meta.get("schema") != schema_signature(schema):
+        return False
+    if meta.get("format") == "feather" and snapshot_format() != "feather":
+        return False
+    source = _source_stat(csv_path)
+    if source["size"] != meta["source"]["size"]:
+        return False
+    if source["mtime_ns"] != meta["source"]["mtime_ns"]:
+        if file_sha256(csv_path) != meta["source"]["sha256"]:
+            return False
+        meta["source"]["mtime_ns"] = source["mtime_ns"]
+        try:
+            _write_meta(snapshot_directory(csv_path), meta)
+        except OSError:
+            pass
+    return True
+
+# ----- Writing -----
+
+def _write_npy_columns(directory, df):
+    layout = []
+    for position, column in enumerate(df.columns):
+        series = df[column]
+        name = str(position)
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            np.save(os.path.join(directory, name + ".codes.npy"), series.cat.codes.to_numpy(np.int32))
+            np.save(os.path.join(directory, name + ".uniques.npy"), np.asarray(series.cat.categories, dtype=str))
+            layout.append({"name": column, "kind": "category", "file": name})
+        elif series.dtype == object:
+            codes, uniques = pd.factorize(series)
+            if pd.api.types.infer_dtype(uniques) not in ("string", "empty"):
+                raise ValueError(f"Column {column!r} holds non-string objects; not snapshotting it")
+            np.save(os.path.join(directory, name + ".codes.npy"), codes.astype(np.int32))
+            np.save(os.path.join(directory, name + ".uniques.npy"), np.asarray(uniques, dtype=str))
+            layout.append({"name": column, "kind": "string", "file": name})
+        else:
+            np.save(os.path.join(directory, name + ".npy"), series.to_numpy())
+            layout.append({"name": column, "kind": "values", "dtype": str(series.dtype), "file": name})
+    return layout
+
+
+def write_snapshot(csv_path, schema, df):
+    """
+    Snapshot a freshly parsed table. It is built in a private directory and
+    renamed into place, so readers and concurrent writers never see a
+    partial snapshot.
+    """
+    directory = snapshot_directory(csv_path)
+    staging = f"{directory}.tmp-{os.getpid()}-{threading.get_ident()}"
+    if os.path.isdir(staging):
+        shutil.rmtree(staging)
+    os.makedirs(staging)
+    try:
+        _write_snapshot_files(staging, csv_path, schema, df)
+        if os.path.isdir(directory):
+            # Invalidate first: a reader that sees no meta.json parses the CSV
+            if os.path.exists(os.path.join(directory, META_FILENAME)):
+                os.remove(os.path.join(directory, META_FILENAME))
+            shutil.rmtree(directory, ignore_errors=True)
+        os.replace(staging, directory)
+    finally:
+        if os.path.isdir(staging):
+            shutil.rmtree(staging, ignore_errors=True)
+
+
+def _write_snapshot_files(directory, csv_path, schema, df):
+    source = _source_stat(csv_path)
+    source["sha256"] = file_sha256(csv_path)
+    frame = df.reset_index(drop=True)
+    fmt = snapshot_format()
+    meta = {
+        "version": SNAPSHOT_FORMAT_VERSION,
+        "format": fmt,
+        "schema": schema_signature(schema),
+        "source": source,
+        "rows": len(frame),
+        "index": df.index.name,
+    }
+    if fmt == "feather":
+        frame.to_feather(os.path.join(directory, "table.feather"), compression="uncompressed")
+    else:
+        meta["columns"] = _write_npy_columns(directory, frame)
+    _write_meta(directory, meta)
+
+# ----- Reading -----
+
+def _read_npy_columns(directory, layout):
+    columns = {}
+    for column in layout:
+        path = os.path.join(directory, column["file"])
+        if column["kind"] == "values":
+            columns[column["name"]] = np.load(path + ".npy", mmap_mode="r")
+            continue
+        codes = np.load(path + ".codes.npy", mmap_mode="r")
+        uniques = np.load(path + ".uniques.npy", mmap_mode="r")
+        if column["kind"] == "category":
+            columns[column["name"]] = pd.Categorical.from_codes(codes, categories=uniques.astype(object))
+        else:
+            # -1 (missing) picks the NaN appended after the uniques
+            values = np.append(uniques.astype(object), np.nan)
+            columns[column["name"]] = values.take(codes)
+    return pd.DataFrame(columns, copy=False)
+
+
+def read_snapshot(csv_path, schema):
+    """
+    The snapshot of csv_path as a DataFrame, or None if there is no current one.
+    """
+    directory = snapshot_directory(csv_path)
+    meta = _read_meta(directory)
+    try:
+        if not is_current(meta, csv_path, schema):
+            return None
+        if meta["format"] == "feather":
+            from pyarrow import feather
+            df = feather.read_table(os.path.join(directory, "table.feather"), memory_map=True).to_pandas()
+        else:
+            df = _read_npy_columns(directory, meta["columns"])
+    except (OSError, KeyError, ValueError):
+        return None
+    if meta.get("index"):
+        # Saved after sorting, so no need to sort again
+        df = df.set_index(meta["index"], drop=False)
+    return df
@@ -1,38 +1,374 @@
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_community.vectorstores import Chroma, Pinecone, FAISS
-
-# Optional: Pinecone init
+import hashlib
+import json
+import logging
 import os
-import pinecone
+import shutil
+import time
 from dotenv import load_dotenv
 
+from src.medbot.batch_embedding import (
+    DEFAULT_BATCH_SIZE, DEFAULT_WORKERS, BatchedEmbeddings, stream_chunk_size, stream_documents
+)
+
 load_dotenv()
 
-def create_embedder(model_name="all-MiniLM-L6-v2"):
+logger = logging.getLogger(__name__)
+
+# Embedding models and vector store backends (HuggingFace, Chroma, FAISS,
+# Pinecone) are imported inside the functions that use them, so importing
+# this module stays cheap.
+
+# Bump whenever the document layout or index format changes so that saved
+# indexes are rebuilt instead of being loaded with stale content.
+# 2: patient details split into identity, demographics and contact sections.
+INDEX_SCHEMA_VERSION = 2
+MANIFEST_FILENAME = "manifest.json"
+STATE_FILENAME = "patients.json"
+
+# Shared on-disk embedding cache; set MEDBOT_EMBEDDING_CACHE to move it
+DEFAULT_EMBEDDING_CACHE_DIR = os.getenv("MEDBOT_EMBEDDING_CACHE", ".embedding_cache")
+
+# One cached embedder per (model, cache dir, batching) so Chroma, FAISS and
+# Pinecone built in the same process share loaded models, worker processes
+# and cache counters.
+_EMBEDDERS = {}
+
+def create_embedder(model_name="all-MiniLM-L6-v2", cache_dir=DEFAULT_EMBEDDING_CACHE_DIR,
+                    batch_size=None, workers=None):
     """
-    Create a HuggingFace embedder.
+    Create a HuggingFace embedder behind the shared on-disk embedding cache.
+    Pass cache_dir=None to get an uncached embedder.
+
+    Cache misses are embedded in length-sorted batches of batch_size, sharded
+    over `workers` processes when workers > 0 (see batch_embedding); both
+    default to MEDBOT_EMBED_BATCH_SIZE / MEDBOT_EMBED_WORKERS.
     """
-    return HuggingFaceEmbeddings(model_name=model_name)
+    from functools import partial
+    from langchain_huggingface import HuggingFaceEmbeddings
+    from src.medbot.embedding_cache import CachedEmbeddings
+
+    batch_size = batch_size or DEFAULT_BATCH_SIZE
+    workers = DEFAULT_WORKERS if workers is None else workers
+    key = (model_name, os.path.abspath(cache_dir) if cache_dir is not None else None, batch_size, workers)
+    if key not in _EMBEDDERS:
+        embedder = BatchedEmbeddings(
+            partial(HuggingFaceEmbeddings, model_name=model_name, encode_kwargs={"batch_size": batch_size}),
+            batch_size=batch_size, workers=workers,
+        )
+        if cache_dir is not None:
+            embedder = CachedEmbeddings(embedder, model_name, cache_dir)
+        _EMBEDDERS[key] = embedder
+    return _EMBEDDERS[key]
+
+# -----------------------------------
+# Persisted index manifest
+# -----------------------------------
 
-def create_chroma_vectorstore(lc_documents, model_name="all-MiniLM-L6-v2"):
+def hash_documents(lc_documents):
     """
-    Create a Chroma vectorstore from LangChain documents using HuggingFace embeddings.
+    Content hash of a document set (text and metadata, in order).
+    """
+    digest = hashlib.sha256()
+    for doc in lc_documents:
+        digest.update(doc.page_content.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(json.dumps(doc.metadata, sort_keys=True, default=str).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+def build_manifest(lc_documents, model_name, backend):
+    """
+    Describe the index that lc_documents would produce.
+    """
+    return {
+        "schema_version": INDEX_SCHEMA_VERSION,
+        "backend": backend,
+        "model_name": model_name,
+        "chunking": "section" if any("section" in doc.metadata for doc in lc_documents) else "patient",
+        "documents_hash": hash_documents(lc_documents),
+        "document_count": len(lc_documents),
+    }
+
+def read_manifest(persist_directory):
+    """
+    Read the manifest saved next to an index, or None if there is none.
+    """
+    path = os.path.join(persist_directory, MANIFEST_FILENAME)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def write_manifest(persist_directory, manifest):
     """
-    embedder = create_embedder(model_name)
-    vectorstore = Chroma.from_documents(lc_documents, embedding=embedder)
+    Write the manifest last and atomically, so an interrupted build is never
+    mistaken for a complete index.
+    """
+    path = os.path.join(persist_directory, MANIFEST_FILENAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+def manifest_matches(saved, expected):
+    """
+    A saved index is reusable as-is only if it was built with the same schema,
+    backend, embedding model and document set.
+    """
+    if not manifest_compatible(saved, expected):
+        return False
+    return saved.get("documents_hash") == expected["documents_hash"]
+
+def manifest_compatible(saved, expected):
+    """
+    A saved index can be updated in place if only the documents changed.
+    """
+    if not saved:
+        return False
+    keys = ("schema_version", "backend", "model_name", "chunking")
+    return all(saved.get(key) == expected[key] for key in keys)
+
+def reset_index_directory(persist_directory):
+    """
+    Remove a stale index and recreate its (empty) directory.
+    """
+    if os.path.isdir(persist_directory):
+        shutil.rmtree(persist_directory)
+    os.makedirs(persist_directory, exist_ok=True)
+
+# -----------------------------------
+# Incremental updates keyed on PatientID
+# -----------------------------------
+
+def document_ids(lc_documents):
+    """
+    Stable vector-store IDs derived from PatientID metadata.
+    """
+    ids = []
+    seen = {}
+    for doc in lc_documents:
+        base = str(doc.metadata.get("PatientID"))
+        if doc.metadata.get("section"):
+            base = f"{base}#{doc.metadata['section']}"
+        count = seen.get(base, 0)
+        seen[base] = count + 1
+        ids.append(base if count == 0 else f"{base}#{count}")
+    return ids
+
+def fingerprint_documents(lc_documents):
+    """
+    Per-patient fingerprints from the documents themselves. Used when the
+    caller has no row-level fingerprints (see data_loader.patient_fingerprints).
+    """
+    digests = {}
+    for doc in lc_documents:
+        pid = str(doc.metadata.get("PatientID"))
+        digest = digests.setdefault(pid, hashlib.sha1())
+        digest.update(doc.page_content.encode("utf-8"))
+        digest.update(json.dumps(doc.metadata, sort_keys=True, default=str).encode("utf-8"))
+    return {pid: digest.hexdigest() for pid, digest in digests.items()}
+
+def patient_index_state(lc_documents, fingerprints):
+    """
+    Map each PatientID to its fingerprint and the IDs of its documents.
+
+    Stored fingerprints also cover INDEX_SCHEMA_VERSION and the document
+    layout, so a changed layout re-embeds every patient even when the row
+    fingerprints are unchanged.
+    """
+    from src.medbot.data_loader import document_layout_hash
+
+    layout = f"{INDEX_SCHEMA_VERSION}:{document_layout_hash()}"
+    state = {}
+    for doc_id, doc in zip(document_ids(lc_documents), lc_documents):
+        pid = str(doc.metadata.get("PatientID"))
+        fingerprint = fingerprints.get(pid)
+        if fingerprint is not None:
+            fingerprint = f"{layout}:{fingerprint}"
+        entry = state.setdefault(pid, {"fingerprint": fingerprint, "ids": []})
+        entry["ids"].append(doc_id)
+    return state
+
+def sync_vectorstore(vectorstore, lc_documents, state, previous_state, chunk_size=None):
+    """
+    Bring vectorstore in line with lc_documents, touching only patients whose
+    fingerprint was added, changed or removed since previous_state. New
+    documents are added chunk_size at a time (see batch_embedding.stream_documents).
+
+    Returns:
+        dict: Counts of added/updated/removed/unchanged patients.
+    """
+    added = [pid for pid in state if pid not in previous_state]
+    removed = [pid for pid in previous_state if pid not in state]
+    updated = [
+        pid for pid in state
+        if pid in previous_state and state[pid]["fingerprint"] != previous_state[pid]["fingerprint"]
+    ]
+
+    stale_ids = [doc_id for pid in removed + updated for doc_id in previous_state[pid]["ids"]]
+    if stale_ids:
+        vectorstore.delete(ids=stale_ids)
+
+    touched = set(added + updated)
+    new_docs, new_ids = [], []
+    for doc_id, doc in zip(document_ids(lc_documents), lc_documents):
+        if str(doc.metadata.get("PatientID")) in touched:
+            new_docs.append(doc)
+            new_ids.append(doc_id)
+    if new_docs:
+        stream_documents(new_docs, new_ids, vectorstore=vectorstore, chunk_size=chunk_size or stream_chunk_size())
+
+    return {
+        "added": len(added),
+        "updated": len(updated),
+        "removed": len(removed),
+        "unchanged": len(state) - len(added) - len(updated),
+    }
+
+def read_index_state(persist_directory):
+    path = os.path.join(persist_directory, STATE_FILENAME)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def write_index_state(persist_directory, state):
+    path = os.path.join(persist_directory, STATE_FILENAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+# -----------------------------------
+# Vector store factories
+# -----------------------------------
+
+def open_persisted_vectorstore(lc_documents, model_name, persist_directory, backend,
+                               build, load, save=None, fingerprints=None, chunk_size=None):
+    """
+    Load, incrementally update or rebuild a persisted index. What a build
+    did is logged and recorded as "last_build" in the manifest.
+
+    Args:
+        lc_documents (list): Documents the index should contain.
+        model_name (str): Embedding model name recorded in the manifest.
+        persist_directory (str): Directory holding the index and manifest.
+        backend (str): Backend name recorded in the manifest.
+        build (callable): build(documents, ids) -> new vectorstore saved in persist_directory.
+            Called with the first chunk only; the rest is added chunk by chunk.
+        load (callable): load() -> vectorstore saved in persist_directory.
+        save (callable, optional): save(vectorstore) for backends that do not
+            write through to disk on every change.
+        fingerprints (dict, optional): PatientID -> fingerprint of the source rows.
+        chunk_size (int, optional): Documents embedded and added at a time.
+
+    Returns:
+        The vectorstore.
+    """
+    start = time.perf_counter()
+    chunk_size = chunk_size or stream_chunk_size()
+    manifest = build_manifest(lc_documents, model_name, backend)
+    saved_manifest = read_manifest(persist_directory)
+    if manifest_matches(saved_manifest, manifest):
+        return load()
+
+    if fingerprints is None:
+        fingerprints = fingerprint_documents(lc_documents)
+    state = patient_index_state(lc_documents, fingerprints)
+    previous_state = read_index_state(persist_directory)
+
+    if manifest_compatible(saved_manifest, manifest) and previous_state is not None:
+        vectorstore = load()
+        report = sync_vectorstore(vectorstore, lc_documents, state, previous_state, chunk_size=chunk_size)
+        if save is not None:
+            save(vectorstore)
+    else:
+        reset_index_directory(persist_directory)
+        vectorstore = stream_documents(lc_documents, document_ids(lc_documents), create=build,
+                                       chunk_size=chunk_size)
+        if save is not None:
+            save(vectorstore)
+        report = {"added": len(state), "updated": 0, "removed": 0, "unchanged": 0}
+
+    report["seconds"] = round(time.perf_counter() - start, 3)
+    manifest["last_build"] = report
+    write_index_state(persist_directory, state)
+    write_manifest(persist_directory, manifest)
+    logger.info("Index build (%s): +%d ~%d -%d patients in %ss", backend,
+                report["added"], report["updated"], report["removed"], report["seconds"])
     return vectorstore
 
-def create_faiss_vectorstore(lc_documents, model_name="all-MiniLM-L6-v2"):
+def create_chroma_vectorstore(lc_documents, model_name="all-MiniLM-L6-v2", persist_directory=None,
+                              fingerprints=None, batch_size=None, workers=None):
+    """
+    Create a Chroma vectorstore from LangChain documents using HuggingFace embeddings.
+
+    With persist_directory set, the index is saved there together with a
+    manifest. Later calls reload it as-is while the manifest matches, and
+    re-embed only added, changed or removed patients when the documents change.
+
+    Documents are embedded in length-sorted batches of batch_size, optionally
+    over `workers` processes (see create_embedder), and written to the store
+    chunk by chunk instead of after embedding everything.
+    """
+    from langchain_community.vectorstores import Chroma
+
+    embedder = create_embedder(model_name, batch_size=batch_size, workers=workers)
+    chunk_size = stream_chunk_size(batch_size, workers)
+    if persist_directory is None:
+        return stream_documents(
+            lc_documents, create=lambda docs, ids: Chroma.from_documents(docs, embedding=embedder),
+            chunk_size=chunk_size,
+        )
+
+    return open_persisted_vectorstore(
+        lc_documents, model_name, persist_directory, "chroma",
+        build=lambda docs, ids: Chroma.from_documents(
+            docs, embedding=embedder, ids=ids, persist_directory=persist_directory
+        ),
+        load=lambda: Chroma(persist_directory=persist_directory, embedding_function=embedder),
+        fingerprints=fingerprints,
+        chunk_size=chunk_size,
+    )
+
+def create_faiss_vectorstore(lc_documents, model_name="all-MiniLM-L6-v2", persist_directory=None,
+                             fingerprints=None, batch_size=None, workers=None):
     """
     Create a FAISS vectorstore from LangChain documents using HuggingFace embeddings.
+
+    persist_directory, fingerprints, batch_size and workers work as in
+    create_chroma_vectorstore.
     """
-    embedder = create_embedder(model_name)
-    vectorstore = FAISS.from_documents(lc_documents, embedding=embedder)
-    return vectorstore
+    from langchain_community.vectorstores import FAISS
 
-def create_pinecone_vectorstore(lc_documents, index_name, model_name="all-MiniLM-L6-v2"):
+    embedder = create_embedder(model_name, batch_size=batch_size, workers=workers)
+    chunk_size = stream_chunk_size(batch_size, workers)
+    if persist_directory is None:
+        return stream_documents(
+            lc_documents, create=lambda docs, ids: FAISS.from_documents(docs, embedding=embedder),
+            chunk_size=chunk_size,
+        )
+
+    return open_persisted_vectorstore(
+        lc_documents, model_name, persist_directory, "faiss",
+        build=lambda docs, ids: FAISS.from_documents(docs, embedding=embedder, ids=ids),
+        # The pickled docstore is only ever written by this function
+        load=lambda: FAISS.load_local(persist_directory, embedder, allow_dangerous_deserialization=True),
+        save=lambda vectorstore: vectorstore.save_local(persist_directory),
+        fingerprints=fingerprints,
+        chunk_size=chunk_size,
+    )
+
+def create_pinecone_vectorstore(lc_documents, index_name, model_name="all-MiniLM-L6-v2",
+                                batch_size=None, workers=None):
     """
     Create or connect to a Pinecone vectorstore.
+
+    Documents are embedded and upserted chunk by chunk (see
+    batch_embedding.stream_documents), so neither all vectors nor more misses
+    than the embedding cache holds are kept at once.
     """
     # Get Pinecone API key and environment from env variables
     pinecone_api_key = os.getenv("PINECONE_API_KEY")
@@ -41,15 +377,22 @@ def create_pinecone_vectorstore(lc_documents, index_name, model_name="all-MiniLM
     if not pinecone_api_key or not pinecone_env:
         raise ValueError("PINECONE_API_KEY or PINECONE_ENVIRONMENT not set in .env")
 
+    import pinecone
+    from langchain_community.vectorstores import Pinecone
+
     # Initialize Pinecone
     pinecone.init(api_key=pinecone_api_key, environment=pinecone_env)
 
     # Create embedder
-    embedder = create_embedder(model_name)
+    embedder = create_embedder(model_name, batch_size=batch_size, workers=workers)
 
     # Connect to or create the index
     if index_name not in pinecone.list_indexes():
         pinecone.create_index(index_name, dimension=384)  # 384 is dimension of MiniLM-L6-v2
 
-    vectorstore = Pinecone.from_documents(lc_documents, embedding=embedder, index_name=index_name)
+    vectorstore = stream_documents(
+        lc_documents,
+        create=lambda docs, ids: Pinecone.from_documents(docs, embedding=embedder, index_name=index_name),
+        chunk_size=stream_chunk_size(batch_size, workers),
+    )
     return vectorstore
@@ -0,0 +1,83 @@
+import time
+
+from langchain_core.messages import AIMessageChunk
+from langgraph.config import get_stream_writer
+
+# -----------------------------------
+# Token streaming for the chat loops
+# -----------------------------------
+
+# Graph nodes whose LLM output is the answer shown to the user:
+# "llm" (hospital_agents.create_langgraph_agent), "hospital_agent"
+# (graph_test.py, graph_test_sysprompt.py) and "llm_agent" (graph_test_sys_rag.py).
+# Tokens from any other node (e.g. the RetrievalQA call inside a tool) are not shown.
+ANSWER_NODES = ("llm", "hospital_agent", "llm_agent")
+
+
+def emit_progress(event, **data):
+    """
+    Send a progress event ("retrieving", "calling tool", ...) to stream_turn.
+    A no-op when called outside a streaming graph run.
+    """
+    try:
+        writer = get_stream_writer()
+    except RuntimeError:
+        return
+    writer({"event": event, **data})
+
+
+def print_token(text):
+    print(text, end="", flush=True)
+
+
+def print_progress(event):
+    details = event.get("tool") or event.get("query") or ""
+    print(f"[{event['event']}{': ' + details if details else ''}]", flush=True)
+
+
+def stream_turn(graph, state, answer_nodes=ANSWER_NODES, on_token=print_token,
+                on_progress=print_progress, config=None):
+    """
+    Run one chat turn with graph.stream, passing answer tokens to on_token and
+    progress events to on_progress as they happen.
+
+    Answers produced without an LLM call (e.g. "Access denied") arrive as a
+    single chunk once the run finishes.
+
+    Returns:
+        (final_state, timings) with timings = {"ttft_seconds", "total_seconds", "tokens"}.
+    """
+    start = time.perf_counter()
+    first_token = None
+    tokens = 0
+    final_state = state
+
+    for mode, payload in graph.stream(state, config=config, stream_mode=["messages", "custom", "values"]):
+        if mode == "messages":
+            chunk, metadata = payload
+            # Whole messages from node outputs are skipped; only LLM token deltas are streamed
+            if not isinstance(chunk, AIMessageChunk):
+                continue
+            text = chunk.content if isinstance(chunk.content, str) else ""
+            if text and metadata.get("langgraph_node") in answer_nodes:
+                if first_token is None:
+                    first_token = time.perf_counter()
+                tokens += 1
+                on_token(text)
+        elif mode == "custom":
+            on_progress(payload)
+        else:
+            final_state = payload
+
+    if first_token is None:
+        answer = final_state["messages"][-1] if final_state.get("messages") else None
+        text = getattr(answer, "content", "")
+        if text:
+            first_token = time.perf_counter()
+            on_token(text)
+    end = time.perf_counter()
+    return final_state, {
+        "ttft_seconds": round((first_token or end) - start, 4),
+        "total_seconds": round(end - start, 4),
+        "tokens": tokens,
+    }
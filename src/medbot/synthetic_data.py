@@ -0,0 +1,227 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# -----------------------------------
+# Synthetic hospital data at any scale
+# -----------------------------------
+#
+# Tables have exactly the columns and value formats of the Data/ CSVs.
+# Per-patient row counts, vocabularies and date ranges follow the shipped
+# 1,000-patient extract (e.g. 1-5 diagnoses, 4-7 distinct diabetic indices
+# per patient, MM/YYYY dates within each table's observed range).
+
+# Child table -> (min rows, max rows) per patient, uniform as in Data/
+ROWS_PER_PATIENT = {
+    "diagnosis": (1, 5),
+    "medications": (2, 6),
+    "prescriptions": (2, 5),
+    "alerts": (1, 4),
+    "diabetic_indices": (4, 7),
+    "encounter_history": (1, 4),
+    "immunizations": (2, 4),
+}
+
+# (first year, first month, last year, last month) of each table's MM/YYYY column
+DATE_RANGES = {
+    "diagnosis": (1995, 7, 2025, 6),
+    "medications": (2005, 6, 2025, 6),
+    "prescriptions": (2020, 6, 2025, 6),
+    "diabetic_indices": (2023, 6, 2025, 6),
+    "encounter_history": (2018, 6, 2025, 6),
+    "immunizations": (2015, 6, 2025, 6),
+}
+
+DIAGNOSES = ["Coronary Artery Disease", "Asthma", "Osteoporosis", "Cesarian section", "Diabetes",
+             "Exertive stress test", "Cholecystectomy", "Hypertension", "Coronary angiogram/repair", "COPD"]
+MEDICATIONS = ["Glyburide 5 mg", "Lisinopril 10 mg", "Clobetasone Cream", "Metformin 500 mg", "Ramipril 10 mg",
+               "ASA 81 mg", "Amoxicillin 500 mg", "Atorvastatin 20 mg", "Hydrochlorothiazide 25 mg"]
+PRESCRIPTIONS = ["Hydrochlorothiazide", "ASA", "Glyburide", "Amoxicillin", "Metformin", "Atorvastatin", "Ramipril"]
+INSTRUCTIONS = ["One tab at supper", "One tab at breakfast", "Two tabs twice daily", "Discontinued"]
+INSTRUCTION_WEIGHTS = [0.41, 0.30, 0.145, 0.145]
+ALERTS = ["No known drug allergies", "Allergies – Sulfa Drugs", "Td due", "ATC above target", "Pap smear due"]
+INDICES = ["Urine Microalb", "BP", "ATC", "Glucose (average)", "LDL", "BMI", "HbA1c", "Eye Exam"]
+FACILITIES = ["Home Visit", "GP Office", "General Hosp", "Cardio Assoc"]
+SPECIALTIES = ["Cardiology", "Dermatology", "GP", "Dietician"]
+CLINICIANS = ["Diaz, E.", "Johnson, H.", "Fournier, J.", "Cohen, R.", "Patel, A.", "Smith, K."]
+REASONS = ["Cellulitis", "Atopic dermatitis", "Hypertension", "Diabetes", "Diabetes teaching"]
+IMMUNIZATIONS = ["HepB", "Td", "COVID-19", "Pneumovax", "Twinrix", "Influenza"]
+
+FIRST_NAMES = ["Thomas", "Natalie", "Jon", "Justin", "Victoria", "Monica", "Joshua", "Christopher", "Catherine",
+               "Kelly", "Maria", "David", "Sarah", "James", "Linda", "Robert", "Emily", "Daniel", "Laura", "Kevin",
+               "Angela", "Brian", "Rachel", "Steven", "Megan", "Anthony", "Nicole", "Mark", "Jessica", "Paul"]
+LAST_NAMES = ["Hernandez", "Rivas", "Mckee", "Peterson", "Stewart", "Cooper", "Baker", "Brooks", "Wade", "Finley",
+              "Smith", "Johnson", "Garcia", "Miller", "Davis", "Lopez", "Wilson", "Anderson", "Taylor", "Moore",
+              "Jackson", "Martin", "Lee", "Thompson", "White", "Harris", "Clark", "Lewis", "Walker", "Young"]
+STREET_NAMES = ["Oconnor", "Stephanie", "Mcdonald", "Tina", "Penny", "Washington", "Johnson", "Anderson",
+                "Maple", "Cedar", "Lake", "Hill", "Park", "River", "Forest", "Sunset"]
+STREET_TYPES = ["Lake", "Junctions", "Knoll", "Mission", "Cliffs", "Rue", "Brook", "Station", "Street", "Avenue"]
+CITIES = ["East Stephanieton", "Garrettberg", "East Joseph", "North Sonya", "Blackwellbury", "Santosburgh",
+          "Port Tiffany", "South Sandraberg", "Lake Maria", "West Kevin"]
+STATES = ["OR", "IN", "PA", "IL", "SD", "DE", "IA", "CA", "TX", "NY", "FL", "OH"]
+
+DOB_RANGE = ("1934-06-25", "1990-06-13")
+
+USER_CREDENTIALS = [
+    ("nurse1", "1", "Nurse"),
+    ("pharm1", "1", "Pharmacist"),
+    ("doc1", "1", "Doctor"),
+    ("super1", "1", "Supervisor"),
+]
+
+
+def patient_ids(start, stop, total=None):
+    """
+    IDs GME0000, GME0001, ... zero-padded to the width total patients need,
+    so that they sort in numeric order.
+    """
+    width = max(4, len(str(max((total or stop) - 1, 0))))
+    return np.array([f"GME{i:0{width}d}" for i in range(start, stop)], dtype=object)
+
+
+def _choice(rng, values, size, p=None):
+    return np.asarray(values, dtype=object)[rng.choice(len(values), size, p=p)]
+
+
+def _months(rng, table, size):
+    first_year, first_month, last_year, last_month = DATE_RANGES[table]
+    first, last = first_year * 12 + first_month - 1, last_year * 12 + last_month - 1
+    labels = np.array([f"{m % 12 + 1:02d}/{m // 12}" for m in range(first, last + 1)], dtype=object)
+    return labels[rng.integers(0, len(labels), size)]
+
+
+def _digits(rng, size, n):
+    return pd.Series(rng.integers(0, 10 ** n, size)).astype(str).str.zfill(n)
+
+
+def _patients(rng, pids):
+    n = len(pids)
+    first, last = pd.Series(_choice(rng, FIRST_NAMES, n)), pd.Series(_choice(rng, LAST_NAMES, n))
+
+    def address():
+        return (pd.Series(rng.integers(1, 99999, n)).astype(str) + " "
+                + _choice(rng, STREET_NAMES, n) + " " + _choice(rng, STREET_TYPES, n) + ", "
+                + _choice(rng, CITIES, n) + ", " + _choice(rng, STATES, n) + " " + _digits(rng, n, 5))
+
+    def phone():
+        return _digits(rng, n, 3) + "-" + _digits(rng, n, 3) + "-" + _digits(rng, n, 4)
+
+    start, end = (np.datetime64(day) for day in DOB_RANGE)
+    dob = start + rng.integers(0, (end - start).astype(int) + 1, n).astype("timedelta64[D]")
+    return pd.DataFrame({
+        "PatientID": pids,
+        "Name": (first + " " + last).to_numpy(),
+        "Sex": _choice(rng, ["Female", "Male"], n),
+        "Phone": phone().to_numpy(),
+        "DOB": pd.Series(dob).dt.strftime("%Y/%m/%d").to_numpy(),
+        "Address": address().to_numpy(),
+        "NextOfKin": (pd.Series(_choice(rng, FIRST_NAMES, n)) + " " + _choice(rng, LAST_NAMES, n)).to_numpy(),
+        "NextOfKinPhone": phone().to_numpy(),
+        "NextOfKinAddress": address().to_numpy(),
+    })
+
+
+def _rows_per_patient(rng, table, n):
+    low, high = ROWS_PER_PATIENT[table]
+    return rng.integers(low, high + 1, n)
+
+
+def _diabetic_indices(rng, pids):
+    # Each patient gets a random subset of distinct indices, in random order
+    counts = _rows_per_patient(rng, "diabetic_indices", len(pids))
+    order = np.argsort(rng.random((len(pids), len(INDICES))), axis=1)
+    taken = np.arange(len(INDICES)) < counts[:, None]
+    index = np.asarray(INDICES, dtype=object)[order[taken]]
+    n = len(index)
+
+    value = np.round(rng.uniform(0.5, 10.0, n), 2).astype(str).astype(object)
+    bp = index == "BP"
+    value[bp] = (pd.Series(rng.integers(100, 161, bp.sum())).astype(str) + "/"
+                 + pd.Series(rng.integers(60, 96, bp.sum())).astype(str)).to_numpy()
+    value[index == "Eye Exam"] = np.nan
+    return pd.DataFrame({
+        "PatientID": np.repeat(pids, counts),
+        "Index": index,
+        "Value": value,
+        "MostRecent": _months(rng, "diabetic_indices", n),
+    })
+
+
+def generate_tables(n_patients, seed=0, start=0, total=None):
+    """
+    Synthetic tables for patients start .. start + n_patients - 1.
+
+    Returns:
+        list: DataFrames in data_loader.TABLE_FILES order (patient_details,
+            diagnosis, medications, prescriptions, alerts, diabetic_indices,
+            encounter_history, immunizations), child rows grouped by patient.
+    """
+    rng = np.random.default_rng([seed, start])
+    pids = patient_ids(start, start + n_patients, total or start + n_patients)
+
+    def child(table, columns):
+        counts = _rows_per_patient(rng, table, n_patients)
+        n = int(counts.sum())
+        df = pd.DataFrame({"PatientID": np.repeat(pids, counts)})
+        for column, make in columns.items():
+            df[column] = make(n)
+        return df
+
+    return [
+        _patients(rng, pids),
+        child("diagnosis", {
+            "Diagnosis": lambda n: _choice(rng, DIAGNOSES, n),
+            "State": lambda n: _months(rng, "diagnosis", n),
+            "Status": lambda n: _choice(rng, ["Resolved", "Ongoing"], n),
+        }),
+        child("medications", {
+            "Date": lambda n: _months(rng, "medications", n),
+            "Medication": lambda n: _choice(rng, MEDICATIONS, n),
+        }),
+        child("prescriptions", {
+            "Prescription": lambda n: _choice(rng, PRESCRIPTIONS, n),
+            "Instructions": lambda n: _choice(rng, INSTRUCTIONS, n, p=INSTRUCTION_WEIGHTS),
+            "Date": lambda n: _months(rng, "prescriptions", n),
+        }),
+        child("alerts", {"Alert": lambda n: _choice(rng, ALERTS, n)}),
+        _diabetic_indices(rng, pids),
+        child("encounter_history", {
+            "Date": lambda n: _months(rng, "encounter_history", n),
+            "Facility": lambda n: _choice(rng, FACILITIES, n),
+            "Specialty": lambda n: _choice(rng, SPECIALTIES, n),
+            "Clinician": lambda n: _choice(rng, CLINICIANS, n),
+            "Reason": lambda n: _choice(rng, REASONS, n),
+            "Type": lambda n: np.full(n, "Outpatient", dtype=object),
+        }),
+        child("immunizations", {
+            "Immunization": lambda n: _choice(rng, IMMUNIZATIONS, n),
+            "MostRecent": lambda n: _months(rng, "immunizations", n),
+            "NumberReceived": lambda n: rng.integers(1, 9, n),
+        }),
+    ]
+
+
+def write_dataset(directory, n_patients, seed=0, chunk_size=100_000):
+    """
+    Write the eight CSVs (and user_credentials.csv) for n_patients into
+    directory, generating chunk_size patients at a time to bound memory.
+    The same seed and chunk_size always write the same data.
+
+    Returns:
+        dict: CSV file name -> rows written.
+    """
+    from src.medbot.data_loader import TABLE_FILES
+
+    os.makedirs(directory, exist_ok=True)
+    rows = {filename: 0 for _, filename, _ in TABLE_FILES}
+    for start in range(0, n_patients, chunk_size):
+        tables = generate_tables(min(chunk_size, n_patients - start), seed=seed, start=start, total=n_patients)
+        for df, (_, filename, _) in zip(tables, TABLE_FILES):
+            df.to_csv(os.path.join(directory, filename), mode="w" if start == 0 else "a",
+                      header=start == 0, index=False)
+            rows[filename] += len(df)
+    pd.DataFrame(USER_CREDENTIALS, columns=["username", "password", "role"]).to_csv(
+        os.path.join(directory, "user_credentials.csv"), index=False
+    )
+    return rows
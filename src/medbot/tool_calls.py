@@ -0,0 +1,47 @@
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.messages import ToolMessage
+
+# -----------------------------------
+# Concurrent execution of one LLM message's tool calls
+# -----------------------------------
+
+DEFAULT_MAX_CONCURRENCY = 4
+
+
+def _run_tool_call(tools_by_name, tool_call):
+    tool = tools_by_name.get(tool_call["name"])
+    if tool is None:
+        return ToolMessage(tool_call_id=tool_call["id"], name=tool_call["name"], content="Invalid tool call.")
+    try:
+        result = tool.invoke(tool_call["args"])
+    except Exception as e:
+        return ToolMessage(tool_call_id=tool_call["id"], name=tool_call["name"],
+                           content=f"Tool error: {e}", status="error")
+    return ToolMessage(tool_call_id=tool_call["id"], name=tool_call["name"], content=str(result))
+
+
+def execute_tool_calls(tool_calls, tools_by_name, max_concurrency=DEFAULT_MAX_CONCURRENCY, before_call=None):
+    """
+    Run tool calls concurrently (at most max_concurrency at a time).
+
+    Returns one ToolMessage per call, in the order of tool_calls. A failing
+    call becomes an error ToolMessage instead of aborting the others.
+    before_call(tool_call), if given, runs in the caller's thread before each
+    call is scheduled (e.g. to emit progress events).
+    """
+    for tool_call in tool_calls:
+        if before_call is not None:
+            before_call(tool_call)
+    if len(tool_calls) <= 1 or max_concurrency <= 1:
+        return [_run_tool_call(tools_by_name, tool_call) for tool_call in tool_calls]
+
+    with ThreadPoolExecutor(max_workers=min(max_concurrency, len(tool_calls))) as executor:
+        # Each call runs in a copy of the caller's context, so the LangGraph
+        # config (callbacks, stream writer) still reaches the tools.
+        futures = [
+            executor.submit(contextvars.copy_context().run, _run_tool_call, tools_by_name, tool_call)
+            for tool_call in tool_calls
+        ]
+        return [future.result() for future in futures]
@@ -0,0 +1,133 @@
+# tests/conftest.py
+#
+# Shared, session-scoped fixtures: the hospital data and an offline
+# data/index/LLM stack (pipeline.OfflinePipeline) are built once per test
+# process and reused by every test that drives app.py's chat logic or the
+# graph_test*.py graphs in-process. Everything a test writes (sessions,
+# snapshots, the audit log) goes to a per-process temporary directory, so
+# the suite can also run in parallel under pytest-xdist (pytest -n auto).
+
+import importlib
+import os
+import shutil
+import tempfile
+
+import pytest
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Data")
+
+# Imported by the graph_scripts fixture; get_graph() compiles each graph
+GRAPH_SCRIPTS = ["graph_test", "graph_test_sysprompt", "graph_test_sys_rag"]
+
+_SCRATCH = {}
+
+
+def pytest_configure(config):
+    # Set before any test module imports src.medbot.checkpoint, whose default
+    # session database is read from the environment at import time
+    scratch = tempfile.mkdtemp(prefix=f"medbot-tests-{os.getenv('PYTEST_XDIST_WORKER', 'main')}-")
+    _SCRATCH["dir"] = scratch
+    for name, value in [("MEDBOT_SESSION_DB", os.path.join(scratch, "sessions.sqlite")),
+                        ("MEDBOT_SNAPSHOT_DIR", os.path.join(scratch, "snapshots"))]:
+        _SCRATCH[name] = os.environ.get(name)
+        os.environ[name] = value
+
+
+def pytest_unconfigure(config):
+    for name in ("MEDBOT_SESSION_DB", "MEDBOT_SNAPSHOT_DIR"):
+        if _SCRATCH.get(name) is None:
+            os.environ.pop(name, None)
+        else:
+            os.environ[name] = _SCRATCH[name]
+    shutil.rmtree(_SCRATCH.get("dir", ""), ignore_errors=True)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def session_audit_log(tmp_path_factory):
+    """
+    Audit events of the whole run go to a temporary database, not ./audit.sqlite.
+    """
+    from src.medbot import hospital_agents
+    from src.medbot.audit import AuditStore
+
+    store = AuditStore(str(tmp_path_factory.mktemp("audit") / "audit.sqlite"))
+    previous = hospital_agents.set_audit_store(store)
+    yield store
+    hospital_agents.set_audit_store(previous)
+    store.close()
+
+
+@pytest.fixture(scope="session")
+def hospital_tables():
+    from src.medbot.data_loader import load_tables
+    return load_tables(DATA_DIR)
+
+
+@pytest.fixture(scope="session")
+def offline_pipeline(hospital_tables):
+    """
+    Tables, section documents, BM25 retrievers, cohort index, answer cache
+    and the fake LLM, built once for the session.
+    """
+    from src.medbot.pipeline import OfflinePipeline
+    return OfflinePipeline(DATA_DIR, tables=hospital_tables).load()
+
+
+@pytest.fixture(scope="session")
+def app_agents(offline_pipeline):
+    """
+    The agent app.py builds after login (no checkpointer; the chat loop
+    sends its ConversationMemory context instead), one per role.
+    """
+    from src.medbot.hospital_agents import ROLE_PERMISSIONS, create_langgraph_agent
+
+    return {
+        role: create_langgraph_agent(
+            offline_pipeline.qa_chain(role), role, cohort_index=offline_pipeline.cohort_index,
+            answer_cache=offline_pipeline.answer_cache, llm=offline_pipeline.llm
+        )
+        for role in ROLE_PERMISSIONS
+    }
+
+
+@pytest.fixture
+def app_login(offline_pipeline, app_agents):
+    """
+    login(username, password) -> chat.ChatSession as app.py sets it up, or
+    None for invalid credentials.
+    """
+    from src.medbot.chat import ChatSession
+    from src.medbot.hospital_agents import authenticate
+    from src.medbot.memory import ConversationMemory
+
+    def login(username, password):
+        role = authenticate(offline_pipeline.users, username, password)
+        if not role:
+            return None
+        memory = ConversationMemory(summarizer=offline_pipeline.llm, max_recent_turns=4, summary_token_budget=400)
+        return ChatSession(username, role, app_agents[role], memory=memory,
+                           answer_cache=offline_pipeline.answer_cache)
+    return login
+
+
+@pytest.fixture(scope="session")
+def graph_scripts(offline_pipeline):
+    """
+    The graph_test*.py modules, imported once, with their lazily built
+    Chroma/OpenAI stack replaced by the offline pipeline's.
+
+    Returns:
+        dict: script name -> module (module.get_graph() is the compiled graph).
+    """
+    modules = {}
+    with pytest.MonkeyPatch.context() as patch:
+        for name in GRAPH_SCRIPTS:
+            module = importlib.import_module(name)
+            # The scripts retrieve over every section, as the Doctor's chain does
+            patch.setattr(module, "get_qa_chain", lambda: offline_pipeline.qa_chain("Doctor"))
+            if hasattr(module, "get_llm"):
+                patch.setattr(module, "get_llm", lambda: offline_pipeline.llm)
+            if hasattr(module, "get_answer_cache"):
+                patch.setattr(module, "get_answer_cache", lambda: offline_pipeline.answer_cache)
+            modules[name] = module
+        yield modules
@@ -0,0 +1,23 @@
+# tests/test_agent_registry.py
+
+from langchain_core.runnables import RunnableLambda
+
+from src.medbot.helper import create_chat_openai_llm
+from src.medbot.hospital_agents import AgentRegistry, ROLE_PERMISSIONS
+
+
+def test_one_graph_per_role_and_one_llm_client(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test-placeholder")
+    built = []
+
+    def qa_chain_for_role(role):
+        built.append(role)
+        return RunnableLambda(lambda inputs: {"result": role})
+
+    registry = AgentRegistry(qa_chain_for_role).warm()
+
+    assert built == list(ROLE_PERMISSIONS)
+    assert registry.get("Nurse") is registry.get("Nurse")
+    assert registry.get("Nurse") is not registry.get("Doctor")
+    assert registry.llm is create_chat_openai_llm()
+    assert built == list(ROLE_PERMISSIONS)
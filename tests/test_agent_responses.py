@@ -1,23 +1,19 @@
 # tests/test_agent_responses.py
+#
+# Every case x role x entry point, run in-process against the shared offline
+# stack (see conftest.py): app.py's chat session logic and the compiled
+# graph_test*.py graphs, with the fake LLM instead of OpenAI.
+
+import uuid
 
 import pytest
+from langchain_core.messages import HumanMessage
+
 from tests.test_cases import test_cases
-from tests.agent_runner import run_agent_with_prompt
-
-# Define your agent scripts and roles/usernames
-AGENT_SCRIPTS = [
-    ("app.py", "nurse1", "1"),
-    ("graph_test_sys_rag.py", None, None),
-    ("graph_test_sysprompt.py", None, None),
-    ("graph_test.py", None, None),
-]
-ROLES = [
-    "Nurse",         # for graph_test scripts
-    "Pharmacist",
-    "Doctor",
-    "Supervisor"
-]
-# For app.py, we use username/password/role combos (must exist in your users CSV)
+
+AGENT_SCRIPTS = ["app.py", "graph_test_sys_rag.py", "graph_test_sysprompt.py", "graph_test.py"]
+ROLES = ["Nurse", "Pharmacist", "Doctor", "Supervisor"]
+# For app.py, we use username/password/role combos (from Data/user_credentials.csv)
 USER_CREDENTIALS = {
     "Nurse": ("nurse1", "1"),
     "Pharmacist": ("pharm1", "1"),
@@ -25,33 +21,43 @@ USER_CREDENTIALS = {
     "Supervisor": ("super1", "1"),
 }
 
+# graph_test_sys_rag.py restricts roles only through its system prompt,
+# which the offline model does not follow
+PROMPT_ONLY_PERMISSIONS = {"graph_test_sys_rag.py"}
+
+
 def is_similar(response, expected):
     """
     Checks if expected substring is in response (case insensitive).
-    You can replace this with difflib similarity if you want fuzzy match.
     """
     return expected.lower() in response.lower()
 
-@pytest.mark.parametrize("agent_script,username,password", AGENT_SCRIPTS)
+
+def get_response(agent_script, role, prompt, app_login, graph_scripts):
+    if agent_script == "app.py":
+        session = app_login(*USER_CREDENTIALS[role])
+        return session.ask(prompt)["answer"]
+    # As the script's chat loop sends it: the new message plus the role
+    graph = graph_scripts[agent_script.removesuffix(".py")].get_graph()
+    state = graph.invoke(
+        {"messages": [HumanMessage(content=prompt)], "role": role, "permission_granted": False},
+        config={"configurable": {"thread_id": uuid.uuid4().hex}},
+    )
+    return state["messages"][-1].content
+
+
+@pytest.mark.parametrize("agent_script", AGENT_SCRIPTS)
 @pytest.mark.parametrize("role", ROLES)
-@pytest.mark.parametrize("case", test_cases)
-def test_agent_response(agent_script, username, password, role, case):
-    prompt = case["prompt"]
-    expected = case["expected"]
-
-    # Pick right login for app.py, otherwise just pass role
-    if agent_script.endswith("app.py"):
-        user, pwd = USER_CREDENTIALS[role]
-        response = run_agent_with_prompt(agent_script, user, pwd, role, prompt)
-    else:
-        response = run_agent_with_prompt(agent_script, username, password, role, prompt)
-
-    # (optional) Print for debugging
-    print("\n==== Test ====")
-    print(f"Agent: {agent_script}, Role: {role}")
-    print(f"Prompt: {prompt}")
-    print(f"Expected to contain: {expected}")
-    print(f"Response: {response}\n")
+@pytest.mark.parametrize("case", test_cases, ids=[case["prompt"] for case in test_cases])
+def test_agent_response(agent_script, role, case, app_login, graph_scripts):
+    denied = role in case["denied_roles"]
+    if denied and agent_script in PROMPT_ONLY_PERMISSIONS:
+        pytest.skip("permissions are enforced only by the system prompt")
+    expected = "Access denied" if denied else case["expected"]
+
+    response = get_response(agent_script, role, case["prompt"], app_login, graph_scripts)
+
     assert is_similar(response, expected), (
-        f"FAILED!\nPrompt: {prompt}\nExpected similar to: {expected}\nGot: {response}"
+        f"FAILED!\nAgent: {agent_script}, Role: {role}\nPrompt: {case['prompt']}\n"
+        f"Expected similar to: {expected}\nGot: {response}"
     )
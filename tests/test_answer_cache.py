@@ -0,0 +1,93 @@
+# tests/test_answer_cache.py
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from src.medbot.answer_cache import AnswerCache, cached_answer
+from src.medbot.hospital_agents import make_rag_tool, ROLE_PERMISSIONS
+
+
+class CountingChain:
+    def __init__(self):
+        self.calls = 0
+
+    def invoke(self, inputs):
+        self.calls += 1
+        return {"result": f"answer {self.calls} to {inputs['query']}"}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class SameVectorEmbedding(DeterministicFakeEmbedding):
+    """Every text embeds to one vector, so any two queries are 'near-duplicates'."""
+
+    def embed_query(self, text):
+        return super().embed_query("same")
+
+
+def test_normalized_repeat_is_a_hit():
+    chain, cache = CountingChain(), AnswerCache()
+
+    first = cached_answer(chain, "Diagnosis for GME0000?", "Nurse", cache)
+    second = cached_answer(chain, "  diagnosis   for gme0000 ", "Nurse", cache)
+
+    assert first == second
+    assert chain.calls == 1
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_roles_do_not_share_entries():
+    chain, cache = CountingChain(), AnswerCache()
+
+    cached_answer(chain, "Diagnosis for GME0000", "Nurse", cache)
+    cached_answer(chain, "Diagnosis for GME0000", "Doctor", cache)
+
+    assert chain.calls == 2
+
+
+def test_ttl_lru_and_data_version_invalidation():
+    clock = FakeClock()
+    cache = AnswerCache(max_entries=2, ttl_seconds=10, data_version="v1", clock=clock)
+    cache.put("Doctor", "a", "A")
+    cache.put("Doctor", "b", "B")
+    cache.get("Doctor", "a")
+    cache.put("Doctor", "c", "C")  # evicts "b", the least recently used
+
+    assert cache.get("Doctor", "b") is None
+    assert cache.get("Doctor", "a") == "A"
+
+    clock.now = 11
+    assert cache.get("Doctor", "c") is None
+
+    cache.put("Doctor", "d", "D")
+    cache.set_data_version("v2")
+    assert cache.get("Doctor", "d") is None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_semantic_match_requires_same_patients():
+    cache = AnswerCache(embedder=SameVectorEmbedding(size=8), similarity_threshold=0.9)
+    cache.put("Doctor", "What is wrong with GME0000?", "Diabetes", latency_seconds=2.0)
+
+    assert cache.get("Doctor", "Which conditions does GME0000 have") == "Diabetes"
+    assert cache.get("Doctor", "Which conditions does GME0001 have") is None
+    stats = cache.stats()
+    assert stats["semantic_hits"] == 1
+    assert stats["seconds_saved"] == 2.0
+
+
+def test_rag_tool_never_caches_denied_queries():
+    chain, cache = CountingChain(), AnswerCache()
+    nurse_tool = make_rag_tool(chain, ROLE_PERMISSIONS["Nurse"]["fields"], answer_cache=cache, role="Nurse")
+
+    assert nurse_tool.invoke("Show the address of GME0000").startswith("Access denied")
+    nurse_tool.invoke("Show the diagnosis of GME0000")
+    nurse_tool.invoke("Show the diagnosis of GME0000")
+
+    assert chain.calls == 1
+    assert cache.stats()["entries"] == 1
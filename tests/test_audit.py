@@ -0,0 +1,156 @@
+# tests/test_audit.py
+
+import sqlite3
+
+import pytest
+
+from src.medbot import audit, hospital_agents
+from src.medbot.audit import AuditStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = AuditStore(str(tmp_path / "audit.sqlite"), batch_size=100, flush_interval=0.05)
+    yield store
+    store.close()
+
+
+def fill(store):
+    for i in range(30):
+        username, role = ("nurse1", "Nurse") if i % 2 else ("doc1", "Doctor")
+        store.append(f"2025-01-01T10:{i:02d}:00", username, role, f"event {i}", critical=(i % 3 == 0))
+    assert store.flush(timeout=5)
+
+
+def test_flush_makes_appended_events_durable(store, tmp_path):
+    fill(store)
+    assert store.count() == 30
+    # Visible to an independent connection, i.e. committed
+    conn = sqlite3.connect(str(tmp_path / "audit.sqlite"))
+    assert conn.execute("SELECT COUNT(*) FROM audit_events").fetchone()[0] == 30
+    conn.close()
+
+
+def test_writes_are_batched_into_few_transactions(tmp_path, monkeypatch):
+    store = AuditStore(str(tmp_path / "audit.sqlite"), batch_size=1000, flush_interval=0.2)
+    batches = []
+    original = store._write_conn
+
+    class CountingConnection:
+        def __getattr__(self, name):
+            return getattr(original, name)
+
+        def executemany(self, sql, rows):
+            rows = list(rows)
+            batches.append(len(rows))
+            return original.executemany(sql, rows)
+
+    store._write_conn = CountingConnection()
+    for i in range(200):
+        store.append("2025-01-01T10:00:00", "doc1", "Doctor", f"event {i}")
+    store.flush(timeout=5)
+    store.close()
+    assert sum(batches) == 200
+    assert len(batches) <= 2
+
+
+class FailingConnection:
+    """Write connection whose inserts fail the first `failures` times."""
+
+    def __init__(self, conn, failures):
+        self.conn = conn
+        self.failures = failures
+
+    def __getattr__(self, name):
+        return getattr(self.conn, name)
+
+    def executemany(self, sql, rows):
+        if self.failures:
+            self.failures -= 1
+            raise sqlite3.OperationalError("database is locked")
+        return self.conn.executemany(sql, rows)
+
+
+def test_failed_batches_are_retried(tmp_path, monkeypatch):
+    monkeypatch.setattr(audit, "RETRY_DELAY", 0)
+    store = AuditStore(str(tmp_path / "audit.sqlite"), flush_interval=0.01)
+    store._write_conn = FailingConnection(store._write_conn, failures=2)
+    store.append("2025-01-01T10:00:00", "doc1", "Doctor", "event")
+    assert store.flush(timeout=5)
+    assert store.count() == 1
+    store.close()
+
+
+def test_batches_that_keep_failing_are_spilled_and_replayed(tmp_path, monkeypatch):
+    monkeypatch.setattr(audit, "RETRY_DELAY", 0)
+    path = str(tmp_path / "audit.sqlite")
+    store = AuditStore(path, flush_interval=0.01)
+    store._write_conn = FailingConnection(store._write_conn, failures=audit.WRITE_RETRIES + 1)
+    store.append("2025-01-01T10:00:00", "doc1", "Doctor", "Critical query: chest pain", critical=True)
+    assert store.flush(timeout=5)
+    assert store.count() == 0
+    store.close()
+    assert store.flush() is True
+
+    reopened = AuditStore(path)
+    assert [e["event"] for e in reopened.query(critical=True)] == ["Critical query: chest pain"]
+    assert not (tmp_path / "audit.sqlite.spill.jsonl").exists()
+    reopened.close()
+
+
+def test_filters_and_newest_first(store):
+    fill(store)
+    nurse = store.query(username="nurse1", limit=100)
+    assert len(nurse) == 15 and all(e["role"] == "Nurse" for e in nurse)
+    assert [e["id"] for e in nurse] == sorted((e["id"] for e in nurse), reverse=True)
+
+    critical = store.query(critical=True, limit=100)
+    assert len(critical) == store.count(critical=True) == 10
+    assert all(e["critical"] for e in critical)
+
+    both = store.query(role="Doctor", critical=True, limit=100)
+    assert {e["event"] for e in both} == {f"event {i}" for i in range(0, 30, 6)}
+
+    window = store.query(since="2025-01-01T10:10:00", until="2025-01-01T10:20:00", limit=100)
+    assert len(window) == 10
+
+
+def test_pagination_by_offset_and_before_id(store):
+    fill(store)
+    by_offset = [store.query(limit=7, offset=o) for o in range(0, 30, 7)]
+    by_keyset, before = [], None
+    while True:
+        page = store.query(limit=7, before_id=before)
+        if not page:
+            break
+        by_keyset.append(page)
+        before = page[-1]["id"]
+    assert by_offset == by_keyset
+    assert sum(len(p) for p in by_keyset) == 30
+
+
+def test_events_survive_reopen(tmp_path):
+    path = str(tmp_path / "audit.sqlite")
+    store = AuditStore(path)
+    store.append("2025-01-01T10:00:00", "doc1", "Doctor", "Critical query: chest pain", critical=True)
+    store.close()
+
+    reopened = AuditStore(path)
+    assert reopened.query()[0]["event"] == "Critical query: chest pain"
+    reopened.close()
+
+
+def test_log_event_and_view_audit_log(store, capsys):
+    previous = hospital_agents.set_audit_store(store)
+    try:
+        hospital_agents.view_audit_log()
+        assert "No critical or denied events logged yet." in capsys.readouterr().out
+
+        hospital_agents.log_event("nurse1", "Nurse", "Denied query: Personal Address of P1")
+        hospital_agents.log_event("doc1", "Doctor", "Critical query: chest pain", critical=True)
+        hospital_agents.view_audit_log(critical=True)
+        out = capsys.readouterr().out
+        assert "doc1 (Doctor): Critical query: chest pain [CRITICAL]" in out
+        assert "nurse1" not in out
+    finally:
+        hospital_agents.set_audit_store(previous)
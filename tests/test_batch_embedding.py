@@ -0,0 +1,77 @@
+# tests/test_batch_embedding.py
+
+from functools import partial
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.vectorstores import InMemoryVectorStore
+
+from src.medbot import batch_embedding
+from src.medbot.batch_embedding import BatchedEmbeddings, length_sorted_batches, stream_documents
+
+TEXTS = ["a" * n for n in (7, 1, 5, 3, 3, 9, 2)] + ["text number %d" % i for i in range(20)]
+
+
+class RecordingEmbedding(DeterministicFakeEmbedding):
+    calls: list = []
+
+    def embed_documents(self, texts):
+        self.calls.append(list(texts))
+        return super().embed_documents(texts)
+
+
+def test_batches_are_length_sorted_and_stable():
+    batches = length_sorted_batches(["ccc", "a", "bb", "d", "eeee"], batch_size=2)
+
+    assert batches == [[1, 3], [2, 0], [4]]
+
+
+def test_vectors_come_back_in_input_order():
+    expected = DeterministicFakeEmbedding(size=8).embed_documents(TEXTS)
+    embedder = BatchedEmbeddings(partial(RecordingEmbedding, size=8, calls=[]), batch_size=4)
+
+    assert embedder.embed_documents(TEXTS) == expected
+    calls = embedder.embedder.calls
+    assert [len(call) for call in calls] == [4] * 6 + [3]
+    assert [len(text) for call in calls for text in call] == sorted(len(text) for text in TEXTS)
+
+
+def test_worker_processes_merge_deterministically():
+    expected = DeterministicFakeEmbedding(size=8).embed_documents(TEXTS)
+    with BatchedEmbeddings(partial(DeterministicFakeEmbedding, size=8), batch_size=3, workers=2) as embedder:
+        assert embedder.embed_documents(TEXTS) == expected
+        assert embedder.embed_documents(TEXTS[::-1]) == expected[::-1]
+        assert embedder._pool is not None
+    assert embedder._pool is None
+    assert embedder.stats()["batches"] == 2 * 9
+
+
+def test_worker_pool_is_stopped_at_exit(monkeypatch):
+    registered = []
+    monkeypatch.setattr(batch_embedding.atexit, "register", registered.append)
+    monkeypatch.setattr(batch_embedding.atexit, "unregister", registered.remove)
+    embedder = BatchedEmbeddings(partial(DeterministicFakeEmbedding, size=8), batch_size=3, workers=1)
+
+    embedder.embed_documents(TEXTS)
+    assert registered == [embedder.close]
+    registered[0]()
+    assert embedder._pool is None and registered == []
+
+
+def test_documents_stream_into_the_store_chunk_by_chunk():
+    embedder = BatchedEmbeddings(partial(RecordingEmbedding, size=8, calls=[]), batch_size=2)
+    documents = [Document(page_content=text, metadata={"n": i}) for i, text in enumerate(TEXTS)]
+    ids = [f"doc-{i}" for i in range(len(documents))]
+    created = []
+
+    def create(docs, chunk_ids):
+        created.append(chunk_ids)
+        return InMemoryVectorStore.from_documents(docs, embedding=embedder, ids=chunk_ids)
+
+    store = stream_documents(documents, ids, create=create, chunk_size=5)
+
+    assert len(created) == 1 and len(created[0]) == 5
+    assert max(len(call) for call in embedder.embedder.calls) == 2
+    assert sorted(store.store) == sorted(ids)
+    assert store.get_by_ids(["doc-3"])[0].page_content == TEXTS[3]
+    assert stream_documents([], vectorstore=store) is store
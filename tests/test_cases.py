@@ -1,17 +1,39 @@
 # test_cases.py
+#
+# Questions about the shipped Data/ extract. "expected" must appear in the
+# answer of every role that may see it; roles in "denied_roles" must get an
+# "Access denied" answer instead.
 
 test_cases = [
     {
-        "prompt": "What is the patient's temperature?",
-        "expected": "The patient's temperature is 98.6°F."
+        "prompt": "Show me the diagnosis for patient GME0000",
+        "expected": "Asthma",
+        "denied_roles": ["Pharmacist"],
     },
     {
-        "prompt": "What medication is due now?",
-        "expected": "The next medication due is Aspirin at 2 PM."
+        "prompt": "Show the medication details for GME0807",
+        "expected": "Lisinopril 10 mg",
+        "denied_roles": ["Nurse"],
     },
     {
-        "prompt": "Is the patient allergic to penicillin?",
-        "expected": "Yes, the patient has a documented penicillin allergy."
+        "prompt": "What are the alerts for GME0003?",
+        "expected": "ATC above target",
+        "denied_roles": ["Pharmacist"],
+    },
+    {
+        "prompt": "Show encounter history of GME0002",
+        "expected": "General Hosp",
+        "denied_roles": ["Pharmacist"],
+    },
+    {
+        "prompt": "Give me prescriptions for GME0001",
+        "expected": "Metformin",
+        "denied_roles": ["Nurse"],
+    },
+    {
+        "prompt": "What is the address of GME0002?",
+        "expected": "3275 Mcdonald Knoll",
+        "denied_roles": ["Nurse", "Pharmacist"],
     },
     # Add more test cases here
 ]
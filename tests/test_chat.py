@@ -0,0 +1,52 @@
+# tests/test_chat.py
+
+from src.medbot.chat import DENIED_ANSWER, parse_auditlog_command
+
+
+def test_invalid_login_gets_no_session(app_login):
+    assert app_login("nurse1", "wrong") is None
+    assert app_login("doc1", "1").role == "Doctor"
+
+
+def test_denied_and_critical_queries_are_audited(app_login, session_audit_log):
+    nurse = app_login("nurse1", "1")
+
+    denied = nurse.ask("Give me prescriptions for GME0001")
+    critical = nurse.ask("Emergency: what is the diagnosis for GME0004?")
+
+    assert denied == {"kind": "denied", "answer": DENIED_ANSWER, "critical": False}
+    assert critical["kind"] == "answer" and critical["critical"]
+    session_audit_log.flush()
+    events = [e["event"] for e in session_audit_log.query(username="nurse1")]
+    assert "Denied query: Give me prescriptions for GME0001" in events
+    assert "Critical query: Emergency: what is the diagnosis for GME0004?" in events
+
+
+def test_cohort_questions_use_the_cohort_index(app_login):
+    answer = app_login("doc1", "1").ask("How many patients have diabetes?")["answer"]
+
+    assert answer.startswith("300 patients")
+
+
+def test_supervisor_commands(app_login):
+    supervisor = app_login("super1", "1")
+
+    assert supervisor.ask("auditlog critical user=nurse1 page=2") == {
+        "kind": "auditlog", "filters": {"critical": True, "username": "nurse1", "page": 2}
+    }
+    assert supervisor.ask("cachestats")["kind"] == "cache_stats"
+    # For other roles it is an ordinary question
+    assert app_login("doc1", "1").ask("auditlog critical")["kind"] == "answer"
+    assert parse_auditlog_command("auditlog role=Nurse page=0") == {"role": "Nurse"}
+
+
+def test_streamed_turns_are_remembered(app_login):
+    doctor = app_login("doc1", "1")
+    tokens = []
+
+    first = doctor.ask("Show me the diagnosis for patient GME0005", on_token=tokens.append, on_progress=lambda e: None)
+    second = doctor.ask("What are the alerts for GME0005?")
+
+    assert "".join(tokens) == first["answer"] and first["timings"]["tokens"] == len(tokens)
+    assert second["memory"]["context_tokens"] > first["memory"]["context_tokens"]
+    assert [m.content for m in doctor.memory.context()[:1]] == ["Show me the diagnosis for patient GME0005"]
@@ -0,0 +1,105 @@
+# tests/test_checkpoint.py
+
+import os
+import sqlite3
+import subprocess
+import sys
+from typing import Annotated, List
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, RemoveMessage
+from langgraph.graph import StateGraph, START, END
+from langgraph.graph.message import add_messages
+from typing_extensions import TypedDict
+
+from src.medbot.checkpoint import SQLiteCheckpointSaver
+
+
+class State(TypedDict):
+    messages: Annotated[List[BaseMessage], add_messages]
+
+
+def build_graph(checkpointer):
+    def answer(state):
+        return {"messages": [AIMessage(content=f"answer to {state['messages'][-1].content}")]}
+
+    graph = StateGraph(State)
+    graph.add_node("llm", answer)
+    graph.add_edge(START, "llm")
+    graph.add_edge("llm", END)
+    return graph.compile(checkpointer=checkpointer)
+
+
+def ask(graph, thread_id, text):
+    config = {"configurable": {"thread_id": thread_id}}
+    return graph.invoke({"messages": [HumanMessage(content=text)]}, config)
+
+
+def test_conversation_survives_restart(tmp_path):
+    db = str(tmp_path / "sessions.sqlite")
+    ask(build_graph(SQLiteCheckpointSaver(db)), "s1", "q1")
+
+    result = ask(build_graph(SQLiteCheckpointSaver(db)), "s1", "q2")
+
+    assert [m.content for m in result["messages"]] == ["q1", "answer to q1", "q2", "answer to q2"]
+    assert ask(build_graph(SQLiteCheckpointSaver(db)), "s2", "other")["messages"][0].content == "other"
+
+
+def test_each_message_is_stored_once(tmp_path):
+    db = str(tmp_path / "sessions.sqlite")
+    graph = build_graph(SQLiteCheckpointSaver(db))
+    for i in range(5):
+        ask(graph, "s1", f"q{i}")
+
+    conn = sqlite3.connect(db)
+    assert conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0] == 10
+    # No checkpoint re-serialized the message list
+    assert conn.execute("SELECT COUNT(*) FROM blobs WHERE channel='messages' AND type!='log_prefix'").fetchone()[0] == 0
+
+
+def test_removed_messages_fall_back_to_full_value(tmp_path):
+    saver = SQLiteCheckpointSaver(str(tmp_path / "sessions.sqlite"))
+    graph = build_graph(saver)
+    config = {"configurable": {"thread_id": "s1"}}
+    first = ask(graph, "s1", "q1")["messages"][0]
+
+    graph.update_state(config, {"messages": [RemoveMessage(id=first.id)]})
+
+    assert [m.content for m in graph.get_state(config).values["messages"]] == ["answer to q1"]
+    reloaded = build_graph(SQLiteCheckpointSaver(saver.path))
+    assert [m.content for m in reloaded.get_state(config).values["messages"]] == ["answer to q1"]
+
+
+def test_history_and_delete(tmp_path):
+    saver = SQLiteCheckpointSaver(str(tmp_path / "sessions.sqlite"))
+    graph = build_graph(saver)
+    ask(graph, "s1", "q1")
+    ask(graph, "s1", "q2")
+
+    assert len(list(saver.list({"configurable": {"thread_id": "s1"}}))) >= 4
+    saver.delete_thread("s1")
+    assert saver.get_tuple({"configurable": {"thread_id": "s1"}}) is None
+
+
+def test_importing_the_graph_scripts_opens_no_session_database(tmp_path):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = {key: value for key, value in os.environ.items() if key != "MEDBOT_SESSION_DB"}
+    env["PYTHONPATH"] = root
+    subprocess.run([sys.executable, "-c", "import graph_test, graph_test_sysprompt, graph_test_sys_rag"],
+                   cwd=tmp_path, env=env, check=True, capture_output=True)
+
+    assert not os.path.exists(tmp_path / "sessions.sqlite")
+
+
+def test_cached_message_logs_are_bounded_and_reloaded(tmp_path):
+    saver = SQLiteCheckpointSaver(str(tmp_path / "sessions.sqlite"), max_cached_logs=2)
+    graph = build_graph(saver)
+    for thread_id in ("s1", "s2", "s3"):
+        ask(graph, thread_id, "q1")
+
+    assert [key[0] for key in saver._logs] == ["s2", "s3"]
+    result = ask(graph, "s1", "q2")
+    assert [m.content for m in result["messages"]] == ["q1", "answer to q1", "q2", "answer to q2"]
+    assert [key[0] for key in saver._logs] == ["s3", "s1"]
+
+    saver.delete_thread("s3")
+    assert [key[0] for key in saver._logs] == ["s1"]
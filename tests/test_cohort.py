@@ -0,0 +1,63 @@
+# tests/test_cohort.py
+
+import os
+
+import pytest
+
+from src.medbot.cohort import COHORT_CATEGORIES, CohortIndex
+from src.medbot.data_loader import SECTION_TEMPLATES, load_tables
+from src.medbot.hospital_agents import make_cohort_tool, ROLE_PERMISSIONS, ROLE_SECTIONS
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Data")
+
+
+@pytest.fixture(scope="module")
+def tables():
+    return load_tables(DATA_DIR)
+
+
+@pytest.fixture(scope="module")
+def cohort_index(tables):
+    return CohortIndex.from_dataframes(*tables)
+
+
+def test_diagnosis_cohort_is_exact(tables, cohort_index):
+    diagnoses = tables[1]
+    expected = sorted(diagnoses.loc[diagnoses["Diagnosis"] == "Diabetes", "PatientID"].unique())
+
+    assert cohort_index.patients_with("diagnosis", "diabetes") == expected
+
+
+def test_allergy_alerts_skip_negated_values(cohort_index):
+    assert cohort_index.match_values("alert", "allergy") == ["Allergies – Sulfa Drugs"]
+
+
+def test_cohort_tool_respects_role_fields(cohort_index):
+    nurse_tool = make_cohort_tool(cohort_index, ROLE_PERMISSIONS["Nurse"]["fields"])
+    pharmacist_tool = make_cohort_tool(cohort_index, ROLE_PERMISSIONS["Pharmacist"]["fields"])
+
+    answer = nurse_tool.invoke({"category": "diagnosis", "term": "diabetes", "count_only": True})
+    assert answer.startswith(f"{len(cohort_index.patients_with('diagnosis', 'diabetes'))} patients")
+    assert "Access denied" in pharmacist_tool.invoke({"category": "diagnosis", "term": "diabetes"})
+    assert "patients with prescription" in pharmacist_tool.invoke({"category": "prescription", "term": "ASA"})
+
+
+def test_immunization_cohorts_are_doctor_and_supervisor_only(cohort_index):
+    query = {"category": "immunization", "term": "influenza", "count_only": True}
+    for role in ("Nurse", "Pharmacist"):
+        tool = make_cohort_tool(cohort_index, ROLE_PERMISSIONS[role]["fields"])
+        assert "Access denied" in tool.invoke(query)
+    doctor_tool = make_cohort_tool(cohort_index, ROLE_PERMISSIONS["Doctor"]["fields"])
+    assert "patients" in doctor_tool.invoke(query)
+
+
+def test_cohort_access_matches_retrievable_sections(cohort_index):
+    # A role may run a cohort query exactly when RAG may return that section to it
+    table_sections = {arg_name: section for section, arg_name, _, _ in SECTION_TEMPLATES}
+    for role, permissions in ROLE_PERMISSIONS.items():
+        if permissions["fields"] == "ALL":
+            continue
+        tool = make_cohort_tool(cohort_index, permissions["fields"])
+        for category, (arg_name, _, _) in COHORT_CATEGORIES.items():
+            denied = "Access denied" in tool.invoke({"category": category, "term": "x", "count_only": True})
+            assert denied == (table_sections[arg_name] not in ROLE_SECTIONS[role]), (role, category)
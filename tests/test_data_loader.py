@@ -0,0 +1,123 @@
+# tests/test_data_loader.py
+
+import os
+
+import pandas as pd
+import pytest
+
+from src.medbot.data_loader import (
+    load_patient_details, load_diagnosis, load_medications, load_prescriptions,
+    load_alerts, load_diabetic_indices, load_encounters, load_immunizations,
+    build_patient_documents, combine_patient_documents_iterrows, patient_fingerprints,
+    load_tables, ingestion_report, parse_dates, TABLE_FILES, TABLE_SCHEMAS,
+)
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Data")
+
+
+@pytest.fixture(scope="module")
+def tables():
+    return [
+        load_patient_details(os.path.join(DATA_DIR, "patient_details.csv")),
+        load_diagnosis(os.path.join(DATA_DIR, "diagnosis.csv")),
+        load_medications(os.path.join(DATA_DIR, "medications.csv")),
+        load_prescriptions(os.path.join(DATA_DIR, "prescriptions.csv")),
+        load_alerts(os.path.join(DATA_DIR, "alerts.csv")),
+        load_diabetic_indices(os.path.join(DATA_DIR, "diabetic_indices.csv")),
+        load_encounters(os.path.join(DATA_DIR, "encounter_history.csv")),
+        load_immunizations(os.path.join(DATA_DIR, "immunizations.csv")),
+    ]
+
+
+@pytest.fixture(scope="module")
+def iterrows_documents(tables):
+    return combine_patient_documents_iterrows(*tables)
+
+
+def test_grouped_builder_matches_iterrows(tables, iterrows_documents):
+    documents = build_patient_documents(*tables)
+
+    assert [d.page_content for d in documents] == [d.page_content for d in iterrows_documents]
+    assert [d.metadata for d in documents] == [d.metadata for d in iterrows_documents]
+
+
+def test_grouped_builder_handles_patients_without_rows(tables, iterrows_documents):
+    patients, *children = tables
+    empty_children = [df.iloc[0:0] for df in children]
+
+    documents = build_patient_documents(patients.head(3), *empty_children)
+
+    assert [d.page_content for d in documents] == [
+        d.page_content.split("\nDiagnoses:")[0] for d in iterrows_documents[:3]
+    ]
+
+
+def test_patient_fingerprints_change_only_for_edited_patient(tables):
+    before = patient_fingerprints(*tables)
+    patients, diagnoses, medications, prescriptions, alerts, indices, encounters, immunizations = tables
+    edited = encounters.copy()
+    # Reason is categorical and rows are indexed by PatientID
+    edited["Reason"] = edited["Reason"].cat.add_categories(["Follow-up"])
+    edited.iloc[0, edited.columns.get_loc("Reason")] = "Follow-up"
+
+    after = patient_fingerprints(
+        patients, diagnoses, medications, prescriptions, alerts, indices, edited, immunizations
+    )
+
+    changed = [pid for pid in before if before[pid] != after[pid]]
+    assert changed == [encounters["PatientID"].iloc[0]]
+
+
+def test_section_chunks_cover_the_whole_patient_document(tables, iterrows_documents):
+    sections = build_patient_documents(*tables, chunking="section")
+
+    first = [d for d in sections if d.metadata["PatientID"] == "GME0000"]
+    assert [d.metadata["section"] for d in first][:3] == ["identity", "demographics", "contact"]
+    rebuilt = "\n".join(
+        d.page_content if d.metadata["section"] == "identity"
+        else d.page_content.split("\n", 1)[1]
+        for d in first
+    )
+    assert rebuilt == iterrows_documents[0].page_content
+
+
+def test_load_tables_matches_the_single_table_loaders(tables):
+    concurrent = load_tables(DATA_DIR)
+    sequential = load_tables(DATA_DIR, workers=1)
+
+    assert len(concurrent) == len(TABLE_FILES)
+    for loaded, one_by_one, expected in zip(concurrent, sequential, tables):
+        pd.testing.assert_frame_equal(loaded, expected)
+        pd.testing.assert_frame_equal(one_by_one, expected)
+
+
+def test_tables_follow_their_declared_schemas(tables):
+    for df, (_, filename, schema_name) in zip(tables, TABLE_FILES):
+        schema = TABLE_SCHEMAS[schema_name]
+        for column, dtype in schema["dtype"].items():
+            if dtype == "category":
+                assert isinstance(df[column].dtype, pd.CategoricalDtype), (filename, column)
+        for column in schema["dates"]:
+            # Text kept for rendering, parsed copy alongside
+            assert df[column].dtype == object
+            assert pd.api.types.is_datetime64_any_dtype(df[column + "_dt"])
+        assert df.index.name == "PatientID" and df.index.is_monotonic_increasing
+        assert (df.index == df["PatientID"]).all()
+        assert df.attrs["source"] == filename and df.attrs["load_seconds"] >= 0
+
+    patients = tables[0]
+    assert patients.loc["GME0000", "DOB_dt"] == pd.Timestamp("1952-09-16")
+
+
+def test_parse_dates_handles_missing_and_malformed_values():
+    parsed = parse_dates(pd.Series(["07/2023", None, "13/2023", "07/2023"]), "%m/%Y")
+
+    assert parsed.iloc[0] == parsed.iloc[3] == pd.Timestamp("2023-07-01")
+    assert parsed.iloc[1:3].isna().all()
+
+
+def test_ingestion_report_has_a_line_per_table(tables):
+    lines = ingestion_report(tables)
+
+    assert len(lines) == len(tables)
+    assert lines[0].startswith("patient_details.csv") and "MiB" in lines[0]
@@ -0,0 +1,100 @@
+# tests/test_embedding_cache.py
+
+import numpy as np
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from src.medbot.embedding_cache import CachedEmbeddings
+
+
+class CountingEmbedding(DeterministicFakeEmbedding):
+    calls: int = 0
+
+    def embed_documents(self, texts):
+        self.calls += len(texts)
+        return super().embed_documents(texts)
+
+
+def test_repeated_texts_are_served_from_cache(tmp_path):
+    inner = CountingEmbedding(size=8)
+    cache = CachedEmbeddings(inner, "fake-model", str(tmp_path))
+
+    first = cache.embed_documents(["a", "b", "a"])
+    second = cache.embed_documents(["b", "a"])
+
+    assert inner.calls == 2
+    assert second == [first[1], first[0]]
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 2
+
+
+def test_cache_survives_reopen_and_is_keyed_by_model(tmp_path):
+    inner = CountingEmbedding(size=8)
+    CachedEmbeddings(inner, "fake-model", str(tmp_path)).embed_documents(["a", "b"])
+
+    reopened = CachedEmbeddings(inner, "fake-model", str(tmp_path))
+    reopened.embed_documents(["a", "b"])
+    assert inner.calls == 2
+
+    other_model = CachedEmbeddings(inner, "other-model", str(tmp_path))
+    other_model.embed_documents(["a"])
+    assert inner.calls == 3
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path):
+    inner = CountingEmbedding(size=8)
+    cache = CachedEmbeddings(inner, "fake-model", str(tmp_path), max_entries=2)
+
+    cache.embed_documents(["a", "b"])
+    cache.embed_documents(["a"])       # "b" is now least recently used
+    cache.embed_documents(["c"])       # evicts "b"
+    calls = inner.calls
+    cache.embed_documents(["a", "c"])
+
+    assert inner.calls == calls
+    assert cache.stats()["evictions"] == 1
+    cache.embed_documents(["b"])
+    assert inner.calls == calls + 1
+
+
+def test_instances_sharing_a_directory_never_serve_each_others_vectors(tmp_path):
+    inner = CountingEmbedding(size=8)
+    expected = inner.embed_documents(["x", "y"])
+    a = CachedEmbeddings(inner, "fake-model", str(tmp_path))
+    b = CachedEmbeddings(inner, "fake-model", str(tmp_path))
+
+    a.embed_documents(["x"])
+    b.embed_documents(["y"])   # b does not know x's slot and must not reuse it
+
+    np.testing.assert_allclose(a.embed_documents(["x"]), [expected[0]], rtol=1e-6)
+    np.testing.assert_allclose(b.embed_documents(["y"]), [expected[1]], rtol=1e-6)
+    reopened = CachedEmbeddings(inner, "fake-model", str(tmp_path))
+    calls = inner.calls
+    np.testing.assert_allclose(reopened.embed_documents(["x", "y"]), expected, rtol=1e-6)
+    assert inner.calls == calls and reopened.stats()["entries"] == 2
+
+
+def test_a_slot_reused_by_another_instance_is_a_miss(tmp_path):
+    inner = CountingEmbedding(size=8)
+    a = CachedEmbeddings(inner, "fake-model", str(tmp_path), max_entries=1)
+    b = CachedEmbeddings(inner, "fake-model", str(tmp_path), max_entries=1)
+
+    a.embed_documents(["x"])
+    b.embed_documents(["y"])   # evicts x from the only slot
+    calls = inner.calls
+
+    np.testing.assert_allclose(a.embed_documents(["x"]), inner.embed_documents(["x"]), rtol=1e-6)
+    assert inner.calls == calls + 2
+
+
+def test_a_call_larger_than_the_cache_caches_its_last_entries(tmp_path):
+    inner = CountingEmbedding(size=8)
+    cache = CachedEmbeddings(inner, "fake-model", str(tmp_path), max_entries=2)
+    expected = DeterministicFakeEmbedding(size=8).embed_documents(["a", "b", "c"])
+
+    vectors = cache.embed_documents(["a", "b", "c"])
+
+    np.testing.assert_allclose(vectors, expected, rtol=1e-6)
+    assert cache.stats()["entries"] == 2
+    calls = inner.calls
+    cache.embed_documents(["b", "c"])
+    assert inner.calls == calls
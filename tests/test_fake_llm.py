@@ -0,0 +1,101 @@
+# tests/test_fake_llm.py
+
+import time
+
+import pytest
+from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.tools import tool
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from src.medbot import fake_llm
+from src.medbot.fake_llm import FakeToolCallingChatModel, plan_tool_calls
+from src.medbot.helper import create_chat_openai_llm
+from src.medbot.load_test import build_offline_agents, percentile, run_sessions
+from src.medbot.synthetic_data import generate_tables
+
+
+@pytest.fixture(scope="module")
+def agents():
+    return build_offline_agents(generate_tables(40), FakeToolCallingChatModel())
+
+
+@tool
+def medical_rag_tool(query: str) -> str:
+    """Retrieve patient information."""
+    return query
+
+
+@tool
+def cohort_query_tool(category: str, term: str, count_only: bool = False) -> str:
+    """List or count patients."""
+    return term
+
+
+def test_plans_one_rag_call_per_patient_and_cohort_calls_for_cohorts():
+    tools = [convert_to_openai_tool(t) for t in (medical_rag_tool, cohort_query_tool)]
+
+    calls = plan_tool_calls("Compare GME0001 and GME0002 medications", tools)
+    assert [c["args"]["query"] for c in calls] == ["Compare and medications GME0001",
+                                                   "Compare and medications GME0002"]
+
+    [cohort] = plan_tool_calls("How many patients have allergy alerts?", tools)
+    assert cohort["name"] == "cohort_query_tool"
+    assert cohort["args"] == {"category": "alert", "term": "allergy", "count_only": True}
+    assert plan_tool_calls("How many patients have allergy alerts?", tools[:1])[0]["name"] == "medical_rag_tool"
+
+
+def test_answers_from_the_matching_context_passages():
+    context = "Use the context.\n----------------\nPatientID: GME0001\nName: A\n\nPatientID: GME0002\nDiagnoses:\n - Asthma"
+    reply = FakeToolCallingChatModel().invoke([SystemMessage(content=context),
+                                               HumanMessage(content="Diagnosis of GME0002?")])
+
+    assert reply.content == "PatientID: GME0002\nDiagnoses:\n - Asthma"
+    assert reply.usage_metadata["output_tokens"] > 0
+
+
+def test_simulates_latency_and_token_rate():
+    llm = FakeToolCallingChatModel(latency=0.1, tokens_per_second=100)
+    start = time.perf_counter()
+    chunks = list(llm.stream([HumanMessage(content="one two three four five")]))
+    elapsed = time.perf_counter() - start
+
+    assert elapsed >= 0.1
+    assert "".join(c.content for c in chunks) == llm.invoke([HumanMessage(content="one two three four five")]).content
+
+
+def test_environment_switch_replaces_the_openai_client(monkeypatch):
+    monkeypatch.setenv(fake_llm.LLM_ENV, "fake")
+    monkeypatch.setenv(fake_llm.LATENCY_ENV, "0.25")
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+
+    llm = create_chat_openai_llm()
+    assert isinstance(llm, FakeToolCallingChatModel) and llm.latency == 0.25
+    assert create_chat_openai_llm() is llm
+
+
+def test_agent_turn_calls_the_tool_and_answers_with_its_result(agents):
+    result = agents["Doctor"].invoke({"messages": [HumanMessage(content="Show me the diagnosis for patient GME0003")]},
+                                     config={"configurable": {"thread_id": "fake-llm-doctor"}})
+
+    assert [m.type for m in result["messages"]] == ["human", "ai", "tool", "ai"]
+    assert "GME0003" in result["messages"][-1].content
+
+    denied = agents["Pharmacist"].invoke({"messages": [HumanMessage(content="Diagnosis of GME0003")]},
+                                         config={"configurable": {"thread_id": "fake-llm-pharmacist"}})
+    assert denied["messages"][-1].content.startswith("Access denied")
+
+
+def test_load_run_reports_per_node_latency(agents):
+    result = run_sessions(agents, sessions=6, turns=2, concurrency=3)
+
+    assert result["errors"] == [] and result["turns"] == 12
+    assert {"node:llm", "node:retriever_agent", "model:llm", "tool:medical_rag_tool"} <= set(result["nodes"])
+    assert result["nodes"]["node:llm"]["count"] >= 12
+    stats = result["turn"]
+    assert stats["p50_ms"] <= stats["p95_ms"] <= stats["p99_ms"] <= stats["max_ms"]
+
+
+def test_percentile_is_nearest_rank():
+    values = list(range(1, 101))
+    assert [percentile(values, q) for q in (50, 95, 99, 100)] == [50, 95, 99, 100]
+    assert percentile([], 50) is None
@@ -0,0 +1,91 @@
+# tests/test_memory.py
+
+from langchain_core.language_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+from src.medbot.memory import ConversationMemory, bounded_history, count_tokens, truncate_to_tokens
+
+
+def turn(i):
+    call = AIMessage(content="", tool_calls=[{"name": "medical_rag_tool", "args": {"query": "q"}, "id": f"c{i}"}])
+    return [
+        HumanMessage(content=f"question {i}"),
+        call,
+        ToolMessage(tool_call_id=f"c{i}", content="a very long retrieved record " * 50),
+        AIMessage(content=f"answer {i}"),
+    ]
+
+
+def test_keeps_recent_turns_without_tool_payloads():
+    memory = ConversationMemory(max_recent_turns=2)
+    for i in range(2):
+        memory.add_turn(f"question {i}", turn(i))
+
+    assert [m.content for m in memory.context()] == ["question 0", "answer 0", "question 1", "answer 1"]
+    assert not any(isinstance(m, ToolMessage) for m in memory.context())
+
+
+def test_older_turns_fold_into_bounded_summary():
+    memory = ConversationMemory(max_recent_turns=2, summary_token_budget=12)
+    for i in range(5):
+        stats = memory.add_turn(f"question {i}", turn(i))
+
+    context = memory.context()
+    assert isinstance(context[0], SystemMessage)
+    assert count_tokens(memory.summary) <= 12
+    # The most recent folded turn survives truncation
+    assert "answer 2" in memory.summary
+    assert [m.content for m in context[1:]] == ["question 3", "answer 3", "question 4", "answer 4"]
+    assert stats["context_tokens"] < 60
+
+
+def test_turns_are_folded_in_batches():
+    summaries = iter([AIMessage(content=f"summary {i}") for i in range(10)])
+    summarizer = GenericFakeChatModel(messages=summaries)
+    memory = ConversationMemory(summarizer=summarizer, max_recent_turns=2)
+    folds = [memory.add_turn(f"question {i}", turn(i))["summarization_tokens"] > 0 for i in range(10)]
+
+    # Folded when 2 * max_recent_turns is exceeded, down to max_recent_turns
+    assert folds == [False, False, False, False, True, False, False, True, False, False]
+    assert memory.summary == "summary 1"
+    assert len(memory.turns) == 4
+
+
+def test_recent_token_budget_folds_early():
+    memory = ConversationMemory(max_recent_turns=1, recent_token_budget=5)
+    memory.add_turn("question 0", turn(0))
+    memory.add_turn("question 1", turn(1))
+
+    assert [m.content for m in memory.turns[0]] == ["question 1", "answer 1"]
+    assert "answer 0" in memory.summary
+
+
+def test_summarizer_overhead_is_reported():
+    summarizer = GenericFakeChatModel(messages=iter([AIMessage(content="Asked about GME0000 diabetes.")]))
+    memory = ConversationMemory(summarizer=summarizer, max_recent_turns=1)
+    for i in range(3):
+        stats = memory.add_turn(f"question {i}", turn(i))
+
+    assert memory.summary == "Asked about GME0000 diabetes."
+    assert stats["summarization_tokens"] > 0
+    assert len(memory.turn_stats) == 3
+
+
+def test_bounded_history_keeps_the_current_turn_and_recent_answers():
+    history = [SystemMessage(content="summary")]
+    for i in range(20):
+        history += turn(i)
+    current = [HumanMessage(content="question now")] + turn(99)[1:3]
+
+    bounded = bounded_history(history + current, token_budget=20)
+
+    assert bounded[0].content == "summary"
+    assert bounded[-3:] == current
+    earlier = [m.content for m in bounded[1:-3]]
+    assert earlier[-2:] == ["question 19", "answer 19"]
+    assert "question 0" not in earlier
+    assert not any(isinstance(m, ToolMessage) for m in bounded[1:-3])
+
+
+def test_truncate_keeps_the_end():
+    assert truncate_to_tokens("one two three four", 2) == "three four"
@@ -0,0 +1,112 @@
+# tests/test_pipeline.py
+
+import os
+import subprocess
+import sys
+
+from src.medbot.pipeline import MedbotPipeline, OfflinePipeline
+from src.medbot.synthetic_data import generate_tables
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(ROOT, "Data")
+
+
+def test_stages_are_built_on_first_use(tmp_path):
+    pipeline = MedbotPipeline(DATA_DIR, str(tmp_path / "index"))
+    assert not any(pipeline.is_built(name) for name in MedbotPipeline.STAGES)
+
+    documents = pipeline.documents
+    assert documents
+    # Only documents and the tables they are combined from
+    assert set(pipeline.stage_seconds) == {"tables", "documents"}
+    assert not pipeline.is_built("vectorstore") and not pipeline.is_built("llm")
+    assert pipeline.documents is documents
+
+
+def test_importing_modules_skips_heavy_backends():
+    heavy = ["langchain_openai", "langchain_huggingface", "langchain_community", "chromadb",
+             "faiss", "pinecone", "sentence_transformers", "langchain.chains"]
+    code = (
+        "import sys\n"
+        "import src.medbot.helper, src.medbot.store_index, src.medbot.pipeline\n"
+        f"print([m for m in {heavy!r} if m in sys.modules])\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "[]"
+
+
+def test_reload_rebuilds_the_data_and_invalidates_cached_answers():
+    tables = generate_tables(10)
+    pipeline = OfflinePipeline(DATA_DIR, tables=tables).load()
+    pipeline.answer_cache.put("Doctor", "Diagnosis of GME0001?", "old answer")
+    agent = pipeline.agent("Doctor")
+
+    assert pipeline.reload(tables=tables)["changed"] is False
+    assert pipeline.answer_cache.get("Doctor", "Diagnosis of GME0001?") is not None
+
+    edited = [table.copy() for table in tables]
+    edited[0]["Name"] = edited[0]["Name"].astype(str) + " Jr"
+    result = pipeline.reload(tables=edited)
+
+    assert result["changed"] is True and result["data_version"] == pipeline.answer_cache.data_version
+    assert pipeline.answer_cache.get("Doctor", "Diagnosis of GME0001?") is None
+    assert pipeline.agent("Doctor") is not agent
+    assert all(" Jr" in doc.page_content for doc in pipeline.documents if doc.metadata["section"] == "identity")
+
+
+def test_checkpointed_history_sent_to_the_llm_is_bounded(monkeypatch):
+    from langchain_core.messages import HumanMessage
+
+    from src.medbot import memory
+    from src.medbot.fake_llm import FakeToolCallingChatModel
+
+    class RecordingLLM(FakeToolCallingChatModel):
+        prompts: list = []
+
+        def respond(self, messages, tools=None):
+            self.prompts.append(len(messages))
+            return super().respond(messages, tools)
+
+    monkeypatch.setattr(memory, "DEFAULT_HISTORY_TOKEN_BUDGET", 60)
+    llm = RecordingLLM(prompts=[])
+    pipeline = OfflinePipeline(DATA_DIR, tables=generate_tables(5), llm=llm, answer_cache=False)
+    agent = pipeline.agent("Doctor")
+    config = {"configurable": {"thread_id": "long-session"}}
+    for i in range(12):
+        agent.invoke({"messages": [HumanMessage(content=f"Diagnosis of GME000{i % 5}?")]}, config)
+
+    assert len(agent.get_state(config).values["messages"]) > 40
+    # system + a few earlier (question, answer) pairs + the current turn
+    assert max(llm.prompts[-4:]) < 15
+
+
+def test_reload_builds_outside_the_lock_and_keeps_injected_tables(monkeypatch):
+    import threading
+
+    from src.medbot import cohort
+
+    tables = generate_tables(6)
+    pipeline = OfflinePipeline(tables=tables)
+    agent = pipeline.agent("Doctor")
+
+    building, release = threading.Event(), threading.Event()
+    from_dataframes = cohort.CohortIndex.from_dataframes.__func__
+
+    def slow_from_dataframes(cls, *args):
+        building.set()
+        release.wait(5)
+        return from_dataframes(cls, *args)
+
+    monkeypatch.setattr(cohort.CohortIndex, "from_dataframes", classmethod(slow_from_dataframes))
+    results = []
+    reloading = threading.Thread(target=lambda: results.append(pipeline.reload()))
+    reloading.start()
+    assert building.wait(5)
+    # Sessions are still served, from the current agent, while the rebuild runs
+    assert pipeline.agent("Doctor") is agent
+    release.set()
+    reloading.join(5)
+
+    assert results[0]["changed"] is False
+    assert pipeline.tables == tables
+    assert pipeline.agent("Doctor") is not agent
@@ -0,0 +1,75 @@
+# tests/test_policy.py
+
+import pytest
+
+from src.medbot.hospital_agents import check_permission, classify_query_criticality, evaluate_query
+from src.medbot.policy import CRITICAL_KEYWORDS, PolicyMatcher
+from tests.test_cases import test_cases
+
+# Flagged Critical by the original check (`keyword in query.lower()`)
+BASELINE_CRITICAL_QUERIES = [
+    "GME0001 collapsed on the ward",
+    "found in a state of unconsciousness",
+    "Possible heatstroke in GME0002",
+    "Two strokes last year",
+    "Seizures overnight, what medication?",
+    "Bleeding after surgery",
+    "nosebleeding again",
+    "He has chest pains",
+    "an anaphylaxis-like allergic reactions history",
+    "EMERGENCY: heart attack, code blue",
+    "suicidal ideation - suicide risk",
+    "Was there an emergency admission?",
+]
+
+
+def baseline_criticality(query):
+    return "Critical" if any(keyword in query.lower() for keyword in CRITICAL_KEYWORDS) else "Normal"
+
+
+def test_single_pass_reports_fields_denials_and_criticality():
+    result = evaluate_query("Nurse", "Patient GME0001 collapsed with chest pain: diagnosis and prescriptions?")
+
+    assert result["fields"] == {"Diagnosis", "Prescriptions"}
+    assert result["denied"] == ["Prescriptions"]
+    assert result["allowed"] is False
+    assert result["critical_terms"] == ["collapse", "chest pain"]
+    assert result["criticality"] == "Critical"
+
+
+def test_whole_word_matching():
+    # "Name" no longer matches inside "username", nor "DOB" inside "dobutamine"
+    assert check_permission("Nurse", "Show the username for GME0001") is False
+    assert check_permission("Nurse", "Is GME0001 on dobutamine") is False
+    assert check_permission("Nurse", "Show the name and alerts of GME0001") is True
+    assert classify_query_criticality("Any STROKE history?") == "Critical"
+    assert classify_query_criticality("Routine check") == "Normal"
+
+
+def test_aliases_count_as_the_field():
+    # Naming an allowed field no longer lets a denied one through under another name
+    assert check_permission("Nurse", "Name and address of GME0001") is False
+    assert check_permission("Doctor", "Name and address of GME0001") is True
+
+
+def test_overlapping_phrases_all_match():
+    matcher = PolicyMatcher(["Encounter History", "History"], ["bleeding"])
+    assert matcher.match("encounter history and BLEEDING")["fields"] == {"Encounter History", "History"}
+
+
+@pytest.mark.parametrize("query", BASELINE_CRITICAL_QUERIES)
+def test_inflected_critical_keywords_still_match(query):
+    assert classify_query_criticality(query) == "Critical"
+
+
+def test_critical_whenever_the_substring_check_was():
+    queries = BASELINE_CRITICAL_QUERIES + [case["prompt"] for case in test_cases] + [
+        "Routine check", "codeblue", "chest x-ray", "painless chest", "No emergencies",
+    ]
+    # Every keyword, inflected and embedded in other words
+    for keyword in CRITICAL_KEYWORDS:
+        queries += [keyword.upper(), f"pre{keyword}ed today", f"{keyword}s?", f"x{keyword}"]
+
+    for query in queries:
+        if baseline_criticality(query) == "Critical":
+            assert classify_query_criticality(query) == "Critical", query
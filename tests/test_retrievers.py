@@ -0,0 +1,107 @@
+# tests/test_retrievers.py
+
+from typing import List
+
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from src.medbot.retrievers import (
+    BM25Index, PatientIDRetriever, extract_patient_ids, reciprocal_rank_fusion,
+)
+
+
+class RecordingRetriever(BaseRetriever):
+    queries: List[str] = []
+    k: List[int] = []
+
+    def _get_relevant_documents(self, query, *, run_manager, **kwargs):
+        self.queries.append(query)
+        self.k.append(kwargs.get("k"))
+        return [Document(page_content="semantic hit", metadata={"PatientID": "GME0999"})]
+
+
+DOCUMENTS = [
+    Document(page_content=f"PatientID: GME000{i}", metadata={"PatientID": f"GME000{i}"})
+    for i in range(3)
+]
+
+
+def test_extract_patient_ids():
+    assert extract_patient_ids("Show the diagnosis for patient GME0000") == ["GME0000"]
+    assert extract_patient_ids("Compare gme0002 with GME0001 and GME0002") == ["GME0002", "GME0001"]
+    assert extract_patient_ids("List all patients with diabetes") == []
+
+
+def test_patient_ids_bypass_vector_search():
+    fallback = RecordingRetriever()
+    retriever = PatientIDRetriever.from_documents(DOCUMENTS, fallback=fallback)
+
+    docs = retriever.invoke("What medications were given to GME0002 and GME0000?")
+
+    assert [d.metadata["PatientID"] for d in docs] == ["GME0002", "GME0000"]
+    assert fallback.queries == []
+    assert retriever.invoke("Show encounter history of GME0807") == []
+
+
+def test_queries_without_ids_use_fallback_with_k():
+    fallback = RecordingRetriever()
+    retriever = PatientIDRetriever.from_documents(DOCUMENTS, fallback=fallback)
+    retriever.search_kwargs = {"k": 5}
+
+    docs = retriever.invoke("Which patients have allergy alerts?")
+
+    assert [d.page_content for d in docs] == ["semantic hit"]
+    assert fallback.k == [5]
+
+
+def test_bm25_ranks_exact_terms_first():
+    docs = [
+        Document(page_content="Prescriptions:\n - Atorvastatin: One tab at supper", metadata={"PatientID": "GME0001"}),
+        Document(page_content="Prescriptions:\n - ASA: One tab at breakfast", metadata={"PatientID": "GME0002"}),
+        Document(page_content="Alerts:\n - Td due", metadata={"PatientID": "GME0003"}),
+    ]
+
+    hits = BM25Index(docs).search("who takes atorvastatin", k=3)
+
+    assert [d.metadata["PatientID"] for d in hits] == ["GME0001"]
+
+
+def test_reciprocal_rank_fusion_weights_lists():
+    a, b, c = DOCUMENTS
+
+    assert reciprocal_rank_fusion([[a, b], [b, c]], [1.0, 1.0]) == [b, a, c]
+    assert reciprocal_rank_fusion([[a], [c]], [2.0, 1.0]) == [a, c]
+    assert reciprocal_rank_fusion([[a], [c]], [1.0, 2.0]) == [c, a]
+
+
+def test_section_chunks_are_filtered_by_query():
+    section_docs = [
+        Document(page_content=f"PatientID: GME0001\n{section}", metadata={"PatientID": "GME0001", "section": section})
+        for section in ["identity", "demographics", "contact", "diagnoses", "medications", "encounters"]
+    ]
+    retriever = PatientIDRetriever.from_documents(section_docs, fallback=RecordingRetriever())
+
+    docs = retriever.invoke("What medications were given to GME0001?")
+    assert [d.metadata["section"] for d in docs] == ["identity", "medications"]
+    assert len(retriever.invoke("Tell me about GME0001")) == 6
+
+
+def test_named_patients_are_ranked_and_cut_to_k():
+    sections = ["identity", "demographics", "diagnoses", "medications", "encounters", "immunizations"]
+    section_docs = [
+        Document(page_content=f"PatientID: {pid}\n{section}", metadata={"PatientID": pid, "section": section})
+        for pid in ["GME0001", "GME0002"] for section in sections
+    ]
+    for doc in section_docs:
+        if doc.metadata["section"] == "medications":
+            doc.page_content += "\n - Atorvastatin"
+    retriever = PatientIDRetriever.from_documents(section_docs, fallback=RecordingRetriever())
+    retriever.search_kwargs = {"k": 3}
+
+    docs = retriever.invoke("Are GME0001 and GME0002 on atorvastatin?")
+
+    assert len(docs) == 3
+    assert {d.metadata["PatientID"] for d in docs} == {"GME0001", "GME0002"}
+    assert [d.metadata["PatientID"] for d in docs] == sorted(d.metadata["PatientID"] for d in docs)
+    assert {(d.metadata["PatientID"], d.metadata["section"]) for d in docs} >= {
+        ("GME0001", "medications"), ("GME0002", "medications")}
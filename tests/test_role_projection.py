@@ -0,0 +1,48 @@
+# tests/test_role_projection.py
+
+import os
+
+import pandas as pd
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.vectorstores import InMemoryVectorStore
+
+from src.medbot.data_loader import build_patient_documents
+from src.medbot.helper import create_patient_retriever
+from src.medbot.hospital_agents import role_sections
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Data")
+TABLE_FILES = [
+    "patient_details.csv", "diagnosis.csv", "medications.csv", "prescriptions.csv",
+    "alerts.csv", "diabetic_indices.csv", "encounter_history.csv", "immunizations.csv",
+]
+
+
+@pytest.fixture(scope="module")
+def section_documents():
+    tables = [pd.read_csv(os.path.join(DATA_DIR, name)) for name in TABLE_FILES]
+    return build_patient_documents(*tables, chunking="section")
+
+
+def make_retriever(documents, role):
+    vectorstore = InMemoryVectorStore(DeterministicFakeEmbedding(size=8))
+    # BM25 only: InMemoryVectorStore takes callable filters, Chroma/FAISS take the dict filter
+    return create_patient_retriever(vectorstore, documents, dense_weight=0, sections=role_sections(role))
+
+
+@pytest.mark.parametrize("query", [
+    "Show me the diagnosis for patient GME0000",
+    "Tell me everything about GME0001",
+    "Which patients have Diabetes?",
+])
+def test_pharmacist_never_retrieves_denied_sections(section_documents, query):
+    docs = make_retriever(section_documents, "Pharmacist").invoke(query)
+
+    assert {d.metadata["section"] for d in docs} <= {"identity", "medications", "prescriptions"}
+
+
+def test_nurse_never_retrieves_contact_details(section_documents):
+    docs = make_retriever(section_documents, "Nurse").invoke("What is the address of GME0002?")
+
+    assert [d.metadata["section"] for d in docs] == ["identity"]
+    assert not any("Address" in d.page_content for d in docs)
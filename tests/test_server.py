@@ -0,0 +1,175 @@
+# tests/test_server.py
+
+import asyncio
+import json
+import time
+from typing import Annotated, List
+
+import pytest
+from langchain_core.messages import AIMessage, BaseMessage
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.graph import StateGraph, START, END
+from langgraph.graph.message import add_messages
+from typing_extensions import TypedDict
+
+from src.medbot import hospital_agents
+from src.medbot.audit import AuditStore
+from src.medbot.checkpoint import SQLiteCheckpointSaver
+from src.medbot.server import MedbotServer
+
+
+@pytest.fixture(autouse=True)
+def audit_db(tmp_path):
+    store = AuditStore(str(tmp_path / "audit.sqlite"))
+    previous = hospital_agents.set_audit_store(store)
+    yield store
+    hospital_agents.set_audit_store(previous)
+    store.close()
+
+
+class State(TypedDict):
+    messages: Annotated[List[BaseMessage], add_messages]
+
+
+def echo_agent(delay, checkpointer):
+    def echo(state):
+        time.sleep(delay)
+        return {"messages": [AIMessage(content=f"echo: {state['messages'][-1].content}")]}
+
+    graph = StateGraph(State)
+    graph.add_node("llm", echo)
+    graph.add_edge(START, "llm")
+    graph.add_edge("llm", END)
+    return graph.compile(checkpointer=checkpointer)
+
+
+class FakePipeline:
+    users = {
+        "nurse1": {"password": "1", "role": "Nurse"},
+        "doc1": {"password": "1", "role": "Doctor"},
+        "super1": {"password": "1", "role": "Supervisor"},
+    }
+
+    def __init__(self, delay=0.0, checkpointer=None):
+        self.delay = delay
+        self.checkpointer = checkpointer or InMemorySaver()
+        self.reloads = 0
+
+    def reload(self):
+        self.reloads += 1
+        return {"data_version": "v2", "changed": True, "documents": 0, "seconds": 0.0}
+
+    def agent(self, role):
+        return echo_agent(self.delay, self.checkpointer)
+
+
+async def request(port, method, path, body=None):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    data = json.dumps(body).encode() if body is not None else b""
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: x\r\nContent-Length: {len(data)}\r\n\r\n".encode() + data)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, payload = response.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(payload)
+
+
+def run_with_server(scenario, pipeline):
+    async def main():
+        server = MedbotServer(pipeline, max_workers=4)
+        listener = await server.start("127.0.0.1", 0)
+        port = listener.sockets[0].getsockname()[1]
+        async with listener:
+            return await scenario(port)
+    return asyncio.run(main())
+
+
+def test_login_chat_history_and_logout():
+    async def scenario(port):
+        assert (await request(port, "POST", "/sessions", {"username": "nurse1", "password": "x"}))[0] == 401
+        status, login = await request(port, "POST", "/sessions", {"username": "nurse1", "password": "1"})
+        assert status == 201 and login["role"] == "Nurse"
+        sid = login["session_id"]
+
+        status, denied = await request(port, "POST", f"/sessions/{sid}/messages", {"query": "Show Prescriptions"})
+        assert status == 403
+        status, reply = await request(port, "POST", f"/sessions/{sid}/messages", {"query": "Diagnosis of GME0000"})
+        assert status == 200 and reply["answer"] == "echo: Diagnosis of GME0000"
+
+        status, state = await request(port, "GET", f"/sessions/{sid}")
+        assert [m["type"] for m in state["messages"]] == ["human", "ai"]
+        assert (await request(port, "DELETE", f"/sessions/{sid}"))[0] == 200
+        assert (await request(port, "GET", f"/sessions/{sid}"))[0] == 404
+
+    run_with_server(scenario, FakePipeline())
+
+
+def test_sessions_run_concurrently_off_the_event_loop():
+    async def scenario(port):
+        sessions = []
+        for _ in range(4):
+            _, login = await request(port, "POST", "/sessions", {"username": "doc1", "password": "1"})
+            sessions.append(login["session_id"])
+        start = time.perf_counter()
+        results = await asyncio.gather(*[
+            request(port, "POST", f"/sessions/{sid}/messages", {"query": f"question {i}"})
+            for i, sid in enumerate(sessions)
+        ])
+        elapsed = time.perf_counter() - start
+        assert [r[1]["answer"] for r in results] == [f"echo: question {i}" for i in range(4)]
+        # Four 0.3s agent runs in parallel, not back to back
+        assert elapsed < 0.9
+
+    run_with_server(scenario, FakePipeline(delay=0.3))
+
+
+def test_only_supervisors_reload_the_data():
+    pipeline = FakePipeline()
+
+    async def scenario(port):
+        _, doctor = await request(port, "POST", "/sessions", {"username": "doc1", "password": "1"})
+        _, supervisor = await request(port, "POST", "/sessions", {"username": "super1", "password": "1"})
+
+        assert (await request(port, "POST", f"/sessions/{doctor['session_id']}/reload"))[0] == 403
+        status, result = await request(port, "POST", f"/sessions/{supervisor['session_id']}/reload")
+        assert status == 200 and result["data_version"] == "v2"
+
+    run_with_server(scenario, pipeline)
+    assert pipeline.reloads == 1
+
+
+def test_malformed_request_is_rejected():
+    async def scenario(port):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(b"POST /sessions HTTP/1.1\r\nContent-Length: 3\r\n\r\n{x}")
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+        assert response.split()[1] == b"400"
+
+    run_with_server(scenario, FakePipeline())
+
+
+def test_sessions_resume_after_restart(tmp_path):
+    db = str(tmp_path / "sessions.sqlite")
+
+    async def first_run(port):
+        _, login = await request(port, "POST", "/sessions", {"username": "doc1", "password": "1"})
+        await request(port, "POST", f"/sessions/{login['session_id']}/messages", {"query": "first question"})
+        return login["session_id"]
+
+    session_id = run_with_server(first_run, FakePipeline(checkpointer=SQLiteCheckpointSaver(db)))
+
+    async def second_run(port):
+        status, _ = await request(port, "POST", "/sessions",
+                                  {"username": "nurse1", "password": "1", "session_id": session_id})
+        assert status == 404  # another user's session
+        status, login = await request(port, "POST", "/sessions",
+                                      {"username": "doc1", "password": "1", "session_id": session_id})
+        assert status == 201 and login["session_id"] == session_id
+        await request(port, "POST", f"/sessions/{session_id}/messages", {"query": "second question"})
+        _, state = await request(port, "GET", f"/sessions/{session_id}")
+        return [m["content"] for m in state["messages"]]
+
+    contents = run_with_server(second_run, FakePipeline(checkpointer=SQLiteCheckpointSaver(db)))
+    assert contents == ["first question", "echo: first question", "second question", "echo: second question"]
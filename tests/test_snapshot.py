@@ -0,0 +1,95 @@
+# tests/test_snapshot.py
+
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+from src.medbot import snapshot
+from src.medbot.data_loader import load_csv_as_df, load_diagnosis, TABLE_SCHEMAS
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Data")
+
+
+@pytest.fixture
+def diagnosis_csv(tmp_path, monkeypatch):
+    monkeypatch.setenv(snapshot.ENABLED_ENV, "1")
+    monkeypatch.delenv(snapshot.DIR_ENV, raising=False)
+    path = tmp_path / "diagnosis.csv"
+    shutil.copy(os.path.join(DATA_DIR, "diagnosis.csv"), path)
+    return str(path)
+
+
+def test_first_load_writes_a_snapshot_that_later_loads_use(diagnosis_csv):
+    parsed = load_diagnosis(diagnosis_csv)
+    assert not parsed.attrs["from_snapshot"]
+    assert os.path.exists(os.path.join(snapshot.snapshot_directory(diagnosis_csv), snapshot.META_FILENAME))
+
+    mapped = load_diagnosis(diagnosis_csv)
+    assert mapped.attrs["from_snapshot"]
+    pd.testing.assert_frame_equal(mapped, parsed, check_flags=False)
+    assert isinstance(mapped["Status"].dtype, pd.CategoricalDtype)
+
+
+def test_edited_source_invalidates_the_snapshot(diagnosis_csv):
+    load_diagnosis(diagnosis_csv)
+    with open(diagnosis_csv, "a", encoding="utf-8") as f:
+        f.write("GME9999,Asthma,01/2024,Ongoing\n")
+
+    reloaded = load_diagnosis(diagnosis_csv)
+    assert not reloaded.attrs["from_snapshot"]
+    assert reloaded.index[-1] == "GME9999"
+    assert load_diagnosis(diagnosis_csv).attrs["from_snapshot"]
+
+
+def test_same_size_edit_is_caught_by_the_hash(diagnosis_csv):
+    load_diagnosis(diagnosis_csv)
+    stat = os.stat(diagnosis_csv)
+    with open(diagnosis_csv, "r", encoding="utf-8") as f:
+        text = f.read()
+    with open(diagnosis_csv, "w", encoding="utf-8") as f:
+        f.write(text.replace("Asthma", "Asthmx", 1))
+    os.utime(diagnosis_csv, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    reloaded = load_diagnosis(diagnosis_csv)
+    assert not reloaded.attrs["from_snapshot"]
+    assert "Asthmx" in reloaded["Diagnosis"].cat.categories
+
+
+def test_touched_but_unchanged_source_keeps_the_snapshot(diagnosis_csv):
+    load_diagnosis(diagnosis_csv)
+    stat = os.stat(diagnosis_csv)
+    os.utime(diagnosis_csv, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    assert load_diagnosis(diagnosis_csv).attrs["from_snapshot"]
+    meta = snapshot._read_meta(snapshot.snapshot_directory(diagnosis_csv))
+    assert meta["source"]["mtime_ns"] == stat.st_mtime_ns + 10**9
+
+
+def test_schema_change_invalidates_the_snapshot(diagnosis_csv):
+    load_diagnosis(diagnosis_csv)
+    schema = dict(TABLE_SCHEMAS["diagnosis"], dtype=dict(TABLE_SCHEMAS["diagnosis"]["dtype"], Status=str))
+
+    df = load_csv_as_df(diagnosis_csv, schema)
+    assert not df.attrs["from_snapshot"]
+    assert df["Status"].dtype == object
+
+
+def test_snapshots_can_be_disabled(diagnosis_csv, monkeypatch):
+    monkeypatch.setenv(snapshot.ENABLED_ENV, "0")
+    load_diagnosis(diagnosis_csv)
+    assert not os.path.exists(snapshot.snapshot_directory(diagnosis_csv))
+
+
+def test_missing_values_round_trip(tmp_path, monkeypatch):
+    monkeypatch.setenv(snapshot.ENABLED_ENV, "1")
+    path = str(tmp_path / "diabetic_indices.csv")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("PatientID,Index,Value,MostRecent\nGME0000,BP,,07/2023\nGME0001,,5.51,\n")
+
+    parsed = load_csv_as_df(path, TABLE_SCHEMAS["diabetic_indices"])
+    mapped = load_csv_as_df(path, TABLE_SCHEMAS["diabetic_indices"])
+    assert mapped.attrs["from_snapshot"]
+    pd.testing.assert_frame_equal(mapped, parsed, check_flags=False)
+    assert pd.isna(mapped["Value"].iloc[0]) and pd.isna(mapped["MostRecent_dt"].iloc[1])
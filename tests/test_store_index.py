@@ -0,0 +1,104 @@
+# tests/test_store_index.py
+
+import os
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.vectorstores import InMemoryVectorStore
+
+from src.medbot import data_loader, store_index
+from src.medbot.data_loader import build_patient_documents, patient_fingerprints
+from src.medbot.store_index import (
+    document_ids, fingerprint_documents, open_persisted_vectorstore, patient_index_state, read_manifest,
+    sync_vectorstore,
+)
+from src.medbot.synthetic_data import generate_tables
+
+
+class CountingEmbedding(DeterministicFakeEmbedding):
+    embedded: list = []
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return super().embed_documents(texts)
+
+
+def open_index(documents, fingerprints, directory, embedder=None, model_name="fake-model"):
+    embedder = embedder or DeterministicFakeEmbedding(size=8)
+    path = os.path.join(directory, "store.json")
+    return open_persisted_vectorstore(
+        documents, model_name, directory, "memory",
+        build=lambda docs, ids: InMemoryVectorStore.from_documents(docs, embedding=embedder, ids=ids),
+        load=lambda: InMemoryVectorStore.load(path, embedder),
+        save=lambda store: store.dump(path),
+        fingerprints=fingerprints,
+    )
+
+
+def test_layout_change_re_embeds_patients_with_unchanged_rows(tmp_path, monkeypatch):
+    tables = generate_tables(5)
+    fingerprints = patient_fingerprints(*tables)
+    directory = str(tmp_path / "index")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(data_loader, "DEMOGRAPHICS_TEMPLATE", "PatientID: {PatientID}\nSex: {Sex}\nDOB: {DOB}")
+        open_index(build_patient_documents(*tables, chunking="section"), fingerprints, directory)
+
+    documents = build_patient_documents(*tables, chunking="section")
+    store = open_index(documents, fingerprints, directory)
+
+    assert sorted(entry["text"] for entry in store.store.values()) == sorted(doc.page_content for doc in documents)
+
+
+def test_sync_re_embeds_only_added_changed_and_removed_patients():
+    documents = build_patient_documents(*generate_tables(6), chunking="section")
+    pids = sorted({doc.metadata["PatientID"] for doc in documents})
+    removed, edited, added = pids[0], pids[1], pids[-1]
+
+    old = [doc for doc in documents if doc.metadata["PatientID"] != added]
+    new = []
+    for doc in documents:
+        pid = doc.metadata["PatientID"]
+        if pid == removed:
+            continue
+        if pid == edited and doc.metadata["section"] == "diagnoses":
+            doc = Document(page_content=doc.page_content + "\nDiagnosis: Asthma", metadata=doc.metadata)
+        new.append(doc)
+
+    embedder = CountingEmbedding(size=8, embedded=[])
+    store = InMemoryVectorStore.from_documents(old, embedding=embedder, ids=document_ids(old))
+    previous_state = patient_index_state(old, fingerprint_documents(old))
+    embedder.embedded.clear()
+
+    state = patient_index_state(new, fingerprint_documents(new))
+    report = sync_vectorstore(store, new, state, previous_state, chunk_size=4)
+
+    assert report == {"added": 1, "updated": 1, "removed": 1, "unchanged": len(pids) - 3}
+    touched = [doc.page_content for doc in new if doc.metadata["PatientID"] in (edited, added)]
+    assert sorted(embedder.embedded) == sorted(touched)
+    assert sorted(store.store) == sorted(document_ids(new))
+    assert sorted(entry["text"] for entry in store.store.values()) == sorted(doc.page_content for doc in new)
+
+
+def test_matching_manifest_loads_and_any_change_rebuilds(tmp_path, monkeypatch):
+    tables = generate_tables(4)
+    fingerprints = patient_fingerprints(*tables)
+    documents = build_patient_documents(*tables, chunking="section")
+    directory = str(tmp_path / "index")
+    embedder = CountingEmbedding(size=8, embedded=[])
+
+    def embedded_on_open(documents, **kwargs):
+        embedder.embedded.clear()
+        open_index(documents, fingerprints, directory, embedder=embedder, **kwargs)
+        return len(embedder.embedded)
+
+    assert embedded_on_open(documents) == len(documents)
+    assert embedded_on_open(documents) == 0
+    assert read_manifest(directory)["last_build"]["added"] == len(fingerprints)
+
+    assert embedded_on_open(documents, model_name="other-model") == len(documents)
+    monkeypatch.setattr(store_index, "INDEX_SCHEMA_VERSION", store_index.INDEX_SCHEMA_VERSION + 1)
+    assert embedded_on_open(documents, model_name="other-model") == len(documents)
+    patient_documents = build_patient_documents(*tables, chunking="patient")
+    assert embedded_on_open(patient_documents, model_name="other-model") == len(patient_documents)
+    assert read_manifest(directory)["chunking"] == "patient"
@@ -0,0 +1,70 @@
+# tests/test_streaming.py
+
+from typing import List
+
+from langchain_core.language_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langgraph.graph import StateGraph, START, END
+from typing_extensions import TypedDict
+
+from src.medbot.streaming import emit_progress, stream_turn
+
+
+class State(TypedDict):
+    messages: List[BaseMessage]
+
+
+def build_graph(answer="Patient GME0000 has diabetes."):
+    # A nested model (like the RetrievalQA LLM inside a tool) whose tokens must not be shown
+    nested = GenericFakeChatModel(messages=iter([AIMessage(content="internal context")]))
+    final = GenericFakeChatModel(messages=iter([AIMessage(content=answer)]))
+
+    def retriever_agent(state):
+        emit_progress("calling tool", tool="medical_rag_tool")
+        emit_progress("retrieving", query=state["messages"][-1].content)
+        return {"messages": state["messages"] + [nested.invoke(state["messages"])]}
+
+    def llm(state):
+        return {"messages": state["messages"] + [final.invoke(state["messages"])]}
+
+    graph = StateGraph(State)
+    graph.add_node("retriever_agent", retriever_agent)
+    graph.add_node("llm", llm)
+    graph.add_edge(START, "retriever_agent")
+    graph.add_edge("retriever_agent", "llm")
+    graph.add_edge("llm", END)
+    return graph.compile()
+
+
+def test_streams_only_answer_node_tokens_and_progress():
+    tokens, events = [], []
+    state, timings = stream_turn(
+        build_graph(), {"messages": [HumanMessage(content="Diagnosis for GME0000")]},
+        on_token=tokens.append, on_progress=events.append,
+    )
+
+    assert "".join(tokens) == "Patient GME0000 has diabetes."
+    assert len(tokens) > 1
+    assert [e["event"] for e in events] == ["calling tool", "retrieving"]
+    assert state["messages"][-1].content == "Patient GME0000 has diabetes."
+    assert 0 <= timings["ttft_seconds"] <= timings["total_seconds"]
+
+
+def test_non_llm_answer_is_emitted_once():
+    def deny(state):
+        return {"messages": state["messages"] + [HumanMessage(content="Access denied")]}
+
+    graph = StateGraph(State)
+    graph.add_node("hospital_agent", deny)
+    graph.add_edge(START, "hospital_agent")
+    graph.add_edge("hospital_agent", END)
+
+    tokens = []
+    _, timings = stream_turn(graph.compile(), {"messages": [HumanMessage(content="x")]}, on_token=tokens.append)
+
+    assert tokens == ["Access denied"]
+    assert timings["tokens"] == 0
+
+
+def test_emit_progress_outside_a_graph_is_a_no_op():
+    emit_progress("retrieving", query="anything")
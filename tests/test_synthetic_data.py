@@ -0,0 +1,48 @@
+# tests/test_synthetic_data.py
+
+import os
+
+import pandas as pd
+
+from src.medbot import snapshot
+from src.medbot.data_loader import TABLE_FILES, combine_patient_documents, load_tables
+from src.medbot.synthetic_data import ROWS_PER_PATIENT, generate_tables, write_dataset
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Data")
+
+
+def test_written_dataset_loads_with_the_data_schemas(tmp_path, monkeypatch):
+    monkeypatch.setenv(snapshot.ENABLED_ENV, "0")
+    rows = write_dataset(str(tmp_path), 250, chunk_size=100)
+    synthetic = load_tables(str(tmp_path))
+    shipped = load_tables(DATA_DIR)
+
+    for df, real, (_, filename, _) in zip(synthetic, shipped, TABLE_FILES):
+        assert list(df.columns) == list(real.columns), filename
+        assert df.dtypes.astype(str).to_dict() == real.dtypes.astype(str).to_dict(), filename
+        assert len(df) == rows[filename]
+    assert synthetic[0]["PatientID"].is_unique and len(synthetic[0]) == 250
+    assert os.path.exists(tmp_path / "user_credentials.csv")
+
+    documents = combine_patient_documents(*synthetic, chunking="section")
+    assert {doc.metadata["PatientID"] for doc in documents} == set(synthetic[0]["PatientID"])
+
+
+def test_generation_is_deterministic_per_seed():
+    first, second = generate_tables(50, seed=3), generate_tables(50, seed=3)
+    for a, b in zip(first, second):
+        pd.testing.assert_frame_equal(a, b)
+    assert not generate_tables(50, seed=4)[1].equals(first[1])
+
+
+def test_rows_per_patient_stay_within_the_configured_ranges():
+    tables = dict(zip([table for _, _, table in TABLE_FILES], generate_tables(500)))
+    for table, df in tables.items():
+        if table not in ROWS_PER_PATIENT:
+            continue
+        low, high = ROWS_PER_PATIENT[table]
+        counts = df.groupby("PatientID").size()
+        assert len(counts) == 500 and counts.between(low, high).all(), table
+
+    indices = tables["diabetic_indices"]
+    assert not indices.duplicated(["PatientID", "Index"]).any()
@@ -0,0 +1,64 @@
+# tests/test_tool_calls.py
+
+import time
+
+from langchain_core.tools import tool
+
+from src.medbot.tool_calls import execute_tool_calls
+
+
+@tool
+def slow_lookup(patient_id: str) -> str:
+    """Look up a patient slowly."""
+    time.sleep(0.2)
+    return f"record of {patient_id}"
+
+
+@tool
+def broken_lookup(patient_id: str) -> str:
+    """Always fails."""
+    raise RuntimeError(f"index unavailable for {patient_id}")
+
+
+TOOLS = {t.name: t for t in [slow_lookup, broken_lookup]}
+
+
+def call(name, patient_id, call_id):
+    return {"name": name, "args": {"patient_id": patient_id}, "id": call_id, "type": "tool_call"}
+
+
+def test_calls_run_concurrently_and_keep_order():
+    calls = [call("slow_lookup", f"GME000{i}", f"call-{i}") for i in range(3)]
+
+    start = time.perf_counter()
+    messages = execute_tool_calls(calls, TOOLS, max_concurrency=3)
+    elapsed = time.perf_counter() - start
+
+    assert [m.tool_call_id for m in messages] == ["call-0", "call-1", "call-2"]
+    assert [m.content for m in messages] == [f"record of GME000{i}" for i in range(3)]
+    assert elapsed < 0.5
+
+
+def test_failures_and_unknown_tools_do_not_block_other_calls():
+    calls = [
+        call("broken_lookup", "GME0000", "a"),
+        call("slow_lookup", "GME0001", "b"),
+        call("no_such_tool", "GME0002", "c"),
+    ]
+
+    messages = execute_tool_calls(calls, TOOLS)
+
+    assert messages[0].status == "error" and "index unavailable" in messages[0].content
+    assert messages[1].content == "record of GME0001"
+    assert messages[2].content == "Invalid tool call."
+
+
+def test_concurrency_limit_of_one_runs_sequentially():
+    seen = []
+    messages = execute_tool_calls(
+        [call("slow_lookup", "GME0000", "a"), call("slow_lookup", "GME0001", "b")], TOOLS,
+        max_concurrency=1, before_call=lambda t: seen.append(t["id"]),
+    )
+
+    assert seen == ["a", "b"]
+    assert len(messages) == 2